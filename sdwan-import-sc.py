@@ -5,40 +5,41 @@
 #
 # import tracker sheet and build template csv for import into vManage to cutdown on manual work required to deploy routers
 # To adapt this code there are two main sections that require updating:
-# Section 1 is the definition of vmanage_dict - each dictionary key maps to a column header which is a variable in a template
-# Section 2 is the main loop that reads the tracker sheet, manipulates the data and then writes it into the dictionary
-# Section 3 performs postcode lookups to obtain GPS coords and gathers a list of routes required for DNAC - the vmanage-import-[cust].csv file is written
+# Section 1 is the definition of keys - each key maps to a column header which is a variable in a template (DeviceRow holds one value per key)
+# with the tracker columns (*_col) and the router1_rules / router2_rules that derive each key from a tracker row
+# Section 2 is transform_row, called by the main loop for each tracker row, which manipulates the data and returns the device rows
+# For another customer Section 1 can be given as a mapping file instead of editing the script - see --write-mapping and --mapping
+# Section 3 performs postcode lookups to obtain GPS coords and gathers a list of routes required for DNAC - the vmanage-import-[cust].csv file is written row by row
 
 
-# openpxyl is a library for handing MS Excel files
+# startup is measured from here - see --startup-check
 
-from ast import If
-import openpyxl
+import time
+script_start = time.perf_counter()
 
-# pandas is used for working with csv files
-
-import pandas as pd
-
-# requests allows API calls - used to correct the UK Postcodes which have no space
-
-import requests
-
-# allows whois lookup for public subnets ; static routes are required on DNAC
-
-from ipwhois import IPWhois
+# the heavy libraries are imported by the stage that needs them so the script starts quickly
+# and an exit at the 'tracker has not changed' prompt never pays for them:
+# openpyxl is a library for handing MS Excel files - imported in read_tracker (not at all when the tracker cache has the sheet)
+# requests allows API calls - used to correct the UK Postcodes which have no space - imported by the postcode lookup functions
+# ipwhois looks up who a public subnet is registered to - imported in whois_lookup and only needed for --dnac-routes (pip install ipwhois)
+# numpy builds the store address plan - imported in store_address_plan
 
 # some standard libraries
 
-import pprint
 import ipaddress
 import sys
 import os
+import argparse
+import sqlite3
 from datetime import datetime
-import re
-import math
-import pickle
 import json
-import math
+import hashlib
+import csv
+import re
+import mmap
+import struct
+import bisect
+import marshal
 
 def store_nets(store_num):
 
@@ -70,88 +71,241 @@ def store_nets(store_num):
 
     return(store_net_oct2, store_net_oct3, store_net_oct2_vlan70, store_net_oct2_vlan31, store_net_oct3_vlan31, store_net_oct2_vlan101)
 
-def test_store_nets():
-
-	# --- Test code to generate SCOOP store subnets ---
-	keys = ['store','vlan60','vlan70','vlan10','vlan20','vlan31','vlan101']
-	subnets_dict = {key: [] for key in keys}
-	
-	file1 = open('/mnt/c/Users/nick.oneill/Downloads/subnets.txt', 'w')
-	# test generated store numbers from 0000 to 9999
-	
-	for store in range(0, 9999):
-	
-		store_num = str(store).zfill(4)
-		store_net_oct2, store_net_oct3, store_net_oct2_vlan70, store_net_oct2_vlan31, store_net_oct3_vlan31, store_net_oct2_vlan101 = store_nets(store_num)
-		
-		# print(f'store_num {store_num} store_net_oct2 {store_net_oct2} store_net_oct3 {store_net_oct3}')
-		try:
-			vlan60_ipv4 = ipaddress.ip_network(f'151.{store_net_oct2}.{store_net_oct3}.0/24')
-		except:
-			vlan60_ipv4 = (f'{store} error')
-		try:
-			vlan70_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan70}.{store_net_oct3}.0/24')
-		except:
-			vlan70_ipv4 = (f'{store} error')
-		try:
-			vlan10_ipv4 = ipaddress.ip_network(f'10.1{store_net_oct2}.{store_net_oct3}.0/25')
-		except:
-			vlan10_ipv4 = (f'{store} error')
-		try:
-			vlan20_ipv4 = ipaddress.ip_network(f'10.1{store_net_oct2}.{store_net_oct3}.128/25')
-		except:
-			vlan20_ipv4 = (f'{store} error')
-		try:
-			vlan31_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan31}.{store_net_oct3_vlan31}.0/28')
-		except:
-			vlan31_ipv4 = (f'{store} error')
-		try:
-			vlan101_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan101}.{store_net_oct3}.224/27')
-		except:
-			vlan101_ipv4 = (f'{store} error')
-	
-		subnets_dict['store'].append(f'{store:0>4}')
-		subnets_dict['vlan60'].append(str(vlan60_ipv4))
-		subnets_dict['vlan70'].append(str(vlan70_ipv4))
-		subnets_dict['vlan10'].append(str(vlan10_ipv4))
-		subnets_dict['vlan20'].append(str(vlan20_ipv4))
-		subnets_dict['vlan31'].append(str(vlan31_ipv4))
-		subnets_dict['vlan101'].append(str(vlan101_ipv4))
-	
-	df = pd.DataFrame(subnets_dict)
-	
-	try:
-		df.to_csv('/mnt/c/Users/nick.oneill/Downloads/scoop-subnets.csv', index=False)
-	except PermissionError:
-		print('*' * 120,'\nError: scoop-subnets.csv is open in another application - please close and re-run the script\n','*' * 120)
-		exit()
-	
-	# all done
-	print('scoop-subnets.csv has been created :)\n')
-	file1.close()
-	return()
-
-def postcode_api(postcode_apilist):
+octet_strings = [str(octet) for octet in range(256)]
+ip_str_cache = {}
+
+def ip_str(address):
+
+    # Function to format an integer IPv4 address as a dotted quad
+    # Results are cached - the fixed VLANs, masks and many store addresses repeat on every row
+
+    text = ip_str_cache.get(address)
+    if text is None:
+        text = ip_str_cache[address] = f'{octet_strings[address >> 24]}.{octet_strings[(address >> 16) & 255]}.{octet_strings[(address >> 8) & 255]}.{octet_strings[address & 255]}'
+    return text
+
+
+class IPv4Net:
+
+    # A compact IPv4 network held as plain integers for the per-row address derivations - format addresses with ip_str
+    # network, broadcast and netmask are integers and net[i] is the i'th address of the network
+    # (a negative index counts back from the broadcast address, the same as ipaddress)
+    # str(net) gives 'a.b.c.d/len' the same as an ipaddress network
+
+    __slots__ = ('network', 'prefixlen')
+
+    # a plain dotted quad with an optional prefix length - no leading zeros, the same as ipaddress accepts
+    dotted_quad = re.compile(r'(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})\.(0|[1-9][0-9]{0,2})(?:/([0-9]+))?')
+
+    def __init__(self, network, prefixlen):
+        self.network = network
+        self.prefixlen = prefixlen
+
+    @classmethod
+    def parse(cls, text, strict=True):
+
+        # Function to parse 'a.b.c.d/len' the same as ipaddress.ip_network - raises ValueError for an invalid network
+        # Plain dotted quads are split here, anything else (a netmask for the prefix, bad octets) is left to ipaddress
+
+        match = cls.dotted_quad.fullmatch(text)
+        if match:
+            oct1, oct2, oct3, oct4, prefix = match.groups()
+            oct1, oct2, oct3, oct4 = int(oct1), int(oct2), int(oct3), int(oct4)
+            prefixlen = 32 if prefix is None else int(prefix)
+            if oct1 <= 255 and oct2 <= 255 and oct3 <= 255 and oct4 <= 255 and prefixlen <= 32:
+                address = (oct1 << 24) | (oct2 << 16) | (oct3 << 8) | oct4
+                network = address & ((0xFFFFFFFF << (32 - prefixlen)) & 0xFFFFFFFF)
+                if strict and network != address:
+                    raise ValueError(f'{text} has host bits set')
+                return cls(network, prefixlen)
+
+        network = ipaddress.ip_network(text, strict=strict)
+        return cls(int(network.network_address), network.prefixlen)
+
+    @classmethod
+    def from_octets(cls, oct1, oct2, oct3, oct4, prefixlen):
+
+        # Function to build a network from its octets - raises ValueError the same as ip_network if an octet is over 255 or host bits are set
+
+        if not (0 <= oct1 <= 255 and 0 <= oct2 <= 255 and 0 <= oct3 <= 255 and 0 <= oct4 <= 255):
+            raise ValueError(f'{oct1}.{oct2}.{oct3}.{oct4}/{prefixlen} does not appear to be an IPv4 network')
+        address = (oct1 << 24) | (oct2 << 16) | (oct3 << 8) | oct4
+        if address & (0xFFFFFFFF >> prefixlen):
+            raise ValueError(f'{oct1}.{oct2}.{oct3}.{oct4}/{prefixlen} has host bits set')
+        return cls(address, prefixlen)
+
+    @property
+    def broadcast(self):
+        return self.network | (0xFFFFFFFF >> self.prefixlen)
+
+    @property
+    def netmask(self):
+        return (0xFFFFFFFF << (32 - self.prefixlen)) & 0xFFFFFFFF
+
+    def octets(self):
+        network = self.network
+        return (network >> 24, (network >> 16) & 255, (network >> 8) & 255, network & 255)
+
+    def __getitem__(self, index):
+        size = 1 << (32 - self.prefixlen)
+        if 0 <= index < size:
+            return self.network + index
+        if -size <= index < 0:
+            return self.network + size + index
+        raise IndexError('address out of range')
+
+    def __str__(self):
+        return f'{ip_str(self.network)}/{self.prefixlen}'
+
+
+address_plan = None  # built on first use by store_address_plan
+# prefix length of each VLAN in the address plan - the order of the networks in address_plan['stores']
+address_plan_prefixes = {'vlan60': 24, 'vlan20': 25, 'vlan70': 24, 'vlan10': 25, 'vlan31': 28, 'vlan101': 27}
+
+def store_address_plan():
+
+    # Function to build the address plan for every store number 0000-9999 in one vectorised pass - the same rules as store_nets
+    # Returns a dictionary of numpy uint32 arrays indexed by store number holding the network address of each store VLAN:
+    #   vlan60, vlan20 - the type 3 and 4 networks (ELS types 5 and 6 seed these from the VLAN 60 network in the tracker)
+    #   vlan70, vlan10, vlan31, vlan101
+    # plus 'valid' - False where an octet would be over 255 (ip_network would reject the store)
+    # The plan is built once per run - numpy is imported here so a run with nothing to transform never loads it
+
+    global address_plan
+    if address_plan is not None:
+        return address_plan
+
+    import numpy as np
+
+    store = np.arange(10000, dtype=np.uint32)
+    actual_store_num = store % 1000  # strip leading digit for network calc
+
+    # first two digits - just the second digit if the store number starts with 0 or 9
+    lead_digit = store // 1000
+    store_net_oct2 = np.where((lead_digit == 0) | (lead_digit == 9), (store // 100) % 10, store // 100)
+    store_net_oct3 = store % 100
+
+    store_net_oct2_vlan70 = store_net_oct2 + 100
+    # f'{oct2:1>3}' pads with 1s to 3 digits
+    store_net_oct2_vlan31 = np.where(store_net_oct2 < 10, store_net_oct2 + 110, store_net_oct2 + 100)
+    store_net_oct3_vlan31 = store_net_oct3
+    store_net_oct2_vlan101 = store_net_oct2_vlan31
+
+    low_store = actual_store_num < 255
+    store_net_oct2 = np.where(low_store, 1, store_net_oct2)
+    store_net_oct2_vlan70 = np.where(low_store, 100, store_net_oct2_vlan70)
+    store_net_oct3 = np.where(low_store, actual_store_num, store_net_oct3)
+
+    # f'1{oct2}' puts a 1 in front of the second octet
+    store_net_oct2_vlan10 = np.where(store_net_oct2 < 10, store_net_oct2 + 10, store_net_oct2 + 100)
+
+    def network(oct1, oct2, oct3, oct4):
+        return ((np.uint32(oct1) << 24) | (oct2.astype(np.uint32) << 16) | (oct3.astype(np.uint32) << 8) | np.uint32(oct4)).astype(np.uint32)
+
+    octets = np.stack([store_net_oct2, store_net_oct3, store_net_oct2_vlan70, store_net_oct2_vlan10,
+                       store_net_oct2_vlan31, store_net_oct3_vlan31, store_net_oct2_vlan101])
+
+    address_plan = {
+        'vlan60': network(151, store_net_oct2, store_net_oct3, 0),
+        'vlan20': network(10, store_net_oct2_vlan10, store_net_oct3, 128),
+        'vlan70': network(10, store_net_oct2_vlan70, store_net_oct3, 0),
+        'vlan10': network(10, store_net_oct2_vlan10, store_net_oct3, 0),
+        'vlan31': network(10, store_net_oct2_vlan31, store_net_oct3_vlan31, 0),
+        'vlan101': network(10, store_net_oct2_vlan101, store_net_oct3, 224),
+        'valid': (octets <= 255).all(axis=0),
+    }
+
+    # the per-row lookup reads plain python ints - one tuple of network addresses per store, None where the store is not valid
+    address_plan['stores'] = [networks if valid else None for valid, *networks in
+                              zip(address_plan['valid'].tolist(), *(address_plan[vlan].tolist() for vlan in address_plan_prefixes))]
+    return address_plan
+
+# the networks that are the same in every store
+store_vlan80_ipv4 = IPv4Net.parse('192.168.100.0/24')
+store_vlan30_ipv4 = IPv4Net.parse('192.168.101.0/24')
+store_vlan40_ipv4 = IPv4Net.parse('192.168.102.0/24')
+store_vlan100_ipv4 = IPv4Net.parse('192.168.103.0/24')
+store_vlan120_ipv4 = IPv4Net.parse('192.168.104.0/24')
+cctv_nat_ipv4 = IPv4Net.parse('172.19.0.0/16')
+
+def store_networks(store_num):
+
+    # Function to look a store up in the address plan
+    # Returns the vlan60, vlan20, vlan70, vlan10, vlan31 and vlan101 networks - vlan60 and vlan20 are the type 3 and 4 networks
+    # A store number outside the plan (not 4 digits) is generated by store_nets from the digits as before
+
+    if len(store_num) == 4 and store_num.isdigit():
+        networks = store_address_plan()['stores'][int(store_num)]
+        if networks is not None:
+            return tuple(map(IPv4Net, networks, address_plan_prefixes.values()))
+
+    store_net_oct2, store_net_oct3, store_net_oct2_vlan70, store_net_oct2_vlan31, store_net_oct3_vlan31, store_net_oct2_vlan101 = store_nets(store_num)
+    return (IPv4Net.parse(f'151.{store_net_oct2}.{store_net_oct3}.0/24'),
+            IPv4Net.parse(f'10.1{store_net_oct2}.{store_net_oct3}.128/25'),
+            IPv4Net.parse(f'10.{store_net_oct2_vlan70}.{store_net_oct3}.0/24'),
+            IPv4Net.parse(f'10.1{store_net_oct2}.{store_net_oct3}.0/25'),
+            IPv4Net.parse(f'10.{store_net_oct2_vlan31}.{store_net_oct3_vlan31}.0/28'),
+            IPv4Net.parse(f'10.{store_net_oct2_vlan101}.{store_net_oct3}.224/27'))
+
+def test_store_nets(csv_filepath=None):
+
+    # --- Test code to generate SCOOP store subnets ---
+    # writes the address plan for store numbers 0000 to 9998 to store_subnets_filepath (or csv_filepath) - a store with an invalid
+    # network is written as '<store> error'
+
+    csv_filepath = csv_filepath or store_subnets_filepath
+    columns = ['vlan60', 'vlan70', 'vlan10', 'vlan20', 'vlan31', 'vlan101']
+    plan = store_address_plan()
+    stores = range(0, 9999)
+    valid = plan['valid'][:len(stores)].tolist()
+
+    subnets = {}
+    for column in columns:
+        prefix = address_plan_prefixes[column]
+        subnets[column] = [f'{ip_str(network)}/{prefix}' if ok else f'{store} error'
+                           for store, network, ok in zip(stores, plan[column][:len(stores)].tolist(), valid)]
+
+    try:
+        with open(csv_filepath, 'w', newline='') as f:
+            writer = csv.writer(f, lineterminator=os.linesep)
+            writer.writerow(['store'] + columns)
+            writer.writerows(zip([f'{store:0>4}' for store in stores], *(subnets[column] for column in columns)))
+    except PermissionError:
+        print('*' * 120, f'\nError: {os.path.basename(csv_filepath)} is open in another application - please close and re-run the script\n', '*' * 120)
+        exit()
+
+    # all done
+    print(f'{os.path.basename(csv_filepath)} has been created :)\n')
+    return()
+
+postcode_api_url = 'https://api.postcodes.io'  # base URL of the postcode API - see --postcode-api
+postcode_uri = f'{postcode_api_url}/postcodes'
+
+def postcode_api(postcode_apilist, session=None, uri=None):
 
     # Function for passing a list of postcodes to an external site for lookup
     # Correct the postcode format (missing space) and return long + lat values
     # Send API request, passing in postcodes as a list
     # NOTE Maximum 100 postcodes
+    # session can be a requests.Session so repeated calls reuse pooled connections
+    # uri is the bulk lookup URL - postcode_uri (set by --postcode-api) if not given
 
-    postcode_uri = 'https://api.postcodes.io/postcodes'
+    import requests
+    if session is None:
+        session = requests
+    uri = uri or postcode_uri
 
     # Raise an exception requests.HTTPException error is response is anything other than 200 (OK)
 
-    json = {"postcodes": postcode_apilist}
     postcode_lookup = ''
     try:
-        postcode_lookup = requests.post(
-            postcode_uri,
+        postcode_lookup = session.post(
+            uri,
             json={"postcodes": postcode_apilist}
         )
         postcode_lookup.raise_for_status()
     except requests.exceptions.ConnectionError:
-        print(f'\nConnection error connecting to {postcode_uri}\nvManage import sheet has not been updated\n')
+        print(f'\nConnection error connecting to {uri}\nvManage import sheet has not been updated\n')
         sys.exit()
     except requests.HTTPError as error:
         print(f'\nHTTP Error:\n{error}')
@@ -160,111 +314,2685 @@ def postcode_api(postcode_apilist):
     return (postcode_lookup)
 
 
+def postcode_terminated(postcode, session=None, uri=None):
+
+    # Function to look up a single postcode the bulk API returned no result for
+    # Terminated postcodes return 404 but still carry their last known coordinates - returns those or None
+
+    if session is None:
+        import requests
+        session = requests
+
+    r = session.get(f'{uri or postcode_uri}/{postcode}')
+    if r.status_code == 404:
+        data = r.json()
+        if 'terminated' in data and data['terminated'] is not None:
+            return data['terminated']
+    return None
+
+
+def geocode_session(workers):
+
+    # Function to return a requests session with a connection pool large enough for every worker thread
+    # Requests refused because the API is busy (429) or failing (5xx) are retried with a backoff, honouring Retry-After -
+    # if they still fail the response is returned and raise_for_status reports it as before
+
+    import requests
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    retries = Retry(total=geocode_retries, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=None, raise_on_status=False)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def resolve_postcodes(postcodes, workers, uri=None):
+
+    # Function to resolve a list of unique postcodes against the API and return a dictionary of postcode -> (latitude, longitude, terminated)
+    # The list is sent in chunks of 100 (API limit) with up to workers bulk requests in flight at once over pooled connections
+    # Fallback lookups for unresolved postcodes are queued on the same pool as soon as their chunk returns
+    # uri is passed on to postcode_api and postcode_terminated - the benchmark points it at its stub
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    geocodes = {}
+    fallbacks = {}
+    chunks = [postcodes[chunk_start:chunk_start + 100] for chunk_start in range(0, len(postcodes), 100)]
+
+    with geocode_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        # map returns the chunk results in the order they were submitted
+        for results_list in executor.map(lambda chunk: postcode_api(chunk, session, uri).json()['result'], chunks):
+            for item in results_list:
+                if item['result'] is None:
+                    fallbacks[item['query']] = executor.submit(postcode_terminated, item['query'], session, uri)
+                else:
+                    geocodes[item['query']] = (item['result']['latitude'], item['result']['longitude'], False)
+
+        run_stats.count('api bulk requests', len(chunks))
+        run_stats.count('api single lookups', len(fallbacks))
+
+        for postcode, future in fallbacks.items():
+            terminated = future.result()
+            if terminated is None:
+                geocodes[postcode] = (None, None, False)
+            else:
+                geocodes[postcode] = (terminated['latitude'], terminated['longitude'], True)
+
+    return geocodes
+
+
+def open_lookup_cache(cache_file):
+
+    # Function to open the local sqlite cache used to avoid repeating external lookups between runs
+    # The file and table are created on first use
+
+    cache_conn = sqlite3.connect(cache_file)
+    cache_conn.execute('CREATE TABLE IF NOT EXISTS postcodes ('
+                       'postcode TEXT PRIMARY KEY, '
+                       'latitude REAL, '
+                       'longitude REAL, '
+                       'terminated INTEGER NOT NULL DEFAULT 0, '
+                       'fetched REAL NOT NULL)')
+    # whois results are keyed by the registered address range so every subnet inside it is answered by one lookup
+    cache_conn.execute('CREATE TABLE IF NOT EXISTS whois ('
+                       'first INTEGER NOT NULL, '
+                       'last INTEGER NOT NULL, '
+                       'cidr TEXT, '
+                       'name TEXT, '
+                       'country TEXT, '
+                       'asn TEXT, '
+                       'fetched REAL NOT NULL, '
+                       'PRIMARY KEY (first, last))')
+    return cache_conn
+
+
+def geocode_cache_get(cache_conn, cache_days):
+
+    # Function to return every unexpired cache entry as a dictionary of postcode -> (latitude, longitude, terminated)
+    # The whole table is a few thousand rows at most so one query is cheaper than a lookup per postcode
+
+    oldest = time.time() - (cache_days * 86400)
+    rows = cache_conn.execute('SELECT postcode, latitude, longitude, terminated FROM postcodes WHERE fetched >= ?', (oldest,))
+    return {postcode: (latitude, longitude, bool(terminated)) for postcode, latitude, longitude, terminated in rows}
+
+
+def geocode_cache_put(cache_conn, geocodes):
+
+    # Function to store postcode lookups in the cache - geocodes is a dictionary of postcode -> (latitude, longitude, terminated)
+    # Postcodes the API could not resolve are stored too (latitude/longitude NULL) so they are not looked up again until they expire
+
+    fetched = time.time()
+    with cache_conn:
+        cache_conn.executemany('INSERT OR REPLACE INTO postcodes (postcode, latitude, longitude, terminated, fetched) VALUES (?, ?, ?, ?, ?)',
+                               [(postcode, latitude, longitude, int(terminated), fetched) for postcode, (latitude, longitude, terminated) in geocodes.items()])
+
+
+def geocode_cache_cleanup(cache_conn, cache_days):
+
+    # Function to delete expired entries from the cache and return how many were removed
+    # whois ranges expire after whois_cache_days rather than cache_days as registrations change far less often than postcodes
+
+    oldest = time.time() - (cache_days * 86400)
+    with cache_conn:
+        deleted = cache_conn.execute('DELETE FROM postcodes WHERE fetched < ?', (oldest,)).rowcount
+        deleted += cache_conn.execute('DELETE FROM whois WHERE fetched < ?', (time.time() - (whois_cache_days * 86400),)).rowcount
+    cache_conn.execute('VACUUM')
+    return deleted
+
+
+def geocode_cache_stats(cache_conn, cache_file, cache_days):
+
+    # Function to print a summary of the postcode cache
+
+    oldest = time.time() - (cache_days * 86400)
+    total, fresh, terminated, unresolved, first, last = cache_conn.execute(
+        'SELECT COUNT(*), '
+        'COALESCE(SUM(fetched >= ?), 0), '
+        'COALESCE(SUM(terminated), 0), '
+        'COALESCE(SUM(latitude IS NULL), 0), '
+        'MIN(fetched), MAX(fetched) FROM postcodes', (oldest,)).fetchone()
+
+    print('-' * 80)
+    print(f'Postcode cache:      {os.path.abspath(cache_file)} ({os.path.getsize(cache_file)} bytes)')
+    print(f'Entries:             {total}')
+    print(f'Unexpired:           {fresh} (expiry {cache_days:g} days)')
+    print(f'Expired:             {total - fresh}')
+    print(f'Terminated:          {terminated}')
+    print(f'Unresolved:          {unresolved}')
+    if total:
+        print(f'Oldest entry:        {datetime.fromtimestamp(first).strftime("%Y-%m-%d %H:%M:%S")}')
+        print(f'Newest entry:        {datetime.fromtimestamp(last).strftime("%Y-%m-%d %H:%M:%S")}')
+    print('-' * 80 + '\n')
+
+
+def normalise_postcode(postcode):
+
+    # Function to return a postcode in the form used for lookups - upper case with no spaces
+
+    return str(postcode).upper().replace(' ', '')
+
+
+def plan_postcode_lookups(device_postcodes):
+
+    # Function to return the unique postcodes that need a lookup, in first-seen order
+    # Dual router stores and stores sharing a postcode collapse to a single entry; missing postcodes are left out
+
+    return [postcode for postcode in dict.fromkeys(device_postcodes) if postcode not in ('NONE', '')]
+
+
+def lookup_postcodes(postcode_plan, cache_conn, cache_days, workers):
+
+    # Function to resolve each postcode in the lookup plan once and return a dictionary of postcode -> (latitude, longitude, terminated)
+    # Postcodes found in the cache are not sent to the API - only cache misses are looked up and then stored
+
+    cached = geocode_cache_get(cache_conn, cache_days)
+    geocodes = {postcode: cached[postcode] for postcode in postcode_plan if postcode in cached}
+    cache_misses = [postcode for postcode in postcode_plan if postcode not in geocodes]
+    print(f'{len(geocodes)} postcodes found in cache, {len(cache_misses)} to look up ...\n')
+    run_stats.count('postcode cache hits', len(geocodes))
+    run_stats.count('postcode cache misses', len(cache_misses))
+
+    if cache_misses:
+        new_geocodes = resolve_postcodes(cache_misses, workers)
+        geocode_cache_put(cache_conn, new_geocodes)
+        geocodes.update(new_geocodes)
+
+    return geocodes
+
+
+def whois_lookup(address):
+
+    # Function to look up the registered network an address belongs to over RDAP
+    # Returns (first address, last address, cidr, name, country, asn) with the addresses as integers, or None if the lookup fails
+
+    from ipwhois import IPWhois
+    from ipwhois.exceptions import BaseIpwhoisException
+
+    try:
+        result = IPWhois(ip_str(address), timeout=10).lookup_rdap(depth=0, retry_count=whois_retries, get_asn_description=False)
+        network = result['network']
+        first = int(ipaddress.IPv4Address(network['start_address']))
+        last = int(ipaddress.IPv4Address(network['end_address']))
+    except (BaseIpwhoisException, KeyError, TypeError, ValueError):
+        return None
+    return (first, last, network.get('cidr'), network.get('name'), network.get('country'), result.get('asn'))
+
+
+def resolve_whois(addresses, cache_conn, cache_days, workers):
+
+    # Function to find the registered network of each address and return a dictionary of address -> (first, last, cidr, name, country, asn)
+    # (None for an address that could not be looked up). Each lookup answers every address inside the range it returns, so
+    # cached ranges are used first and neighbouring stores share one lookup:
+    #   only one lookup is in flight per /16 at a time (registries rarely allocate more than a /16 to one holder) and the addresses
+    #   waiting on it are checked against its range before any more are sent - lookups for different /16s run concurrently
+    #   lookups start at no more than whois_rate a second so the registries don't rate limit us
+
+    import threading
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    oldest = time.time() - (cache_days * 86400)
+    ranges = cache_conn.execute('SELECT first, last, cidr, name, country, asn FROM whois WHERE fetched >= ?', (oldest,)).fetchall()
+
+    # the known ranges are kept sorted by first address so bisect finds the ones that can hold an address, the same as the postcode
+    # index - a range holding the address starts at or below it and no further below than the longest range known
+    ranges.sort(key=lambda network: network[0])
+    starts = [network[0] for network in ranges]
+    longest = [max((network[1] - network[0] for network in ranges), default=0)]
+
+    def covering(address):
+        # the smallest known range holding the address
+        candidates = ranges[bisect.bisect_left(starts, address - longest[0]):bisect.bisect_right(starts, address)]
+        holders = [network for network in candidates if address <= network[1]]
+        return min(holders, key=lambda network: network[1] - network[0]) if holders else None
+
+    def add_range(network):
+        position = bisect.bisect_right(starts, network[0])
+        starts.insert(position, network[0])
+        ranges.insert(position, network)
+        longest[0] = max(longest[0], network[1] - network[0])
+
+    results = {}
+    pending = []
+    for address in sorted(set(addresses)):
+        network = covering(address)
+        if network is None:
+            pending.append(address)
+        else:
+            results[address] = network
+    run_stats.count('whois cache hits', len(results))
+
+    next_start = [time.monotonic()]
+    start_lock = threading.Lock()
+
+    def rate_limited_lookup(address):
+        with start_lock:
+            start = max(next_start[0], time.monotonic())
+            next_start[0] = start + 1 / whois_rate
+        time.sleep(max(0, start - time.monotonic()))
+        return whois_lookup(address)
+
+    # pending stays sorted so the addresses a new range covers are one slice of it
+    new_ranges = []
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while pending or in_flight:
+            busy = {address >> 16 for address in in_flight.values()}
+            waiting = []
+            for address in pending:
+                if len(in_flight) < workers and address >> 16 not in busy:
+                    in_flight[executor.submit(rate_limited_lookup, address)] = address
+                    busy.add(address >> 16)
+                    results[address] = None
+                else:
+                    waiting.append(address)
+            pending = waiting
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                looked_up = in_flight.pop(future)
+                network = future.result()
+                run_stats.count('whois lookups')
+                if network is None:
+                    continue
+                add_range(network)
+                new_ranges.append(network)
+                results[looked_up] = network
+                # the addresses waiting on this range need no lookup of their own - nor do the lookups still in flight inside it
+                low = bisect.bisect_left(pending, network[0])
+                high = bisect.bisect_right(pending, network[1])
+                for address in pending[low:high]:
+                    results[address] = network
+                pending = pending[:low] + pending[high:]
+                for address in in_flight.values():
+                    if results[address] is None and network[0] <= address <= network[1]:
+                        results[address] = network
+
+    if new_ranges:
+        fetched = time.time()
+        with cache_conn:
+            cache_conn.executemany('INSERT OR REPLACE INTO whois (first, last, cidr, name, country, asn, fetched) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                   [network + (fetched,) for network in new_ranges])
+    return results
+
+
+def write_dnac_routes(csv_filepath, routes, whois):
+
+    # Function to write the static routes DNAC needs for the public store subnets, one row per subnet in tracker order
+    # routes is a list of (store_num, tracker row, label, subnet) and whois the registered networks from resolve_whois -
+    # the registered range and holder are listed so a subnet that isn't registered to the customer stands out
+
+    with open(csv_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerow(['Store', 'Row', 'Subnet', 'Network', 'Mask', 'Prefix', 'Registered Range', 'Registered To', 'Country', 'ASN'])
+        for store_num, tracker_row, label, subnet in routes:
+            network = IPv4Net.parse(subnet)
+            registered = whois.get(network.network) or (None, None, 'unknown', 'unknown', '', '')
+            csv_writer.writerow([store_num, tracker_row, label, ip_str(network.network), ip_str(network.netmask), network.prefixlen,
+                                 registered[2], registered[3], registered[4], registered[5]])
+
+
+postcode_index_magic = b'PCIDX\x00\x01\x00'
+postcode_index_header = struct.Struct('<8sQ')  # magic, record count
+postcode_index_record = struct.Struct('<7siiB')  # postcode, latitude and longitude in millionths of a degree, flags (1 terminated, 2 no coordinates)
+
+def build_postcode_index(csv_filepath, index_filepath):
+
+    # Function to compile an ONS postcode directory csv (ONSPD or NSPL - live and terminated postcodes) into a postcode index for --geocode-index
+    # Each postcode becomes one fixed-width record keyed on its normalised form, sorted so a lookup can binary search the file in place
+    # Postcodes without a grid reference (ONS latitude 99.999999) are kept with the no coordinates flag
+    # The index is written to a temporary file and renamed so a failed build never replaces a working index - returns the record count
+
+    records = {}
+    with open(csv_filepath, newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = {field: position for position, field in enumerate(next(reader, ()))}
+        postcode_field = 'pcds' if 'pcds' in header else 'pcd'
+        missing = {postcode_field, 'doterm', 'lat', 'long'} - header.keys()
+        if missing:
+            print('*' * 120, f'\nError: {csv_filepath} is not an ONS postcode directory - missing columns {", ".join(sorted(missing))}\n', '*' * 120)
+            sys.exit()
+        postcode_pos, doterm_pos, lat_pos, long_pos = header[postcode_field], header['doterm'], header['lat'], header['long']
+
+        for rec in reader:
+            postcode = rec[postcode_pos].upper().replace(' ', '').encode('ascii', 'replace')
+            if not postcode or len(postcode) > 7:
+                continue
+            flags = 1 if rec[doterm_pos].strip() else 0
+            # a postcode listed live and terminated keeps the live entry
+            if flags and postcode in records and not records[postcode][-1] & 1:
+                continue
+            try:
+                latitude = round(float(rec[lat_pos]) * 1000000)
+                longitude = round(float(rec[long_pos]) * 1000000)
+            except ValueError:
+                latitude = longitude = 99999999
+            if latitude >= 99000000:
+                flags = flags | 2
+                latitude = longitude = 0
+            records[postcode] = postcode_index_record.pack(postcode, latitude, longitude, flags)
+
+    temp_filepath = index_filepath + '.tmp'
+    with open(temp_filepath, 'wb') as f:
+        f.write(postcode_index_header.pack(postcode_index_magic, len(records)))
+        for postcode in sorted(records):
+            f.write(records[postcode])
+    os.replace(temp_filepath, index_filepath)
+    return len(records)
+
+
+class PostcodeIndex:
+
+    # A postcode index built by build_postcode_index, memory-mapped so only the pages a lookup touches are read from disk
+    # It behaves as a sorted sequence of the postcode keys so bisect searches the file directly
+
+    def __init__(self, index_filepath):
+        with open(index_filepath, 'rb') as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = postcode_index_header.unpack_from(self.mm)
+        if magic != postcode_index_magic or len(self.mm) != postcode_index_header.size + self.count * postcode_index_record.size:
+            self.mm.close()
+            raise ValueError(f'{index_filepath} is not a postcode index')
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        offset = postcode_index_header.size + position * postcode_index_record.size
+        return self.mm[offset:offset + 7]
+
+    def get(self, postcode):
+
+        # Function to return (latitude, longitude, terminated) for a normalised postcode, or None if it is not in the index
+
+        key = postcode.encode('ascii', 'replace').ljust(7, b'\x00')
+        position = bisect.bisect_left(self, key)
+        if position == self.count or self[position] != key:
+            return None
+        _, latitude, longitude, flags = postcode_index_record.unpack_from(self.mm, postcode_index_header.size + position * postcode_index_record.size)
+        if flags & 2:
+            return (None, None, bool(flags & 1))
+        return (latitude / 1000000, longitude / 1000000, bool(flags & 1))
+
+    def close(self):
+        self.mm.close()
+
+
+def index_postcodes(postcodes, index_filepath):
+
+    # Function to resolve postcodes offline from a postcode index - returns the same dictionary of postcode -> (latitude, longitude, terminated)
+    # as lookup_postcodes, with postcodes missing from the index unresolved
+
+    index = PostcodeIndex(index_filepath)
+    geocodes = {}
+    for postcode in postcodes:
+        geocodes[postcode] = index.get(postcode) or (None, None, False)
+    index.close()
+
+    not_found = sum(1 for latitude, longitude, terminated in geocodes.values() if latitude is None)
+    print(f'{len(geocodes) - not_found} postcodes found in {index_filepath}, {not_found} not found or without coordinates ...\n')
+    run_stats.count('postcode index lookups', len(geocodes))
+    return geocodes
+
+
 def circuit_bandwidth(circuit_type):
 
-    # Function to return circuit bandwidth based on circuit type
-
-    if circuit_type == 'FTTP':
-        return (80, 20, 'Dialer1')
-    elif circuit_type == 'SOGEA':
-        return (80, 20, 'Dialer1')
-    elif circuit_type == 'FTTC':
-        return (80, 20, 'Dialer1')
-    elif circuit_type == 'ADSL':
-        return (24, 3, 'Dialer1')
-    elif circuit_type == 'OFNL Fibre':
-        return (80, 20, 'GigabitEthernet0/0/0')
-    elif circuit_type == 'ETHERNET':
-        return (100, 100, 'GigabitEthernet0/0/0')
+    # Function to return circuit bandwidth based on circuit type - (down Mbps, up Mbps, interface) from circuit_bandwidths
+
+    # return a tuple so callers that unpack won't fail
+    return circuit_bandwidths.get(circuit_type, (0, 0, 0))
+
+
+def sanatise_serial(serial):
+
+    # Function to check the location code is 3 letters and remove leading 'S'
+    if not serial:
+        return ''
+    # guard against short serials
+    if len(serial) > 3:
+        serial_check = serial[3]  # check 4th character is a number
     else:
-        # return a tuple so callers that unpack won't fail
-        return (0, 0, 0)
+        serial_check = ''
+    if serial_check.isalpha() and serial[0].upper() == 'S':
+        return (serial[1:].upper())
+    else:
+        return (serial.upper())
+
+def wan_color(circuit_provider):
+
+    # Function to return wan color based on circuit provider
+    # !NOTE! this is no longer used as R1 defaults to blue and R2 defaults green !!!
+      
+    if circuit_provider == 'BT' or circuit_provider == 'MAINTEL-BT':
+        return 'blue'
+    elif circuit_provider == 'PXC' or circuit_provider == 'MAINTEL-PXC':
+        return 'green'
+    elif circuit_provider == 'Other':
+        return 'public-internet'
+    else:
+        return None
+
+def read_tracker(tracker_filepath, first_row=3):
+
+    # Function to read the tracker sheet in a single streaming pass
+    # The workbook is opened read-only so openpyxl parses each row as it is reached instead of building every cell object up front
+    # Each row is returned as a tuple - element 0 is the tracker row number and the cell values follow it,
+    # so the *_col constants (1 = column A) index a record directly e.g. tracker_rec[store_num_col]
+
+    import openpyxl
+
+    tracker_wb_obj = openpyxl.load_workbook(tracker_filepath, read_only=True)
+    tracker_rows = []
+    try:
+        tracker_sheet_obj = tracker_wb_obj.active
+        tracker_row = first_row
+        for values in tracker_sheet_obj.iter_rows(min_row=first_row, max_col=tracker_max_col, values_only=True):
+            # short rows only happen when trailing cells are empty - pad so every column constant is a valid index
+            if len(values) < tracker_max_col:
+                values = values + (None,) * (tracker_max_col - len(values))
+            tracker_rows.append((tracker_row,) + values)
+            tracker_row = tracker_row + 1
+    finally:
+        # read-only workbooks keep the file handle open until closed
+        tracker_wb_obj.close()
+
+    # formula cells come back as their formula text e.g. '=VLOOKUP(A5,...)' - replace them with their values
+    formula_cells = [(index, column) for index, tracker_rec in enumerate(tracker_rows) for column, value in enumerate(tracker_rec)
+                     if column and type(value) is str and value.startswith('=')]
+    if formula_cells:
+        tracker_rows = resolve_formulas(tracker_filepath, tracker_rows, formula_cells, first_row)
+
+    return tracker_rows
+
+
+# the parts of the lookup formulas resolve_formulas understands
+#   a cell or range, on another sheet or not e.g. A5, $A$2:$C$500, 'IP Plan'!A:C - a text or number literal e.g. "none", 0
+formula_reference = r"(?:(?:'(?:[^']|'')+'|[A-Za-z0-9_.]+)!)?\$?[A-Za-z]{1,3}\$?[0-9]*(?::\$?[A-Za-z]{1,3}\$?[0-9]*)?"
+formula_literal = r'"(?:[^"]|"")*"|-?[0-9]+(?:\.[0-9]+)?'
+formula_argument = f'(?:{formula_reference}|{formula_literal})'
+# =VLOOKUP(value, table, column, FALSE) and =INDEX(range, MATCH(value, range, 0)[, column]), either may be inside IFERROR(..., fallback)
+vlookup_formula = re.compile(rf'=\s*(IFERROR\(\s*)?VLOOKUP\(\s*({formula_argument})\s*,\s*({formula_reference})\s*,\s*([0-9]+)\s*,\s*(?:FALSE|0)\s*\)'
+                             rf'\s*(?:,\s*({formula_literal})\s*\))?\s*', re.IGNORECASE)
+index_match_formula = re.compile(rf'=\s*(IFERROR\(\s*)?INDEX\(\s*({formula_reference})\s*,\s*MATCH\(\s*({formula_argument})\s*,\s*({formula_reference})\s*,\s*0\s*\)'
+                                 rf'\s*(?:,\s*([0-9]+)\s*)?\)\s*(?:,\s*({formula_literal})\s*\))?\s*', re.IGNORECASE)
+formula_range = re.compile(r"(?:(?:'((?:[^']|'')+)'|([A-Za-z0-9_.]+))!)?\$?([A-Za-z]{1,3})\$?([0-9]*)(?::\$?([A-Za-z]{1,3})\$?([0-9]*))?")
+
+
+def formula_value(text):
+
+    # Function to return the value of a formula literal - a string without its quotes or a number
+
+    if text.startswith('"'):
+        return text[1:-1].replace('""', '"')
+    return float(text) if '.' in text else int(text)
+
+
+def lookup_key(value):
+
+    # Function to return a value as an exact match lookup compares it - text ignores case and numbers match whatever their type
+    # TRUE and FALSE only match themselves - bool is an int so without the tag they would match 1 and 0
+
+    if type(value) is str:
+        return value.casefold()
+    if type(value) is bool:
+        return ('bool', value)
+    if type(value) in (int, float):
+        return float(value)
+    return value
+
+
+class FormulaResolver:
+
+    # Works out VLOOKUP and INDEX-MATCH formulas that have no cached value from the sheets they look up
+    # Each lookup range gets a hash index (lookup key -> first row holding it) the first time it is used, so every
+    # formula after that is one dictionary lookup whatever the size of the range. Sheets are read once, as values
+    # resolve(text, tracker_row) returns (True, value) or (False, None) for a formula it can't work out
+    # (another function, approximate match, a lookup value outside the records) - the formula text is left for those
+
+    def __init__(self, workbook, tracker_sheet, tracker_rows, first_row):
+        self.workbook = workbook
+        self.tracker_sheet = tracker_sheet
+        self.tracker_rows = tracker_rows
+        self.first_row = first_row
+        self.sheets = {}
+        self.indexes = {}
+
+    def sheet_rows(self, sheet):
+        if sheet not in self.sheets:
+            self.sheets[sheet] = list(self.workbook[sheet].iter_rows(values_only=True)) if sheet in self.workbook.sheetnames else None
+        return self.sheets[sheet]
+
+    def parse_range(self, text):
+        # (sheet, first column, first row, last column, last row) with column and row numbers from 1 - a whole column has rows 1 to None
+        quoted, sheet, first_col, first_row, last_col, last_row = formula_range.fullmatch(text).groups()
+        sheet = quoted.replace("''", "'") if quoted else sheet or self.tracker_sheet
+        first_col = column_number(first_col)
+        first_row = int(first_row) if first_row else 1
+        if last_col:
+            last_col = column_number(last_col)
+            last_row = int(last_row) if last_row else None
+        else:
+            last_col = first_col
+            last_row = first_row
+        return sheet, first_col, first_row, last_col, last_row
+
+    def argument(self, text):
+        # the value a lookup is for - a literal or a cell of the tracker records
+        if text.startswith('"') or text[:1].isdigit() or text[:1] == '-':
+            return True, formula_value(text)
+        sheet, column, row, last_col, last_row = self.parse_range(text)
+        index = row - self.first_row
+        if sheet != self.tracker_sheet or last_col != column or last_row != row or not 0 <= index < len(self.tracker_rows) or column > tracker_max_col:
+            return False, None
+        value = self.tracker_rows[index][column]
+        if type(value) is str and value.startswith('='):
+            return False, None
+        return True, value
+
+    def match(self, sheet, column, first_row, last_row, value):
+        # the row holding value in a column range of a sheet, or None - the first one if it is there more than once, the same as MATCH
+        rows = self.sheet_rows(sheet)
+        if rows is None:
+            return None
+        index_key = (sheet, column, first_row, last_row)
+        index = self.indexes.get(index_key)
+        if index is None:
+            index = {}
+            for row_number, values in enumerate(rows[first_row - 1:last_row], first_row):
+                if column <= len(values) and values[column - 1] is not None:
+                    index.setdefault(lookup_key(values[column - 1]), row_number)
+            self.indexes[index_key] = index
+        return index.get(lookup_key(value))
+
+    def cell(self, sheet, column, row):
+        rows = self.sheet_rows(sheet)
+        values = rows[row - 1] if rows is not None and row <= len(rows) else ()
+        return values[column - 1] if column <= len(values) else None
+
+    def resolve(self, text):
+        vlookup = vlookup_formula.fullmatch(text)
+        index_match = None if vlookup else index_match_formula.fullmatch(text)
+        if vlookup:
+            iferror, argument, table, result_col, fallback = vlookup.groups()
+            sheet, first_col, first_row, last_col, last_row = self.parse_range(table)
+            result_col = first_col + int(result_col) - 1
+            if result_col > last_col:
+                return False, None
+            key_col, result_row_offset = first_col, 0
+        elif index_match:
+            iferror, result_range, argument, match_range, result_col, fallback = index_match.groups()
+            sheet, first_col, first_row, last_col, last_row = self.parse_range(match_range)
+            result_sheet, result_first_col, result_first_row, result_last_col, result_last_row = self.parse_range(result_range)
+            if first_col != last_col or result_sheet != sheet:
+                return False, None
+            key_col = first_col
+            result_col = result_first_col + (int(result_col) - 1 if result_col else 0)
+            result_row_offset = result_first_row - first_row
+        else:
+            return False, None
+        if bool(iferror) != bool(fallback):
+            return False, None
+
+        found, value = self.argument(argument)
+        if not found:
+            return False, None
+        row = self.match(sheet, key_col, first_row, last_row, value)
+        if row is None:
+            # not found is #N/A in Excel - the fallback if there is one, otherwise the formula is left for the row checks to report
+            return (True, formula_value(fallback)) if fallback else (False, None)
+        return True, self.cell(sheet, result_col, row + result_row_offset)
+
+
+def resolve_formulas(tracker_filepath, tracker_rows, formula_cells, first_row=3):
+
+    # Function to replace the formula cells of the tracker records with their values and return the records
+    # formula_cells is a list of (record index, column) - each takes the value Excel cached in the file when it was last saved,
+    # or if it has none (saved by something that doesn't calculate) the value FormulaResolver works out for VLOOKUP and INDEX-MATCH
+    # Formulas that can't be resolved keep their text so the row checks report them as before
+
+    import openpyxl
+
+    tracker_wb_obj = openpyxl.load_workbook(tracker_filepath, read_only=True, data_only=True)
+    try:
+        tracker_sheet_obj = tracker_wb_obj.active
+        # only the block of rows and columns holding formulas is read - openpyxl stops at max_row and builds no cells outside the columns
+        formula_rows = {index for index, column in formula_cells}
+        first_formula_row = min(formula_rows)
+        last_formula_row = max(formula_rows)
+        first_formula_col = min(column for index, column in formula_cells)
+        last_formula_col = max(column for index, column in formula_cells)
+        cached_rows = {}
+        for index, values in enumerate(tracker_sheet_obj.iter_rows(min_row=first_row + first_formula_row, max_row=first_row + last_formula_row,
+                                                                   min_col=first_formula_col, max_col=last_formula_col, values_only=True),
+                                       first_formula_row):
+            if index in formula_rows:
+                cached_rows[index] = values
+
+        records = {}
+        unresolved = []
+        for index, column in formula_cells:
+            values = cached_rows.get(index, ())
+            offset = column - first_formula_col
+            value = values[offset] if offset < len(values) else None
+            if value is None:
+                unresolved.append((index, column))
+                continue
+            records.setdefault(index, list(tracker_rows[index]))[column] = value
+            run_stats.count('formula cells cached')
+
+        if unresolved:
+            # the cached values go in first so a formula can look up by a cell that is itself a formula
+            tracker_rows = [tuple(records[index]) if index in records else tracker_rec for index, tracker_rec in enumerate(tracker_rows)]
+            resolver = FormulaResolver(tracker_wb_obj, tracker_sheet_obj.title, tracker_rows, first_row)
+            for index, column in unresolved:
+                resolved, value = resolver.resolve(tracker_rows[index][column])
+                if resolved:
+                    records.setdefault(index, list(tracker_rows[index]))[column] = value
+                run_stats.count('formula cells resolved' if resolved else 'formula cells unresolved')
+    finally:
+        tracker_wb_obj.close()
+
+    return [tuple(records[index]) if index in records else tracker_rec for index, tracker_rec in enumerate(tracker_rows)]
+
+
+def tracker_cache_key(tracker_filepath):
+
+    # Function to return the sha256 of the tracker file - the cache is keyed by content so a copy or touch of the file still hits
+
+    digest = hashlib.sha256()
+    with open(tracker_filepath, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def save_tracker_cache(cache_filepath, tracker_rows, first_row=3):
+
+    # Function to save the tracker records column by column with marshal - one list per column loads far faster than a list per row
+    # Cells marshal can't hold (dates and times) are saved as (type name, text) and the columns holding them are listed so only
+    # those are converted back. The file is written alongside and then renamed so an interrupted run can't leave a half written cache
+
+    columns = [list(column) for column in zip(*tracker_rows)][1:] if tracker_rows else [[] for _ in range(tracker_max_col)]
+    converted = []
+    for number, column in enumerate(columns):
+        for index, value in enumerate(column):
+            if value is not None and type(value) not in (str, int, float, bool):
+                if type(value).__name__ == 'timedelta':
+                    column[index] = ('timedelta', value.total_seconds())
+                else:
+                    column[index] = (type(value).__name__, value.isoformat())
+                if not converted or converted[-1] != number:
+                    converted.append(number)
+
+    os.makedirs(os.path.dirname(cache_filepath) or '.', exist_ok=True)
+    with open(cache_filepath + '.tmp', 'wb') as f:
+        marshal.dump((tracker_cache_format, first_row, tracker_max_col, len(tracker_rows), converted, columns), f)
+    os.replace(cache_filepath + '.tmp', cache_filepath)
+
+
+def load_tracker_cache(cache_filepath, first_row=3):
+
+    # Function to return the tracker records saved by save_tracker_cache, or None if there is no cache for this layout
+
+    import datetime as datetime_types
+
+    try:
+        with open(cache_filepath, 'rb') as f:
+            # marshal.load reads a file a few bytes at a time - reading it whole first is ten times faster
+            cache_format, cache_first_row, cache_max_col, row_count, converted, columns = marshal.loads(f.read())
+    except (FileNotFoundError, EOFError, ValueError, TypeError):
+        return None
+    if (cache_format, cache_first_row, cache_max_col) != (tracker_cache_format, first_row, tracker_max_col):
+        return None
+
+    from_text = {'datetime': datetime_types.datetime.fromisoformat, 'date': datetime_types.date.fromisoformat,
+                 'time': datetime_types.time.fromisoformat, 'timedelta': lambda seconds: datetime_types.timedelta(seconds=seconds)}
+    for number in converted:
+        columns[number] = [from_text[value[0]](value[1]) if type(value) is tuple else value for value in columns[number]]
+    return list(zip(range(first_row, first_row + row_count), *columns))
+
+
+def read_tracker_cached(tracker_filepath, cache_dir):
+
+    # Function to read the tracker sheet from the tracker cache if it holds this version of the file, otherwise read the sheet and
+    # add it to the cache - returns (tracker records, True if they came from the cache)
+    # Only the newest tracker_cache_entries versions are kept
+
+    cache_filepath = os.path.join(cache_dir, tracker_cache_key(tracker_filepath) + '.bin')
+    tracker_rows = load_tracker_cache(cache_filepath)
+    if tracker_rows is not None:
+        return tracker_rows, True
+
+    tracker_rows = read_tracker(tracker_filepath)
+    try:
+        save_tracker_cache(cache_filepath, tracker_rows)
+        entries = sorted(tracker_cache_entries_list(cache_dir), key=lambda entry: entry[2], reverse=True)
+        for entry_filepath, size, modified in entries[tracker_cache_entries:]:
+            os.remove(entry_filepath)
+    except OSError as error:
+        # the cache only saves time - a run carries on without it
+        print(f'Warning: the tracker cache could not be saved - {error}')
+    return tracker_rows, False
+
+
+def tracker_cache_entries_list(cache_dir):
+
+    # Function to return (file path, size, modified time) for each file in the tracker cache
+
+    try:
+        names = [name for name in os.listdir(cache_dir) if name.endswith('.bin')]
+    except FileNotFoundError:
+        return []
+    entries = []
+    for name in names:
+        stat = os.stat(os.path.join(cache_dir, name))
+        entries.append((os.path.join(cache_dir, name), stat.st_size, stat.st_mtime))
+    return entries
+
+
+def tracker_cache_stats(cache_dir, tracker_filepath):
+
+    # Function to print what the tracker cache holds and whether it has the current version of the tracker sheet
+
+    entries = sorted(tracker_cache_entries_list(cache_dir), key=lambda entry: entry[2], reverse=True)
+    try:
+        current_key = tracker_cache_key(tracker_filepath)
+    except FileNotFoundError:
+        current_key = None
+    print('-' * 80)
+    print(f'Tracker cache:   {os.path.abspath(cache_dir)}')
+    print(f'Entries:         {len(entries)} ({sum(entry[1] for entry in entries) / 1024:.1f} KB)')
+    for entry_filepath, size, modified in entries:
+        key = os.path.basename(entry_filepath)[:-4]
+        try:
+            with open(entry_filepath, 'rb') as f:
+                cache_format, first_row, max_col, row_count, converted, columns = marshal.loads(f.read())
+            layout = f'{row_count} rows, columns A-{column_letter(max_col)}'
+            if (cache_format, max_col) != (tracker_cache_format, tracker_max_col):
+                layout = layout + ' (old layout - not used)'
+        except (EOFError, ValueError, TypeError):
+            layout = 'unreadable - not used'
+        current = ' <- current tracker' if key == current_key else ''
+        print(f'  {key[:16]}  {datetime.fromtimestamp(modified).strftime("%Y-%m-%d %H:%M:%S")}  {size / 1024:8.1f} KB  {layout}{current}')
+    print('-' * 80 + '\n')
+
+
+def tracker_cache_clear(cache_dir):
+
+    # Function to delete every tracker cache entry and return how many were removed
+
+    entries = tracker_cache_entries_list(cache_dir)
+    for entry_filepath, size, modified in entries:
+        os.remove(entry_filepath)
+    return len(entries)
+
+class DeviceRow:
+
+    # One vManage device row with a fixed schema - a slot for every template variable in keys, held as a list in keys order
+    # Values are set and read by column name e.g. device['System IP'] = '10.1.1.1'
+    # values is the list transform_row builds from the compiled mapping, which has a rule for every key so no column can be missed
+    # postcode is carried with the row (it is not a csv column) so the GPS columns can be filled in after the lookups
+
+    __slots__ = ('values', 'postcode')
+
+    def __init__(self, values, postcode=None):
+        self.values = values
+        self.postcode = postcode
+
+    def __setitem__(self, key, value):
+        self.values[key_index[key]] = value
+
+    def __getitem__(self, key):
+        return self.values[key_index[key]]
+
+
+def write_device_rows(csv_filepath, device_rows):
+
+    # Function to write the device rows to the vManage import csv one row at a time with csv.writer
+    # The output matches what pandas to_csv produced - keys as the header, empty fields for None and minimal quoting
+    # Host names are checked as each row is written - returns a list of (row index, host name) for host names containing spaces
+
+    invalid_hosts = []
+    host_name_col = key_index['Host Name']
+
+    with open(csv_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerow(keys)
+        for row_index, device in enumerate(device_rows):
+            if ' ' in str(device.values[host_name_col]):
+                invalid_hosts.append((row_index, device.values[host_name_col]))
+            csv_writer.writerow(device.values)
+
+    return invalid_hosts
+
+
+def read_csv_rows(csv_filepath):
+
+    # Function to return the rows of a csv file as lists of fields - an empty list if the file doesn't exist
+    # The file is parsed with csv.reader so a quoted field holding a comma or a line break stays in its row
+
+    try:
+        with open(csv_filepath, 'r', newline='', encoding='utf-8') as csv_file:
+            return list(csv.reader(csv_file))
+    except FileNotFoundError:
+        return []
+
+
+def device_row_delta(old_rows, new_rows):
+
+    # Function to compare two vManage import csvs by Device ID and return (added, changed, removed)
+    # Both csvs are rows of fields (see read_csv_rows) - added and changed are the new rows in their csv order and removed the old rows
+    # of devices no longer in the new csv
+    # Rows are compared as tuples through sets (hashed) so 20k devices take a few ms - a device listed more than once
+    # is changed if any of its rows is not in the old csv. If the header is different (a --mapping with other keys) every device
+    # in both csvs counts as changed
+
+    def device_ids(rows):
+        header = rows[0] if rows else []
+        if 'Device ID' not in header:
+            return header, []
+        id_col = header.index('Device ID')
+        return header, [fields[id_col] if len(fields) > id_col else '' for fields in rows[1:]]
+
+    old_header, old_ids = device_ids(old_rows)
+    new_header, new_ids = device_ids(new_rows)
+    same_layout = old_header == new_header
+
+    old_devices = {}
+    for device_id, fields in zip(old_ids, old_rows[1:]):
+        old_devices.setdefault(device_id, set()).add(tuple(fields))
+
+    added = []
+    changed = []
+    new_devices = set(new_ids)
+    for device_id, fields in zip(new_ids, new_rows[1:]):
+        old_device = old_devices.get(device_id)
+        if old_device is None:
+            added.append(fields)
+        elif not same_layout or tuple(fields) not in old_device:
+            changed.append(fields)
+    removed = [fields for device_id, fields in zip(old_ids, old_rows[1:]) if device_id not in new_devices]
+    return added, changed, removed
+
+
+def write_device_delta(delta_filepath, removed_filepath, old_rows, new_rows):
+
+    # Function to write the devices added or changed since the last vManage import csv to the delta csv, ready to import on their own,
+    # and the devices no longer in the tracker to the removed csv (Device ID and Host Name) - returns (added, changed, removed) counts
+
+    added, changed, removed = device_row_delta(old_rows, new_rows)
+    delta = {tuple(fields) for fields in added + changed}
+    with open(delta_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerows(new_rows[:1] + [fields for fields in new_rows[1:] if tuple(fields) in delta])
+
+    old_header = old_rows[0] if old_rows else []
+    columns = [old_header.index(key) for key in ('Device ID', 'Host Name') if key in old_header]
+    with open(removed_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerow(['Device ID', 'Host Name'])
+        for fields in removed:
+            csv_writer.writerow([fields[column] if len(fields) > column else '' for column in columns])
+    return len(added), len(changed), len(removed)
+
+
+def shard_name(device, shard_keys, site_range):
+
+    # Function to return the shard a device row belongs to for a list of shard keys e.g. ['store-type', 'role'] -> 'type3-R1'
+    #   store-type - the store type, the first digit of the 5 digit Site Id
+    #   site-range - the block of site_range Site Ids the site is in
+    #   role       - R1 or R2 from the end of the host name
+
+    parts = []
+    for shard_key in shard_keys:
+        if shard_key == 'store-type':
+            parts.append(f'type{int(device["Site Id"]) // 10000}')
+        elif shard_key == 'site-range':
+            first_site = int(device['Site Id']) // site_range * site_range
+            parts.append(f'sites{first_site}-{first_site + site_range - 1}')
+        elif shard_key == 'role':
+            parts.append(str(device['Host Name']).rsplit('-', 1)[-1])
+    return '-'.join(parts) or 'all'
+
+
+def write_device_shards(shard_dir, device_rows, shard_keys, max_rows, site_range, workers):
+
+    # Function to split the device rows into shards of at most max_rows rows by shard_name and write each one as a vManage import csv
+    # with a manifest listing the rows and sha256 of every shard - a shard can then be imported, checked and retried on its own
+    # The shards are written concurrently, each to a temporary file renamed into place once complete, and the manifest last, so a
+    # manifest only ever lists whole shards. Shards listed by the last manifest and not written this time are deleted
+    # Returns the manifest
+
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    shards = {}
+    for device in device_rows:
+        shards.setdefault(shard_name(device, shard_keys, site_range), []).append(device)
+    shard_files = []
+    for name, devices in sorted(shards.items()):
+        # a shard over max_rows is split into equal parts rather than full parts and a short one
+        parts = -(-len(devices) // max_rows)
+        part_rows = -(-len(devices) // parts)
+        for part, start in enumerate(range(0, len(devices), part_rows), 1):
+            file_name = f'vmanage-import-sc-{name}.csv' if parts == 1 else f'vmanage-import-sc-{name}-{part}.csv'
+            shard_files.append((file_name, name, devices[start:start + part_rows]))
+
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest_filepath = os.path.join(shard_dir, 'manifest.json')
+    try:
+        with open(manifest_filepath, 'r') as f:
+            old_files = [shard['file'] for shard in json.load(f).get('shards', [])]
+    except (FileNotFoundError, ValueError):
+        old_files = []
+
+    count_lock = threading.Lock()
+
+    def write_shard(shard_file):
+        file_name, name, devices = shard_file
+        shard_filepath = os.path.join(shard_dir, file_name)
+        write_device_rows(shard_filepath + '.tmp', devices)
+        digest = hashlib.sha256()
+        with open(shard_filepath + '.tmp', 'rb') as f:
+            digest.update(f.read())
+        os.replace(shard_filepath + '.tmp', shard_filepath)
+        with count_lock:
+            run_stats.count('shards written')
+        return {'file': file_name, 'shard': name, 'rows': len(devices), 'bytes': os.path.getsize(shard_filepath), 'sha256': digest.hexdigest(),
+                'first_host': devices[0]['Host Name'], 'last_host': devices[-1]['Host Name']}
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        written = list(executor.map(write_shard, shard_files))
+
+    manifest = {'created': datetime.now().isoformat(timespec='seconds'), 'shard_keys': shard_keys, 'max_rows': max_rows,
+                'devices': len(device_rows), 'shards': written}
+    with open(manifest_filepath + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_filepath + '.tmp', manifest_filepath)
+
+    for file_name in set(old_files) - {shard['file'] for shard in written}:
+        try:
+            os.remove(os.path.join(shard_dir, file_name))
+        except FileNotFoundError:
+            pass
+    return manifest
+
+
+def vmanage_session(vmanage, username, password, workers, verify=True):
+
+    # Function to log in to vManage and return a requests session with a connection pool large enough for every worker thread
+    # vManage keeps the login in the JSESSIONID cookie and wants the XSRF token from /dataservice/client/token on every request
+    # GETs refused because vManage is busy (429) or failing (5xx) are retried with a backoff - an attach (POST) is never resent
+
+    import requests
+    from urllib3.util.retry import Retry
+
+    session = requests.Session()
+    session.verify = verify
+    retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=workers, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    try:
+        # a failed login still returns 200 but with the html login page
+        login = session.post(f'{vmanage}/j_security_check', data={'j_username': username, 'j_password': password})
+        if login.status_code != 200 or b'<html' in login.content.lower():
+            print('*' * 120, f'\nError: vManage login to {vmanage} failed - check the username and password\n', '*' * 120)
+            sys.exit(1)
+        token = session.get(f'{vmanage}/dataservice/client/token')
+        if token.status_code == 200 and token.text:
+            session.headers['X-XSRF-TOKEN'] = token.text
+    except requests.exceptions.ConnectionError:
+        print('*' * 120, f'\nError: Connection error connecting to {vmanage}\n', '*' * 120)
+        sys.exit(1)
+    return session
+
+
+def vmanage_template(session, vmanage, template):
+
+    # Function to return the id of a device template given its name or id, and the property name of each of its variables
+    # The import sheet columns are matched to the variables by property name, by title e.g. 'Host Name' or by the variable name
+    # in brackets at the end of a title e.g. 'IPv4 Address(vlan31_ipv4)' - returns (template id, {column: property})
+
+    import requests
+
+    try:
+        r = session.get(f'{vmanage}/dataservice/template/device')
+        r.raise_for_status()
+        template_ids = [item['templateId'] for item in r.json()['data'] if template in (item['templateId'], item['templateName'])]
+        if not template_ids:
+            print('*' * 120, f'\nError: there is no device template {template} in vManage\n', '*' * 120)
+            sys.exit(1)
+        template_id = template_ids[0]
+
+        r = session.post(f'{vmanage}/dataservice/template/device/config/input',
+                         json={'templateId': template_id, 'deviceIds': [], 'isEdited': False, 'isMasterEdited': False})
+        r.raise_for_status()
+        columns = r.json()['header']['columns']
+    except requests.exceptions.ConnectionError:
+        print('*' * 120, f'\nError: Connection error connecting to {vmanage}\n', '*' * 120)
+        sys.exit(1)
+    except (requests.RequestException, KeyError, ValueError) as error:
+        print('*' * 120, f'\nError: device template {template} could not be read from {vmanage} - {error}\n', '*' * 120)
+        sys.exit(1)
+
+    properties = {}
+    for column in columns:
+        title = column.get('title', '')
+        names = [column['property'], title]
+        if title.endswith(')') and '(' in title:
+            names.append(title[title.rindex('(') + 1:-1])
+        for name in names:
+            properties.setdefault(name, column['property'])
+    return template_id, {key: properties[key] for key in keys if key in properties}
+
+
+def vmanage_attach(session, vmanage, template_id, devices):
+
+    # Function to attach one batch of devices to a device template and wait for the attach task to finish
+    # devices is a list of attach entries (see push_device_rows) - returns a (host name, status, detail) for each device in the same order
+    # The task is polled after 1, 2, 4 ... seconds up to every vmanage_poll_interval seconds - the other batches carry on in the meantime
+
+    import requests
+
+    host_names = [device['csv-host-name'] for device in devices]
+    payload = {'deviceTemplateList': [{'templateId': template_id, 'device': devices, 'isEdited': False, 'isMasterEdited': False}]}
+    try:
+        r = session.post(f'{vmanage}/dataservice/template/device/config/attachfeature', json=payload)
+        r.raise_for_status()
+        action_id = r.json()['id']
+
+        deadline = time.monotonic() + vmanage_task_timeout
+        poll_delay = 1
+        while True:
+            r = session.get(f'{vmanage}/dataservice/device/action/status/{action_id}')
+            r.raise_for_status()
+            task = r.json()
+            if task.get('summary', {}).get('status') == 'done':
+                break
+            if time.monotonic() > deadline:
+                return [(host_name, 'Timeout', f'attach task {action_id} still running after {vmanage_task_timeout} seconds') for host_name in host_names]
+            time.sleep(poll_delay)
+            poll_delay = min(poll_delay * 2, vmanage_poll_interval)
+    except (requests.RequestException, KeyError, ValueError) as error:
+        return [(host_name, 'Failure', f'attach request failed - {error}') for host_name in host_names]
+
+    # the task lists a result per device - matched up by device id as a store can appear more than once in the tracker
+    task_results = {}
+    for item in task.get('data', []):
+        activity = item.get('activity') or ['']
+        task_results.setdefault(item.get('deviceID'), []).append((item.get('status'), activity[-1]))
+    results = []
+    for device in devices:
+        device_results = task_results.get(device['csv-deviceId'])
+        status, detail = device_results.pop(0) if device_results else ('Failure', 'not in the attach task result')
+        results.append((device['csv-host-name'], status, detail))
+    return results
+
+
+def push_device_rows(device_rows, vmanage, template, username, password, batch_size, workers, verify=True):
+
+    # Function to attach the device rows to a vManage device template - the same rows as the import csv, without the manual upload
+    # The rows are sent in batches of batch_size devices over one logged in session, with up to workers attach tasks in flight at once
+    # Returns a (host name, status, detail) for each device row in the same order - status is 'Success' for each device attached
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    with vmanage_session(vmanage, username, password, workers, verify) as session:
+        template_id, properties = vmanage_template(session, vmanage, template)
+        unmatched = [key for key in keys if key not in properties]
+        if unmatched:
+            print(f'Warning: import sheet columns that are not variables of template {template} - not sent: {", ".join(unmatched)}\n')
+
+        attach_devices = []
+        for device in device_rows:
+            attach_device = {'csv-status': 'complete', 'csv-templateId': template_id}
+            for key, value in zip(keys, device.values):
+                if key in properties:
+                    attach_device[properties[key]] = '' if value is None else str(value)
+            attach_device['csv-deviceId'] = device['Device ID']
+            attach_device['csv-deviceIP'] = device['System IP']
+            attach_device['csv-host-name'] = device['Host Name']
+            attach_devices.append(attach_device)
+        batches = [attach_devices[batch_start:batch_start + batch_size] for batch_start in range(0, len(attach_devices), batch_size)]
+
+        results = []
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map returns the batch results in the order they were submitted
+            for batch_results in executor.map(lambda batch: vmanage_attach(session, vmanage, template_id, batch), batches):
+                results.extend(batch_results)
+
+    run_stats.count('vmanage attach requests', len(batches))
+    return results
+
+
+def subnet_entry(vlan, network):
+
+    # Function to return a subnet as (vlan, subnet, first address, last address) for the duplicate check
+    # The addresses are plain integers so the check can compare ranges without building network objects again
+
+    first = network.network
+    return (vlan, f'{ip_str(first)}/{network.prefixlen}', first, first | (0xFFFFFFFF >> network.prefixlen))
+
+
+def find_subnet_conflicts(subnet_entries):
+
+    # Function to find every pair of subnets that overlap - exact duplicates and a subnet inside another one
+    # subnet_entries is a list of (first address, last address, store_num, tracker_row, vlan, subnet) with the addresses as integers
+    # Returns a list of (outer, inner) entry pairs where inner falls inside (or is the same as) outer
+    #
+    # CIDR blocks either nest or don't overlap at all, so once they are sorted by first address (larger block first)
+    # the blocks containing the current one are exactly those still open on a stack - sorting is O(n log n) and
+    # the sweep is one push and pop per block plus one step per conflict found
+
+    conflicts = []
+    open_blocks = []
+    for entry in sorted(subnet_entries, key=lambda entry: (entry[0], -entry[1])):
+        # close the blocks that end before this one starts
+        while open_blocks and open_blocks[-1][1] < entry[0]:
+            open_blocks.pop()
+        for outer in open_blocks:
+            conflicts.append((outer, entry))
+        open_blocks.append(entry)
+    return conflicts
+
+
+def subnet_conflict_messages(subnet_entries):
+
+    # Function to check the globally significant subnets of every store and return a warning for each conflict
+    # Each conflict is reported against the later tracker row, in tracker row order, and a subnet used several times is
+    # reported once per later use against its first use - VLANs that share address space within a store by design are skipped
+
+    conflicts = find_subnet_conflicts(subnet_entries)
+    conflicts = [(outer, inner) if outer[3] <= inner[3] else (inner, outer) for outer, inner in conflicts
+                 if outer[3] != inner[3] or frozenset((outer[4], inner[4])) not in store_vlan_overlaps]
+    conflicts.sort(key=lambda conflict: (conflict[1][3], conflict[0][3]))
+
+    messages = []
+    reported_duplicates = set()
+    for earlier, later in conflicts:
+        if earlier[0] == later[0] and earlier[1] == later[1]:
+            if later in reported_duplicates:
+                continue
+            reported_duplicates.add(later)
+            messages.append(f'Error: ***WARNING*** Duplicate subnet {later[5]} found for store {later[2]} row {later[3]} {later[4]}'
+                            f' - already used by store {earlier[2]} row {earlier[3]} {earlier[4]}  ... Please correct and re-run')
+        else:
+            messages.append(f'Error: ***WARNING*** Overlapping subnet {later[5]} for store {later[2]} row {later[3]} {later[4]}'
+                            f' overlaps {earlier[5]} for store {earlier[2]} row {earlier[3]} {earlier[4]}  ... Please correct and re-run')
+    return messages
+
+
+def summarise_ranges(first, last, waste=0.0, min_prefix=8):
+
+    # Function to summarise a set of address ranges into CIDR blocks
+    # first and last are sequences of the first and last address of each range as integers - the ranges may overlap, nest or touch
+    # Returns numpy arrays (network, prefix length, addresses covered) of the blocks in address order - with waste 0 they are the
+    # smallest set of blocks covering exactly the same addresses, otherwise a block may also cover up to that fraction of unused addresses
+    #
+    # Everything is done on whole arrays so 100k ranges take a few tens of ms rather than the seconds ipaddress.collapse_addresses needs:
+    #   sort and merge the ranges into disjoint runs - a run ends where the next range starts after the furthest end seen so far (+1)
+    #   split every run into aligned blocks together - each pass takes the largest block that is aligned at the start of each run and
+    #   fits inside it, so it finishes in at most 64 passes however many runs there are
+    #   for waste over 0, join blocks into their parent one prefix length at a time (longest first) where the blocks inside the parent
+    #   cover enough of it - no join is made above min_prefix
+
+    import numpy as np
+
+    first = np.asarray(first, dtype=np.int64)
+    last = np.asarray(last, dtype=np.int64)
+    if not len(first):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    order = np.argsort(first, kind='stable')
+    first = first[order]
+    last = np.maximum.accumulate(last[order])
+    run_start = np.concatenate(([True], first[1:] > last[:-1] + 1))
+    run_end = np.concatenate((run_start[1:], [True]))
+    start = first[run_start]
+    end = last[run_end] + 1
+
+    networks = []
+    sizes = []
+    while len(start):
+        aligned = start & -start
+        aligned[start == 0] = 1 << 32
+        remaining = end - start
+        fits = np.left_shift(1, np.floor(np.log2(remaining)).astype(np.int64))
+        # log2 is a float - step over any rounding at the edges of a power of two
+        fits = np.where(fits * 2 <= remaining, fits * 2, np.where(fits > remaining, fits // 2, fits))
+        size = np.minimum(aligned, fits)
+        networks.append(start)
+        sizes.append(size)
+        start = start + size
+        open_runs = start < end
+        start = start[open_runs]
+        end = end[open_runs]
+
+    network = np.concatenate(networks)
+    size = np.concatenate(sizes)
+    order = np.argsort(network, kind='stable')
+    network = network[order]
+    covered = size[order]
+    prefixlen = 32 - np.log2(covered).round().astype(np.int64)
+
+    if waste > 0:
+        for parent_prefix in range(31, min_prefix - 1, -1):
+            children = prefixlen > parent_prefix
+            if children.sum() < 2:
+                continue
+            child_index = np.flatnonzero(children)
+            parent = network[child_index] >> (32 - parent_prefix)
+            group_start = np.concatenate(([True], parent[1:] != parent[:-1]))
+            group_index = np.flatnonzero(group_start)
+            group_covered = np.add.reduceat(covered[child_index], group_index)
+            group_count = np.diff(np.append(group_index, len(child_index)))
+            join = (group_count > 1) & (group_covered >= (1 - waste) * (1 << (32 - parent_prefix)))
+            if not join.any():
+                continue
+            # the first child of each joined group becomes the parent and the rest are dropped
+            joined = np.repeat(join, group_count)
+            keep = np.ones(len(network), dtype=bool)
+            keep[child_index[joined & ~group_start]] = False
+            first_child = child_index[group_index[join]]
+            network[first_child] = parent[group_index[join]] << (32 - parent_prefix)
+            prefixlen[first_child] = parent_prefix
+            covered[first_child] = group_covered[join]
+            network = network[keep]
+            prefixlen = prefixlen[keep]
+            covered = covered[keep]
+    return network, prefixlen, covered
+
+
+def write_route_summary(csv_filepath, subnet_entries, waste, min_prefix):
+
+    # Function to summarise the generated store subnets of each VRF and write them as a route and ACL list
+    # subnet_entries is the duplicate check list of (first address, last address, store_num, tracker_row, vlan, subnet) - the VLANs
+    # in summary_vrfs are summarised and the rest are left out
+    # Each summary is written with its mask for a route and its wildcard for an ACL and how many subnets and addresses it covers
+    # Returns a dictionary of vrf -> (subnets, summaries)
+
+    import numpy as np
+
+    vrf_entries = {}
+    for entry in subnet_entries:
+        vrf = summary_vrfs.get(entry[4])
+        if vrf is not None:
+            vrf_entries.setdefault(vrf, []).append(entry)
+
+    vrf_counts = {}
+    with open(csv_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerow(['VRF', 'Summary', 'Network', 'Mask', 'Wildcard', 'Subnets', 'Addresses Used', 'Unused %'])
+        for vrf, entries in sorted(vrf_entries.items()):
+            first = np.fromiter((entry[0] for entry in entries), dtype=np.int64, count=len(entries))
+            last = np.fromiter((entry[1] for entry in entries), dtype=np.int64, count=len(entries))
+            network, prefixlen, covered = summarise_ranges(first, last, waste, min_prefix)
+            # count the subnets starting inside each summary - they are sorted so each summary is a slice of them
+            first.sort()
+            subnet_counts = np.diff(np.searchsorted(first, np.append(network, 1 << 32)))
+            for summary, prefix, used, subnets in zip(network.tolist(), prefixlen.tolist(), covered.tolist(), subnet_counts.tolist()):
+                mask = (0xFFFFFFFF << (32 - prefix)) & 0xFFFFFFFF
+                unused = 100 * (1 - used / (1 << (32 - prefix)))
+                csv_writer.writerow([vrf, f'{ip_str(summary)}/{prefix}', ip_str(summary), ip_str(mask), ip_str(mask ^ 0xFFFFFFFF),
+                                     subnets, used, f'{unused:.1f}'])
+            vrf_counts[vrf] = (len(entries), len(network))
+    return vrf_counts
+
+
+# names a mapping rule can use - the row values transform_row derives (the vlan names are IPv4Net store networks) and the helper functions
+mapping_names = ('tracker_row', 'store_num', 'store_type', 'site_id', 'postcode', 'dual_router', 'provision_port_disable', 'cctv_nat',
+                 'router1_serial', 'router1_systemip', 'router1_hostname', 'router1_wan_color',
+                 'router1_static_wan_ip', 'router1_static_wan_gw', 'router1_static_wan_mask',
+                 'circuit1_provider', 'circuit1_type', 'circuit1_ref', 'circuit1_bw_up', 'circuit1_bw_down', 'circuit1_ppp_name', 'circuit1_ppp_pwd', 'interface1',
+                 'router2_serial', 'router2_systemip', 'router2_hostname', 'router2_wan_color',
+                 'router2_static_wan_ip', 'router2_static_wan_gw', 'router2_static_wan_mask',
+                 'circuit2_provider', 'circuit2_type', 'circuit2_ref', 'circuit2_bw_up', 'circuit2_bw_down', 'circuit2_ppp_name', 'circuit2_ppp_pwd', 'interface2',
+                 'vlan2', 'vlan10', 'vlan20', 'vlan30', 'vlan31', 'vlan40', 'vlan60', 'vlan70', 'vlan80', 'vlan100', 'vlan101', 'vlan120')
+
+def kbps(mbps):
+
+    # Function to convert a bandwidth in Mbps to the whole kbps vManage expects - a mapping rule helper
+
+    return int(mbps * 1000)
+
+mapping_helpers = {'ip': ip_str, 'kbps': kbps, 'int': int, 'str': str}
+mapping_attributes = ('network', 'netmask', 'broadcast', 'prefixlen')
+mapping_nodes = ('Expression', 'JoinedStr', 'FormattedValue', 'Constant', 'Name', 'Load', 'Attribute', 'Subscript', 'Call', 'IfExp',
+                 'Compare', 'Eq', 'NotEq', 'Lt', 'LtE', 'Gt', 'GtE', 'In', 'NotIn', 'BoolOp', 'And', 'Or', 'UnaryOp', 'Not', 'USub',
+                 'BinOp', 'Add', 'Sub', 'Mult', 'FloorDiv', 'Mod')
+
+transform_plan = None  # device row builders compiled from the mapping on first use by compile_transform_plan
+custom_mapping = None  # the --mapping file once applied by apply_mapping
+
+def compile_rule(device, key, rule):
+
+    # Function to return one mapping rule as a checked Python expression tree
+    # A rule is a constant (number, true/false, null) or a string - text with {expression} fields in the same form as an f-string,
+    # e.g. '{ip(vlan31.network + 7)}-{ip(vlan31[-2])}'. A rule that is a single field gives the value itself rather than its text
+    # Expressions are limited to the mapping names, their store network attributes, arithmetic, comparisons and the helper functions
+
+    import ast
+
+    if not isinstance(rule, str):
+        if rule is not None and not isinstance(rule, (int, float, bool)):
+            raise ValueError(f'{device} rule for {key} must be a string, number, true/false or null')
+        return ast.Constant(rule)
+
+    try:
+        tree = ast.parse('f' + repr(rule), mode='eval')
+    except SyntaxError as error:
+        raise ValueError(f'{device} rule for {key} is not a valid template: {rule!r} ({error.msg})')
+
+    for node in ast.walk(tree):
+        node_type = type(node).__name__
+        if node_type not in mapping_nodes:
+            raise ValueError(f'{device} rule for {key} uses {node_type}, which mapping rules do not allow: {rule!r}')
+        if node_type == 'Name' and node.id not in mapping_helpers and node.id not in mapping_names:
+            raise ValueError(f'{device} rule for {key} uses unknown name {node.id}: {rule!r}')
+        elif node_type == 'Attribute' and node.attr not in mapping_attributes:
+            raise ValueError(f'{device} rule for {key} uses unknown attribute {node.attr}: {rule!r}')
+        elif node_type == 'Call' and (not isinstance(node.func, ast.Name) or node.func.id not in mapping_helpers or node.keywords):
+            raise ValueError(f'{device} rule for {key} calls something other than {", ".join(mapping_helpers)}: {rule!r}')
+
+    fields = tree.body.values
+    if len(fields) == 1 and isinstance(fields[0], ast.FormattedValue) and fields[0].conversion == -1 and fields[0].format_spec is None:
+        return fields[0].value
+    if all(isinstance(field, ast.Constant) for field in fields):
+        return ast.Constant(rule.replace('{{', '{').replace('}}', '}'))
+    return tree.body
+
+
+def compile_transform_plan():
+
+    # Function to compile the router1 and router2 rules into the functions transform_row calls to build device rows - returns (router1, router2)
+    # Each builder takes the row values positionally in mapping_names order and returns a single list display in keys order,
+    # so building a row costs one call and no per-key lookups:
+    #   router1(*row) returns the router 1 values - every key must have a rule
+    #   router2(router1_values, *row) returns the router 2 values - keys without a router2 rule take the router 1 value
+    # A field expression used by more than one rule of a device (e.g. the VRRP address is also the DHCP gateway) is worked out once
+    # The plan is compiled once per process and kept in transform_plan
+
+    import ast
+
+    global transform_plan
+
+    for device, rules in (('router1', router1_rules), ('router2', router2_rules)):
+        unknown = [key for key in rules if key not in key_index]
+        if unknown:
+            raise ValueError(f'{device} has rules for keys that are not in keys: {", ".join(unknown)}')
+    missing = [key for key in keys if key not in router1_rules]
+    if missing:
+        raise ValueError(f'router1 has no rule for: {", ".join(missing)}')
+
+    source = []
+    for device, rules in (('router1', router1_rules), ('router2', router2_rules)):
+        expressions = {key: compile_rule(device, key, rule) for key, rule in rules.items()}
+
+        # the field expressions of every rule - a rule that is a single field is its own field
+        fields = []
+        for expression in expressions.values():
+            if isinstance(expression, ast.JoinedStr):
+                fields.extend(field for field in expression.values if isinstance(field, ast.FormattedValue))
+            elif not isinstance(expression, ast.Constant):
+                fields.append(expression)
+        counts = {}
+        for field in fields:
+            field_source = ast.unparse(field.value if isinstance(field, ast.FormattedValue) else field)
+            counts[field_source] = counts.get(field_source, 0) + 1
+        shared = {field_source: f'_field{number}' for number, field_source in enumerate(field_source for field_source, count in counts.items()
+                                                                                      if count > 1 and not field_source.isidentifier())}
+
+        values = []
+        for position, key in enumerate(keys):
+            expression = expressions.get(key)
+            if expression is None:
+                values.append(f'router1_values[{position}]')
+                continue
+            if isinstance(expression, ast.JoinedStr):
+                for field in expression.values:
+                    if isinstance(field, ast.FormattedValue) and ast.unparse(field.value) in shared:
+                        field.value = ast.Name(shared[ast.unparse(field.value)])
+            elif ast.unparse(expression) in shared:
+                expression = ast.Name(shared[ast.unparse(expression)])
+            values.append(ast.unparse(expression))
+
+        params = (['router1_values'] if device == 'router2' else []) + list(mapping_names)
+        lines = [f'def {device}({", ".join(params)}):']
+        lines.extend(f'    {name} = {field_source}' for field_source, name in shared.items())
+        lines.append('    return [\n        ' + ',\n        '.join(values) + ']\n')
+        source.append('\n'.join(lines))
+
+    namespace = dict(mapping_helpers)
+    namespace['__builtins__'] = {}
+    exec(compile('\n'.join(source), '<device mapping>', 'exec'), namespace)
+    transform_plan = (namespace['router1'], namespace['router2'])
+    return transform_plan
+
+
+def column_number(column):
+
+    # Function to return the number of a sheet column letter e.g. 'A' is 1 and 'AB' is 28
+
+    number = 0
+    for letter in column.upper():
+        if not 'A' <= letter <= 'Z':
+            raise ValueError(f'{column!r} is not a column letter')
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def column_letter(number):
+
+    # Function to return the sheet column letter of a column number e.g. 28 is 'AB'
+
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def current_mapping():
+
+    # Function to return the tracker layout and template mapping in use, in the --mapping file format
+
+    return {'columns': {name[:-4]: column_letter(globals()[name]) for name in tracker_columns},
+            'keys': keys,
+            'circuit_bandwidth': {circuit_type: list(bandwidth) for circuit_type, bandwidth in circuit_bandwidths.items()},
+            'router1': router1_rules,
+            'router2': router2_rules}
+
+
+def apply_mapping(mapping):
+
+    # Function to replace the built-in tracker layout and template mapping with a customer mapping - see --mapping and --write-mapping
+    # Each section given replaces the built-in one:
+    #   columns           - tracker column letter for each input e.g. "store_num": "A" (the *_col numbers)
+    #   keys              - the template variables, in csv column order
+    #   circuit_bandwidth - circuit type -> [down Mbps, up Mbps, interface] used when the tracker has no bandwidth
+    #   router1, router2  - key -> rule, see compile_rule
+    # The rules are compiled straight away so a bad mapping is reported before the tracker is read
+    # Also the initializer of transform worker processes, which don't inherit the mapping when they are spawned
+
+    global keys, key_index, circuit_bandwidths, router1_rules, router2_rules, tracker_max_col, custom_mapping
+
+    unknown = [section for section in mapping if section not in ('columns', 'keys', 'circuit_bandwidth', 'router1', 'router2')]
+    if unknown:
+        raise ValueError(f'unknown mapping sections: {", ".join(unknown)}')
+
+    if 'columns' in mapping:
+        columns = {f'{name}_col': column_number(column) for name, column in mapping['columns'].items()}
+        unknown = [name[:-4] for name in columns if name not in tracker_columns]
+        if unknown:
+            raise ValueError(f'unknown tracker columns: {", ".join(unknown)}')
+        globals().update(columns)
+        tracker_max_col = max(globals()[name] for name in tracker_columns)
+    if 'keys' in mapping:
+        keys = list(mapping['keys'])
+        key_index = {key: position for position, key in enumerate(keys)}
+        missing = [key for key in ('Host Name', 'basic_gpsl_latitude', 'basic_gpsl_longitude') if key not in key_index]
+        if missing:
+            raise ValueError(f'keys must include {", ".join(missing)}')
+    if 'circuit_bandwidth' in mapping:
+        circuit_bandwidths = {circuit_type: tuple(bandwidth) for circuit_type, bandwidth in mapping['circuit_bandwidth'].items()}
+    if 'router1' in mapping:
+        router1_rules = mapping['router1']
+    if 'router2' in mapping:
+        router2_rules = mapping['router2']
+
+    compile_transform_plan()
+    custom_mapping = mapping
+
+
+def transform_row(tracker_rec):
+
+    # Function to transform one tracker record into the vManage device rows for that store
+    # Nothing is printed here - the result is a dictionary holding:
+    #   store_num - store number padded to 4 digits
+    #   postcode  - normalised postcode for the GPS lookup
+    #   devices   - one device row per router, each the DeviceRow values list (same order as keys)
+    #   subnets   - the globally significant subnets for the duplicate check, see subnet_entry
+    #   routes    - (label, subnet) for each public subnet that needs a static route on DNAC
+    #   messages  - warnings and errors for this row in the order they were found
+    #   skipped   - why the row was skipped (None if it wasn't) - counted in the run report
+    #   row       - the tracker row the messages name, see move_row_result
+    # A skipped row has no devices - its messages say why
+
+    tracker_row = tracker_rec[0]
+    messages = []
+    row_result = {'store_num': None, 'postcode': None, 'devices': [], 'subnets': [], 'routes': [], 'messages': messages, 'skipped': None,
+                  'row': tracker_row}
+
+    # get the store number and pad to 4 digits
+    store_num = str(tracker_rec[store_num_col]).zfill(4)
+    row_result['store_num'] = store_num
+
+    # if store number is missing skip to next row
+    if store_num == '0000' or store_num == 'None':
+        row_result['skipped'] = 'missing store number'
+        return row_result
+
+    # get the store type
+    store_type = str(tracker_rec[store_type_col]).upper()
+    try:
+        store_type = int(store_type[0])  # first character only
+    except ValueError:
+        messages.append(f'Error: invalid store type for store {store_num} row {tracker_row}  ... skipping to next row')
+        row_result['skipped'] = 'invalid store type'
+        return row_result
+    site_id = f'{store_type}{store_num}'
+
+    # get the postcode - it is looked up once per store after the main loop
+    postcode = normalise_postcode(tracker_rec[postcode_col])
+
+
+    # get router 1 serial number
+    router1_serial = str(tracker_rec[router1_serial_col]).upper()
+    router1_serial = sanatise_serial(router1_serial)
+
+    if router1_serial == 'NONE' or router1_serial == '':
+        #print(f'Error: missing router 1 serial number for store {store_num} row {tracker_row}  ... skipping to next row')
+        row_result['skipped'] = 'missing router 1 serial'
+        return row_result
+  
+    # get circuit 1 type and bandwidth
+    circuit1_type = str(tracker_rec[circuit1_type_col]).upper()
+    circuit1_bw_down = str(tracker_rec[circuit1_bw_down_col])
+    circuit1_bw_up = str(tracker_rec[circuit1_bw_up_col])
+    
+    if circuit1_bw_down == 'None' or circuit1_bw_up == 'None':
+        circuit1_bw_down, circuit1_bw_up, interface1 = circuit_bandwidth(circuit1_type)
+    else:
+        a, b, interface1 = circuit_bandwidth(circuit1_type)
+    
+    circuit1_bw_down = float(circuit1_bw_down)
+    circuit1_bw_up = float(circuit1_bw_up)
+
+    circuit1_ref = str(tracker_rec[circuit1_ref_col]).upper()
+
+    router1_static_wan_ip = 'NONE'
+    router1_static_wan_gw = 'NONE'
+    router1_static_wan_mask = '255.255.255.248'
+    circuit1_wan_subnet = None
+
+    # get static wan IP and subnet if circuit type is ETHERNET
+    if circuit1_type == 'ETHERNET':
+        circuit1_static_wan_ip = str(tracker_rec[circuit1_wan_subnet_col])
+        
+        if '/' not in circuit1_static_wan_ip:
+            circuit1_static_wan_ip = circuit1_static_wan_ip + '/29'
+        
+        circuit1_wan_subnet = IPv4Net.parse(circuit1_static_wan_ip, strict=False)
+
+        router1_static_wan_ip = ip_str(circuit1_wan_subnet.network + 2)
+        router1_static_wan_gw = ip_str(circuit1_wan_subnet.network + 1)
+        router1_static_wan_mask = ip_str(circuit1_wan_subnet.netmask)
+
+        #print(f'Store {store_num} Router 1 static WAN IP {router1_static_wan_ip} GW {router1_static_wan_gw} Mask {router1_static_wan_mask}')
+
+    # initialize router 2 variables in case of a single site router
+    router2_serial = 'NONE'
+    circuit2_type = 'NONE'
+    circuit2_bw_down = 0
+    circuit2_bw_up = 0
+    circuit2_type = 'NONE'
+    circuit2_ref = 'NONE'
+    circuit2_ppp_name = 'NONE'
+    circuit2_ppp_pwd = 'NONE'
+    router2_mgmt_ip = 'NONE'
+    router2_systemip = 'NONE'
+    router2_hostname = 'NONE'
+    router2_wan_color = 'NONE'
+    router2_static_wan_ip = 'NONE'
+    router2_static_wan_gw = 'NONE'
+    router2_static_wan_mask = '255.255.255.248'
+    circuit2_wan_subnet = None
+    interface2 = 'NONE'
+
+    # get router 2 serial number if present otherwsie assume a singe router site
+    router2_serial = str(tracker_rec[router2_serial_col]).upper()
+    circuit2_provider = str(tracker_rec[circuit2_provider_col]).upper()
+    dual_router = router2_serial != 'NONE' and circuit2_provider != 'NONE'
+
+    if dual_router:
+        router2_serial = sanatise_serial(router2_serial)
+
+        # get circuit 2 type and bandwidth
+        circuit2_type = str(tracker_rec[circuit2_type_col]).upper()
+        circuit2_bw_down = str(tracker_rec[circuit2_bw_down_col])
+        circuit2_bw_up = str(tracker_rec[circuit2_bw_up_col])
+
+        if circuit2_bw_down == 'None' or circuit2_bw_up == 'None':
+            circuit2_bw_down, circuit2_bw_up, interface2 = circuit_bandwidth(circuit2_type)
+        else:
+            a, b, interface2 = circuit_bandwidth(circuit2_type)
+        
+        circuit2_bw_down = float(circuit2_bw_down)
+        circuit2_bw_up = float(circuit2_bw_up)
+
+        circuit2_ref = str(tracker_rec[circuit2_ref_col]).upper()
+
+        # get static wan IP and subnet if circuit type is ETHERNET
+        if circuit2_type == 'ETHERNET':
+            circuit2_static_wan_ip = str(tracker_rec[circuit2_wan_subnet_col])
+            
+            if '/' not in circuit2_static_wan_ip:
+                circuit2_static_wan_ip = circuit2_static_wan_ip + '/29'
+            
+            circuit2_wan_subnet = IPv4Net.parse(circuit2_static_wan_ip, strict=False)
+
+            router2_static_wan_ip = ip_str(circuit2_wan_subnet.network + 2)
+            router2_static_wan_gw = ip_str(circuit2_wan_subnet.network + 1)
+            router2_static_wan_mask = ip_str(circuit2_wan_subnet.netmask)
+                
+        # get managment IP address for router 2
+        router2_mgmt_ip = str(tracker_rec[router2_mgmt_ip_col])
+        if router2_mgmt_ip == 'None' or router2_mgmt_ip == '':
+            #print(f'Error: missing management IP address for router 2 for store {store_num} row {tracker_row}  ... skipping to next row')
+            row_result['skipped'] = 'missing router 2 management IP'
+            return row_result
+
+        if '/' not in router2_mgmt_ip: router2_mgmt_ip = router2_mgmt_ip + '/32'
+        router2_mgmt_ip = IPv4Net.parse(router2_mgmt_ip, strict=False)
+        router2_systemip = ip_str(router2_mgmt_ip.network)
+
+        # build router 2 hostname
+        router2_hostname = f'SC-{store_type}-{store_num}-R2'
+
+        # get provider for circuit 2
+        circuit2_provider = str(tracker_rec[circuit2_provider_col]).upper()
+        #router2_wan_color = wan_color(circuit2_provider)
+        router2_wan_color = 'green' # default router 2 as some carrier migrations demand PXC + PXC intially which breaks the config is the same color is used for both circuits
+
+        # get ppp name and password for circuit 2
+        circuit2_ppp_name = str(tracker_rec[circuit2_ppp_name_col])
+        circuit2_ppp_pwd = str(tracker_rec[circuit2_ppp_pwd_col])
+
+        if 'BT' in circuit2_provider and circuit2_ppp_name == 'None':
+            circuit2_ppp_name = 'dummy@bband1.com'
+            circuit2_ppp_pwd = 'dummy'
+
+        if circuit2_ppp_name == 'None':
+            #print(f'Warning: missing PPPoE name for circuit 2 for store {store_num} row {tracker_row}  ... defaulting to dummy BT details')
+            circuit2_ppp_name = 'dummy@bband1.com'
+            circuit2_ppp_pwd = 'dummy'
+
+        if circuit2_provider == 'MAINTEL-BT' and not circuit2_ppp_name.startswith('SCOOP-DIA-BT-MAINTEL-ISP'):
+            messages.append(f'Warning: Circuit 2 provider is MAINTEL-BT but username does not begin with SCOOP-DIA-BT-MAINTEL-ISP for store {store_num} row {tracker_row}')
+            
+        if circuit2_provider == 'MAINTEL-PXC' and not circuit2_ppp_name.startswith('SCOOP-DIA-PXC-MAINTEL-ISP'):
+            messages.append(f'Warning: Circuit 2 provider is MAINTEL-PXC but username does not begin with SCOOP-DIA-PXC-MAINTEL-ISP for store {store_num} row {tracker_row}')
+
+    # get managment IP address for router 1
+    router1_mgmt_ip = str(tracker_rec[router1_mgmt_ip_col])
+    if '/' not in router1_mgmt_ip: router1_mgmt_ip = router1_mgmt_ip + '/32'
+    try:
+        router1_mgmt_ip = IPv4Net.parse(router1_mgmt_ip, strict=False)
+    except ValueError:
+        #print(f'Error: invalid management IP address for router 1 for store {store_num} row {tracker_row}  ... skipping to next row')
+        row_result['skipped'] = 'invalid router 1 management IP'
+        return row_result
+
+    router1_systemip = ip_str(router1_mgmt_ip.network)
+
+    # build router 1 hostname
+    router1_hostname = f'SC-{store_type}-{store_num}-R1'
+
+    # get provider for circuit 1
+    circuit1_provider = str(tracker_rec[circuit1_provider_col]).upper()
+    if circuit1_provider == 'NONE' or circuit1_provider == '':
+        #print(f'Error: missing circuit 1 provider for store {store_num} row {tracker_row}  ... skipping to next row')
+        row_result['skipped'] = 'missing circuit 1 provider'
+        return row_result
+    #router1_wan_color = wan_color(circuit1_provider)
+    router1_wan_color = 'blue' # default router 1 as some carrier migrations demand PXC + PXC intially which breaks the config is the same color is used for both circuits
+
+    # get ppp name and password for circuit 1
+    circuit1_ppp_name = str(tracker_rec[circuit1_ppp_name_col])
+    circuit1_ppp_pwd = str(tracker_rec[circuit1_ppp_pwd_col])
+
+    if 'BT' in circuit1_provider and circuit1_ppp_name == 'None':
+        circuit1_ppp_name = 'dummy@bband1.com'
+        circuit1_ppp_pwd = 'dummy'
+    
+    if circuit1_ppp_name == 'None':
+        #print(f'Warning: missing PPPoE name AND circuit not set as BT for circuit 1 for store {store_num} row {tracker_row}  ... defaulting to dummy BT details')
+        circuit1_ppp_name = 'dummy@bband1.com'
+        circuit1_ppp_pwd = 'dummy'
+
+    if circuit1_provider == 'MAINTEL-BT' and not circuit1_ppp_name.startswith('SCOOP-DIA-BT-MAINTEL-ISP'):
+        messages.append(f'Warning: Circuit 1 provider is MAINTEL-BT but username does not begin with SCOOP-DIA-BT-MAINTEL-ISP for store {store_num} row {tracker_row}')
+
+    if circuit1_provider == 'MAINTEL-PXC' and not circuit1_ppp_name.startswith('SCOOP-DIA-PXC-MAINTEL-ISP'):
+        messages.append(f'Warning: Circuit 1 provider is MAINTEL-PXC but username does not begin with SCOOP-DIA-PXC-MAINTEL-ISP for store {store_num} row {tracker_row}')
+
+    # get provision port status
+    provision_port_disable = str(tracker_rec[provision_port_disable_col])
+    if provision_port_disable == 'None':
+        provision_port_disable = 'FALSE'
+    else:
+        provision_port_disable = 'TRUE'
+
+    # get vlan 2 network
+    vlan2_ipv4 = str(tracker_rec[vlan2_col])
+
+    if vlan2_ipv4 == 'None':
+        messages.append(f'Error: missing VLAN 2 network for store {store_num} row {tracker_row}  ... SKIPPING - Please correct and re-run')
+        row_result['skipped'] = 'missing VLAN 2'
+        return row_result
+
+    # a formula left as text has no saved value and could not be resolved (see resolve_formulas) - VLOOKUP, INDEX-MATCH, IFERROR or any other
+    if vlan2_ipv4.startswith('='):
+        messages.append(f'Error: VLAN 2 is a formula that could not be resolved for store {store_num} row {tracker_row}  ... SKIPPING - Please correct and re-run')
+        row_result['skipped'] = 'formula in VLAN 2'
+        return row_result
+    
+    if vlan2_ipv4 and '/' not in vlan2_ipv4:
+        vlan2_ipv4 = vlan2_ipv4 + '/28'
+    vlan2_ipv4 = IPv4Net.parse(vlan2_ipv4, strict=False)
+
+    # generate cctv nat from store number - 4 addresses per store from 172.19.0.0
+    a = int(store_num) * 4
+    if not 0 <= a < 65536:
+        raise ValueError(f'CCTV NAT address for store {store_num} is outside 172.19.0.0/16')
+
+    cctv_nat = cctv_nat_ipv4.network + a
+
+    # look the store networks up in the address plan
+    plan_vlan60_ipv4, plan_vlan20_ipv4, vlan70_ipv4, vlan10_ipv4, vlan31_ipv4, vlan101_ipv4 = store_networks(store_num)
+    
+    vlan60_ipv4 = str(tracker_rec[vlan60_col])
+
+    if store_type == 3 or store_type == 4:
+
+        vlan60_ipv4 = plan_vlan60_ipv4
+        vlan20_ipv4 = plan_vlan20_ipv4
+    else:
+        if vlan60_ipv4 and '/' not in vlan60_ipv4:
+            vlan60_ipv4 = vlan60_ipv4 + '/24'
+        try:
+             vlan60_ipv4 = IPv4Net.parse(vlan60_ipv4, strict=False)
+        except ValueError:
+            messages.append(f'Error: invalid VLAN 60 network for store {store_num} row {tracker_row}  ... SKIPPING - Please correct and re-run')
+            row_result['skipped'] = 'invalid VLAN 60'
+            return row_result
+        vlan60_oct1, vlan60_oct2, vlan60_oct3, vlan60_oct4 = vlan60_ipv4.octets()
+        vlan20_ipv4 = IPv4Net.parse(f'{vlan60_oct1}.1{vlan60_oct2}.{vlan60_oct3}.{vlan60_oct4}/24')
+    
+    vlan80_ipv4 = store_vlan80_ipv4
+    vlan30_ipv4 = store_vlan30_ipv4
+    vlan40_ipv4 = store_vlan40_ipv4
+    vlan100_ipv4 = store_vlan100_ipv4
+    vlan120_ipv4 = store_vlan120_ipv4
+
+    # collect the globally significant subnets (vrf 100, 700) so they can be checked for duplicates across all stores
+    # checks for Vlan 42 - Wesley Media (not required as not globally significant - vrf 400)
+    # checks for Vlan 192 - Cremators (not required as not globally significant - vrf 400)
+    store_subnets = []
+
+    if store_type == 3 or store_type == 4:
+        store_subnets = [subnet_entry('VLAN 10', vlan10_ipv4), subnet_entry('VLAN 20', vlan20_ipv4), subnet_entry('VLAN 31', vlan31_ipv4),
+                         subnet_entry('VLAN 60', vlan60_ipv4), subnet_entry('VLAN 70', vlan70_ipv4), subnet_entry('VLAN 2', vlan2_ipv4)]
+    
+    if store_type == 5 or store_type == 6:
+        # ELS ranges are generated differently to avoid a clash with Retail and Welcome store types
+        # vlan60 is learnt from the tracker sheet and will used as the seed subnet to generate the rest of the subnets for type 5 and type 6 ELS Lite and ELS
+        vlan60_oct1, vlan60_oct2, vlan60_oct3, vlan60_oct4 = vlan60_ipv4.octets()
+        vlan20_ipv4 = IPv4Net.from_octets(vlan60_oct1, vlan60_oct2 + 200, vlan60_oct3, 128, 25)
+        vlan31_ipv4 = IPv4Net.from_octets(vlan60_oct1, vlan60_oct2 + 220, vlan60_oct3, 0, 28)
+        vlan101_ipv4 = IPv4Net.from_octets(vlan60_oct1, vlan60_oct2 + 220, vlan60_oct3, 224, 27)
+        store_subnets = [subnet_entry('VLAN 20', vlan20_ipv4), subnet_entry('VLAN 31', vlan31_ipv4), subnet_entry('VLAN 60', vlan60_ipv4),
+                         subnet_entry('VLAN 101', vlan101_ipv4), subnet_entry('VLAN 2', vlan2_ipv4)]
+        #print(f'Store {store_num} Type {store_type} generated subnets:')
+        #print("-" * 40)
+        #print(f'VLAN 60: {vlan60_ipv4}')
+        #print(f'VLAN 20: {vlan20_ipv4}')
+        #print(f'VLAN 31: {vlan31_ipv4}')
+        #print(f'VLAN 101: {vlan101_ipv4}')
+        #print('\n')
+    
+
+    # collect the public subnets that need a static route on DNAC - the VLAN 60 range and any static WAN subnets
+    store_routes = []
+    for label, network in (('VLAN 60', vlan60_ipv4), ('Circuit 1 WAN', circuit1_wan_subnet), ('Circuit 2 WAN', circuit2_wan_subnet)):
+        if network is not None and ipaddress.IPv4Address(network.network).is_global:
+            store_routes.append((label, str(network)))
+
+    # print store networks for debugging
+
+    print_nets = False
+    if print_nets:
+        messages.append(f'Store {store_num} VLAN networks:')
+        messages.append(f'VLAN2: {vlan2_ipv4}')
+        messages.append(f'VLAN10: {vlan10_ipv4}')
+        messages.append(f'VLAN20: {vlan20_ipv4}')
+        messages.append(f'VLAN30: {vlan30_ipv4}')
+        messages.append(f'VLAN31: {vlan31_ipv4}')
+        messages.append(f'VLAN40: {vlan40_ipv4}')
+        messages.append(f'VLAN60: {vlan60_ipv4}')
+        messages.append(f'VLAN70: {vlan70_ipv4}')
+        messages.append(f'VLAN80: {vlan80_ipv4}')
+        messages.append(f'VLAN100: {vlan100_ipv4}')
+        messages.append(f'VLAN101: {vlan101_ipv4}')
+        messages.append(f'VLAN120: {vlan120_ipv4}')
+        messages.append('')
+
+    # build the device rows with the builders compiled from the mapping (router1_rules and router2_rules) - router 2 starts
+    # from the router 1 values and only its own rules are applied. The GPS columns are filled in once the postcode lookups are done
+    router1, router2 = transform_plan or compile_transform_plan()
+    # the row values in mapping_names order
+    row = (tracker_row, store_num, store_type, site_id, postcode, dual_router, provision_port_disable, cctv_nat,
+           router1_serial, router1_systemip, router1_hostname, router1_wan_color,
+           router1_static_wan_ip, router1_static_wan_gw, router1_static_wan_mask,
+           circuit1_provider, circuit1_type, circuit1_ref, circuit1_bw_up, circuit1_bw_down, circuit1_ppp_name, circuit1_ppp_pwd, interface1,
+           router2_serial, router2_systemip, router2_hostname, router2_wan_color,
+           router2_static_wan_ip, router2_static_wan_gw, router2_static_wan_mask,
+           circuit2_provider, circuit2_type, circuit2_ref, circuit2_bw_up, circuit2_bw_down, circuit2_ppp_name, circuit2_ppp_pwd, interface2,
+           vlan2_ipv4, vlan10_ipv4, vlan20_ipv4, vlan30_ipv4, vlan31_ipv4, vlan40_ipv4, vlan60_ipv4, vlan70_ipv4, vlan80_ipv4, vlan100_ipv4, vlan101_ipv4, vlan120_ipv4)
+
+    devices = [router1(*row)]
+    if dual_router:
+        devices.append(router2(devices[0], *row))
+
+    row_result['postcode'] = postcode
+    row_result['subnets'] = store_subnets
+    row_result['routes'] = store_routes
+    row_result['devices'] = devices
+    return row_result
+
+
+def transform_chunk(tracker_recs):
+
+    # Function to transform a chunk of tracker records - run in a worker process by transform_rows
+    # Returns the row results in the same order as the records
+    # A record that can't be transformed (a cell no row check catches) raises ValueError naming its store and row
+
+    row_results = []
+    for tracker_rec in tracker_recs:
+        try:
+            row_results.append(transform_row(tracker_rec))
+        except Exception as error:
+            raise ValueError(f'store {str(tracker_rec[store_num_col]).zfill(4)} row {tracker_rec[0]} could not be transformed - {error}') from error
+    return row_results
+
+
+def valid_networks(column, default_prefix):
+
+    # Function to return a list of True/False for whether each cell of a column parses as a network the way transform_row parses it
+
+    valid = []
+    for text in column:
+        # 'None', formulas and other text can't be a network - don't pay for ipaddress to say so
+        if not text[:1].isdigit():
+            valid.append(False)
+            continue
+        if '/' not in text:
+            text = text + default_prefix
+        try:
+            IPv4Net.parse(text, strict=False)
+            valid.append(True)
+        except ValueError:
+            valid.append(False)
+    return valid
+
+
+def valid_numbers(column):
+
+    # Function to return a list of True/False for whether each cell of a column is a bandwidth transform_row can use (empty or a number)
+
+    valid = []
+    for text in column:
+        try:
+            float(text)
+            valid.append(True)
+        except ValueError:
+            valid.append(False)
+    return valid
+
+
+def duplicated(*columns):
+
+    # Function to return a list of True/False for whether the value in each row is also used in another row, for the value columns
+    # given - a value counts once per row, so a row can't clash with itself. 'NONE' and '' are never duplicates
+
+    counts = {}
+    for row_values in zip(*columns):
+        for value in set(row_values):
+            counts[value] = counts.get(value, 0) + 1
+    return [any(counts[value] > 1 for value in row_values if value not in ('NONE', '')) for row_values in zip(*columns)]
+
+
+def validation_columns(tracker_rows):
+
+    # Function to turn the tracker records into the columns the validation rules read - a list per tracker column (store_num for
+    # store_num_col) of the cells as text the same as transform_row sees them, plus:
+    #   row - the tracker row number,  active - the row has a store number (blank rows are not checked)
+    #   store_type_digit - the store type number or None,  dual_router - the row has a router 2 and circuit 2
+    #   router1_serial, router2_serial - the serials as sanatise_serial returns them
+
+    cells = list(zip(*tracker_rows)) or [[] for _ in range(tracker_max_col + 1)]
+    columns = {'row': list(cells[0])}
+    for name in tracker_columns:
+        columns[name[:-4]] = [str(value) for value in cells[globals()[name]]]
+
+    for name in ('store_type', 'circuit1_provider', 'circuit1_type', 'circuit2_provider', 'circuit2_type', 'router1_serial', 'router2_serial'):
+        columns[name] = [value.upper() for value in columns[name]]
+    columns['store_num'] = [value.zfill(4) for value in columns['store_num']]
+    columns['active'] = [value not in ('0000', 'None') for value in columns['store_num']]
+    columns['store_type_digit'] = [int(value[0]) if value[:1].isdigit() else None for value in columns['store_type']]
+    columns['dual_router'] = [serial != 'NONE' and provider != 'NONE' for serial, provider in zip(columns['router2_serial'], columns['circuit2_provider'])]
+    columns['router1_serial'] = [sanatise_serial(serial) if serial != 'NONE' else serial for serial in columns['router1_serial']]
+    columns['router2_serial'] = [sanatise_serial(serial) if serial != 'NONE' else serial for serial in columns['router2_serial']]
+    return columns
+
+
+def validate_tracker(tracker_rows):
+
+    # Function to run every validation rule over the whole tracker and return the failures, in tracker row then rule order,
+    # as dictionaries of row, store, rule, severity, column, value and message
+    # Each rule is evaluated over whole columns at once (see validation_rules) - checking the sheet takes a few tens of ms - and
+    # every rule is run on every row so a row that transform_row skips for its first problem still has all of them reported
+
+    columns = validation_columns(tracker_rows)
+    failures = []
+    for rule, severity, column, message, check in validation_rules:
+        failed = check(columns)
+        values = columns.get(column, columns['store_num'])
+        for index in [index for index, row_failed in enumerate(failed) if row_failed and (columns['active'][index] or rule == 'missing store number')]:
+            failures.append({'row': columns['row'][index], 'store': columns['store_num'][index], 'rule': rule, 'severity': severity,
+                             'column': column_letter(globals()[column + '_col']) if column + '_col' in globals() else '',
+                             'value': values[index], 'message': message})
+    rule_order = {rule[0]: index for index, rule in enumerate(validation_rules)}
+    failures.sort(key=lambda failure: (failure['row'], rule_order[failure['rule']]))
+    return failures
+
+
+def write_validation_report(report_filepath, failures):
+
+    # Function to write the validation failures to a csv and the same as JSON alongside it (.json) with a count per rule
+
+    with open(report_filepath, 'w', newline='', encoding='utf-8') as csv_file:
+        csv_writer = csv.writer(csv_file, lineterminator=os.linesep)
+        csv_writer.writerow(['Row', 'Store', 'Severity', 'Rule', 'Column', 'Value', 'Message'])
+        for failure in failures:
+            csv_writer.writerow([failure['row'], failure['store'], failure['severity'], failure['rule'], failure['column'], failure['value'], failure['message']])
+
+    with open(os.path.splitext(report_filepath)[0] + '.json', 'w') as f:
+        json.dump({'created': datetime.now().isoformat(timespec='seconds'), 'rules': validation_summary(failures), 'failures': failures}, f, indent=2)
+
+
+def check_tracker(tracker_rows, report_filepath, every_failure=False):
+
+    # Function to run the validation rules over the tracker, write the report, print the summary and return the failures
+
+    failures = validate_tracker(tracker_rows)
+    run_stats.count('validation errors', sum(1 for failure in failures if failure['severity'] == 'error'))
+    run_stats.count('validation warnings', sum(1 for failure in failures if failure['severity'] == 'warning'))
+    try:
+        write_validation_report(report_filepath, failures)
+    except PermissionError:
+        print('*' * 120, f'\nError: {os.path.basename(report_filepath)} is open in another application or by another user - please close and re-run the script\n', '*' * 120)
+        sys.exit(1)
+    print_validation_summary(failures, report_filepath, every_failure)
+    return failures
+
+
+def print_validation_summary(failures, report_filepath, every_failure=False):
+
+    # Function to print how many rows failed each validation rule - and each failure as well if every_failure is set
+
+    if every_failure:
+        for failure in failures:
+            print(f'{failure["severity"].capitalize()}: row {failure["row"]} store {failure["store"]} {failure["rule"]}'
+                  f' - {failure["message"]} (column {failure["column"]}: {failure["value"]})')
+        print('')
+    summary = validation_summary(failures)
+    print('-' * 80)
+    print(f'{"validation rule":<40}{"severity":>10}{"rows":>10}')
+    for rule, rule_summary in summary.items():
+        print(f'{rule:<40}{rule_summary["severity"]:>10}{rule_summary["rows"]:>10}')
+    if not summary:
+        print('every row passed every rule')
+    print('-' * 80)
+    print(f'Validation report written to {os.path.basename(report_filepath)} and {os.path.basename(os.path.splitext(report_filepath)[0])}.json\n')
+
+
+def validation_summary(failures):
+
+    # Function to return {rule: {'severity': ..., 'rows': count}} for the rules that failed, in validation_rules order
+
+    summary = {}
+    for rule, severity, column, message, check in validation_rules:
+        count = sum(1 for failure in failures if failure['rule'] == rule)
+        if count:
+            summary[rule] = {'severity': severity, 'rows': count}
+    return summary
+
+
+def transform_rows(tracker_recs, workers):
+
+    # Function to transform a list of tracker records and return their row results in the same order
+    # With more than one worker the records are split into chunks and transformed in a process pool - map returns the
+    # chunks in the order they were submitted so the results line up with the records exactly as in a serial run
+    # Fewer than two chunks of records are transformed here as starting the worker processes would cost more than it saves
+
+    if workers <= 1 or len(tracker_recs) < 2 * transform_chunk_rows:
+        return transform_chunk(tracker_recs)
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # a few chunks per worker keeps them all busy to the end without sending lots of small chunks
+    chunk_rows = max(transform_chunk_rows, -(-len(tracker_recs) // (workers * 4)))
+    chunks = [tracker_recs[chunk_start:chunk_start + chunk_rows] for chunk_start in range(0, len(tracker_recs), chunk_rows)]
+
+    # a spawned worker starts from the built-in mapping so it is given the --mapping file to apply
+    row_results = []
+    initializer, initargs = (apply_mapping, (custom_mapping,)) if custom_mapping else (None, ())
+    with ProcessPoolExecutor(max_workers=workers, initializer=initializer, initargs=initargs) as executor:
+        for chunk_results in executor.map(transform_chunk, chunks):
+            row_results.extend(chunk_results)
+    return row_results
+
+
+def row_fingerprint(tracker_rec, with_row=False):
+
+    # Function to return a hash of the cells of a tracker record the transform reads - the row number is left out unless with_row
+    # If the hash matches the last run the stored result for the row can be used, wherever the row is now (see move_row_result)
+
+    return hashlib.sha1(repr(tracker_rec if with_row else tracker_rec[1:]).encode()).hexdigest()
+
+
+def move_row_result(row_result, tracker_row):
+
+    # Function to move a stored row result to the row it is at now - every transform_row message names its row as 'row <number>'
+
+    if row_result['row'] != tracker_row:
+        moved_row = re.compile(rf'\brow {row_result["row"]}\b')
+        row_result['messages'] = [moved_row.sub(f'row {tracker_row}', message) for message in row_result['messages']]
+        row_result['row'] = tracker_row
+
+
+def mapping_uses_row():
+
+    # Function to return True if a mapping rule uses the tracker row number - the device rows then change when a row moves
+
+    return any(isinstance(rule, str) and 'tracker_row' in rule for rules in (router1_rules, router2_rules) for rule in rules.values())
+
+
+def run_state_version():
+
+    # Function to return a hash of this script and any --mapping file - stored results are only reused by the code and mapping that produced them
+
+    with open(__file__, 'rb') as f:
+        version = hashlib.sha1(f.read())
+    if custom_mapping:
+        version.update(json.dumps(custom_mapping, sort_keys=True).encode())
+    return version.hexdigest()
+
+
+def load_run_state(state_file):
+
+    # Function to return the row results saved by the last run, keyed by row fingerprint
+    # Returns an empty dictionary if there is no saved state, it can't be read or it was saved by a different version of the script
+
+    try:
+        with open(state_file, 'r') as f:
+            run_state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    if run_state.get('version') != run_state_version():
+        return {}
+    return run_state.get('rows', {})
+
+
+def save_run_state(state_file, rows):
+
+    # Function to save the row results for the next run
+    # The file is written alongside and then renamed so an interrupted run can't leave a half written state
+
+    # the device rows hold the PPPoE passwords the same as the import csv so the file is only readable by the user running the script
+    with open(os.open(state_file + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+        json.dump({'version': run_state_version(), 'rows': rows}, f, separators=(',', ':'))
+    os.chmod(state_file + '.tmp', 0o600)
+    os.replace(state_file + '.tmp', state_file)
+
+
+def cpu_time():
+
+    # Function to return the CPU seconds used by this process and by worker processes that have finished (the transform pool)
+    # The worker time keeps adding up for the life of the process so only a difference between two calls means anything
+
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return time.process_time()
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
 
 
-def sanatise_serial(serial):
+def peak_memory_mb():
 
-    # Function to check the location code is 3 letters and remove leading 'S'
-    if not serial:
-        return ''
-    # guard against short serials
-    if len(serial) > 3:
-        serial_check = serial[3]  # check 4th character is a number
-    else:
-        serial_check = ''
-    if serial_check.isalpha() and serial[0].upper() == 'S':
-        return (serial[1:].upper())
-    else:
-        return (serial.upper())
+    # Function to return the peak memory allocated by Python in MB since the last reset (see RunStats.begin) - None if it isn't traced
+    # tracemalloc counts this process only - the transform workers are not included
 
-def wan_color(circuit_provider):
+    import tracemalloc
 
-    # Function to return wan color based on circuit provider
-    # !NOTE! this is no longer used as R1 defaults to blue and R2 defaults green !!!
-      
-    if circuit_provider == 'BT' or circuit_provider == 'MAINTEL-BT':
-        return 'blue'
-    elif circuit_provider == 'PXC' or circuit_provider == 'MAINTEL-PXC':
-        return 'green'
-    elif circuit_provider == 'Other':
-        return 'public-internet'
-    else:
+    if not tracemalloc.is_tracing():
         return None
+    return round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 1)
+
+
+class RunStats:
+
+    # Wall time, CPU time and peak memory for each stage of a run plus counters - written as a JSON report by --profile
+    # begin('transform') starts timing a stage and ends the one before it, end() ends the last stage
+    # count('api bulk requests', 3) adds to a counter and skip(reason) counts a tracker row skipped for that reason
+    # The totals are from wall_start and cpu_start (when the stats are made if not given) so each --watch run reports its own
+    # Memory is only measured while tracemalloc is tracing (run_import starts it for --profile) - the peak is reset at each stage
+
+    def __init__(self, wall_start=None, cpu_start=None):
+        self.stages = {}
+        self.counters = {}
+        self.skipped = {}
+        self.current = None
+        self.wall_start = time.perf_counter() if wall_start is None else wall_start
+        self.cpu_start = cpu_time() if cpu_start is None else cpu_start
+
+    def begin(self, name):
+        import tracemalloc
+
+        self.end()
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.current = (name, time.perf_counter(), cpu_time())
+
+    def end(self):
+        if self.current is None:
+            return
+        name, wall_start, cpu_start = self.current
+        self.stages[name] = {'wall': round(time.perf_counter() - wall_start, 6), 'cpu': round(cpu_time() - cpu_start, 6),
+                             'peak_memory_mb': peak_memory_mb()}
+        self.current = None
+
+    def count(self, name, amount=1):
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def skip(self, reason):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def report(self):
+        self.end()
+        peaks = [stage['peak_memory_mb'] for stage in self.stages.values() if stage['peak_memory_mb'] is not None]
+        return {'created': datetime.now().isoformat(timespec='seconds'), 'script': run_state_version(),
+                'wall': round(time.perf_counter() - self.wall_start, 6), 'cpu': round(cpu_time() - self.cpu_start, 6),
+                'peak_memory_mb': max(peaks, default=None),
+                'stages': self.stages, 'counters': self.counters, 'skipped_rows': self.skipped}
+
+
+def bench_tracker(tracker_filepath, rows, seed=1):
+
+    # Function to write a synthetic tracker workbook for the benchmark in the same column layout as the real one (the *_col numbers)
+    # Rows mix store types 3-6, single and dual router stores, ETHERNET/FTTP/SOGEA circuits and terminated postcodes (inward code ZZ)
+    # The same seed always gives the same workbook - store numbers repeat once there are more rows than store numbers
+
+    import random
+    import openpyxl
+
+    rng = random.Random(seed)
+    stores = list(range(1, 10000))
+    rng.shuffle(stores)
+    letters = 'ABDEFGHJLNPQRSTUWXY'
+    postcodes = []
+    for _ in range(max(rows // 2, 1)):
+        inward = 'ZZ' if rng.random() < 0.03 else rng.choice(letters) + rng.choice(letters)
+        postcodes.append(f'{rng.choice(["BN", "SO", "PO", "GU", "RG", "TN", "CT", "ME"])}{rng.randint(1, 40)} {rng.randint(0, 9)}{inward}')
+    providers = {'BT': None, 'PXC': None, 'MAINTEL-BT': 'SCOOP-DIA-BT-MAINTEL-ISP', 'MAINTEL-PXC': 'SCOOP-DIA-PXC-MAINTEL-ISP'}
+
+    def serial():
+        return f'FGL{rng.randint(2600, 2899)}{"".join(rng.choice(letters) for _ in range(4))}'
+
+    circuit_cols = {1: (circuit1_provider_col, circuit1_type_col, circuit1_bw_up_col, circuit1_bw_down_col, circuit1_ref_col,
+                        circuit1_wan_subnet_col, circuit1_ppp_name_col, circuit1_ppp_pwd_col),
+                    2: (circuit2_provider_col, circuit2_type_col, circuit2_bw_up_col, circuit2_bw_down_col, circuit2_ref_col,
+                        circuit2_wan_subnet_col, circuit2_ppp_name_col, circuit2_ppp_pwd_col)}
+
+    def circuit(rec, circuit_num, row_num):
+        provider_col, type_col, bw_up_col, bw_down_col, ref_col, wan_subnet_col, ppp_name_col, ppp_pwd_col = circuit_cols[circuit_num]
+        provider = rng.choice(list(providers))
+        circuit_type = rng.choice(['ETHERNET', 'FTTP', 'SOGEA'])
+        rec[provider_col] = provider
+        rec[type_col] = circuit_type
+        if rng.random() < 0.3:
+            rec[bw_up_col] = rng.choice([20, 40, 100])
+            rec[bw_down_col] = rng.choice([80, 160, 100])
+        rec[ref_col] = f'CCT{row_num:06d}-{circuit_num}'
+        if circuit_type == 'ETHERNET':
+            rec[wan_subnet_col] = f'{80 + circuit_num}.{(row_num >> 13) & 255}.{(row_num >> 5) & 255}.{(row_num & 31) * 8}/29'
+        if providers[provider]:
+            rec[ppp_name_col] = f'{providers[provider]}-{row_num}@sc.net'
+            rec[ppp_pwd_col] = 'bench'
+
+    tracker_wb_obj = openpyxl.Workbook(write_only=True)
+    tracker_sheet_obj = tracker_wb_obj.create_sheet('Tracker')
+    tracker_sheet_obj.append(['Synthetic benchmark tracker'])
+    tracker_sheet_obj.append(['Store', None, 'Type', None, 'Postcode'])
+    for row_num in range(rows):
+        rec = [None] * (tracker_max_col + 1)  # rec[col] as in a tracker record - element 0 is dropped when written
+        rec[store_num_col] = stores[row_num % len(stores)]
+        rec[store_type_col] = rng.choice([3, 4, 5, 6])
+        rec[postcode_col] = rng.choice(postcodes)
+        rec[router1_serial_col] = serial()
+        rec[router1_mgmt_ip_col] = f'10.250.{(row_num // 250) % 256}.{row_num % 250 + 1}'
+        circuit(rec, 1, row_num)
+        if rng.random() < 0.5:
+            rec[router2_serial_col] = serial()
+            rec[router2_mgmt_ip_col] = f'10.251.{(row_num // 250) % 256}.{row_num % 250 + 1}'
+            circuit(rec, 2, row_num)
+        rec[vlan2_col] = f'172.{16 + (row_num >> 12)}.{(row_num >> 4) & 255}.{(row_num & 15) * 16}/28'
+        # ELS networks are generated from VLAN 60 with 220 added to the second octet so it stays at 35 or below
+        rec[vlan60_col] = f'151.{rng.randint(1, 35)}.{rng.randint(0, 255)}.0/24'
+        if rng.random() < 0.2:
+            rec[provision_port_disable_col] = 'Y'
+        tracker_sheet_obj.append(rec[1:])
+    tracker_wb_obj.save(tracker_filepath)
+
+
+def start_postcode_stub(port=0, latency=0.0, error_rate=0.0, rate_limit=0, host='127.0.0.1'):
+
+    # Function to start a local stand-in for the postcodes.io API on a background thread - returns the server (see server.server_address)
+    # It answers bulk POST /postcodes (up to 100 postcodes) and GET /postcodes/{postcode} the same way as the real API:
+    #   a terminated postcode (inward code ZZ) is null in a bulk lookup and a single lookup returns 404 with its last known coordinates
+    #   coordinates are made up from a hash of the postcode so a postcode always resolves to the same place
+    # latency - seconds added to every response, error_rate - fraction of requests answered with a 500,
+    # rate_limit - requests allowed per second (0 for no limit), any more are answered with a 429 and Retry-After
+    # server.stats counts the requests by outcome
+
+    import random
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import unquote
+
+    stats = {'bulk requests': 0, 'single lookups': 0, 'postcodes': 0, 'errors': 0, 'rate limited': 0, 'rejected': 0}
+    stats_lock = threading.Lock()
+    errors = random.Random(1)
+    rate_window = [0, 0]  # second, requests in that second
+
+    def coordinates(postcode):
+        postcode_hash = int(hashlib.sha1(postcode.encode()).hexdigest()[:12], 16)
+        return (round(50.5 + (postcode_hash % 100000) / 100000, 6), round(-1.5 + (postcode_hash // 100000 % 100000) / 50000, 6))
+
+    class PostcodeStubHandler(BaseHTTPRequestHandler):
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body, headers=None):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            for header, value in (headers or {}).items():
+                self.send_header(header, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def refused(self):
+            # Function to answer the request with a 429 or 500 if the rate limit or error rate says so - returns True if it did
+            if latency:
+                time.sleep(latency)
+            with stats_lock:
+                if rate_limit:
+                    second = int(time.monotonic())
+                    if rate_window[0] != second:
+                        rate_window[0], rate_window[1] = second, 0
+                    rate_window[1] = rate_window[1] + 1
+                    if rate_window[1] > rate_limit:
+                        stats['rate limited'] = stats['rate limited'] + 1
+                        self.send_json(429, {'status': 429, 'error': 'Too many requests'}, {'Retry-After': '1'})
+                        return True
+                if error_rate and errors.random() < error_rate:
+                    stats['errors'] = stats['errors'] + 1
+                    self.send_json(500, {'status': 500, 'error': 'Stub server error'})
+                    return True
+            return False
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path.rstrip('/') != '/postcodes':
+                self.send_json(404, {'status': 404, 'error': 'Resource not found'})
+                return
+            if self.refused():
+                return
+            try:
+                postcodes = json.loads(body)['postcodes']
+            except (ValueError, KeyError, TypeError):
+                postcodes = None
+            if not isinstance(postcodes, list) or len(postcodes) > 100:
+                with stats_lock:
+                    stats['rejected'] = stats['rejected'] + 1
+                self.send_json(400, {'status': 400, 'error': 'Invalid JSON query submitted - no more than 100 postcodes per request'})
+                return
+            results = []
+            for postcode in postcodes:
+                if postcode.endswith('ZZ'):
+                    results.append({'query': postcode, 'result': None})
+                else:
+                    latitude, longitude = coordinates(postcode)
+                    results.append({'query': postcode, 'result': {'postcode': postcode, 'latitude': latitude, 'longitude': longitude}})
+            with stats_lock:
+                stats['bulk requests'] = stats['bulk requests'] + 1
+                stats['postcodes'] = stats['postcodes'] + len(postcodes)
+            self.send_json(200, {'status': 200, 'result': results})
+
+        def do_GET(self):
+            if not self.path.startswith('/postcodes/'):
+                self.send_json(404, {'status': 404, 'error': 'Resource not found'})
+                return
+            if self.refused():
+                return
+            postcode = unquote(self.path.rsplit('/', 1)[-1])
+            latitude, longitude = coordinates(postcode)
+            with stats_lock:
+                stats['single lookups'] = stats['single lookups'] + 1
+            if postcode.endswith('ZZ'):
+                self.send_json(404, {'status': 404, 'error': 'Postcode terminated',
+                                     'terminated': {'postcode': postcode, 'latitude': latitude, 'longitude': longitude}})
+            else:
+                self.send_json(200, {'status': 200, 'result': {'postcode': postcode, 'latitude': latitude, 'longitude': longitude}})
+
+    server = ThreadingHTTPServer((host, port), PostcodeStubHandler)
+    server.daemon_threads = True
+    server.stats = stats
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_vmanage_stub(port=0, task_seconds=1.0, username='admin', password='admin', host='127.0.0.1'):
+
+    # Function to start a local stand-in for the vManage API on a background thread - returns the server (see server.server_address)
+    # It answers the calls push_device_rows makes: login, XSRF token, device template list and variables, attachfeature and
+    # the attach task status. Its one device template (sdwan-import-stub) has a variable for every key
+    # An attach task reports in_progress for task_seconds and then done - a device whose host name contains a space fails, as in vManage
+    # server.stats counts the requests and devices, server.attached holds the last values attached for each device
+
+    import itertools
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    template_id = 'c0ffee00-5d3a-4b1e-9a7f-000000000017'
+    columns = [{'title': 'Device ID', 'property': 'csv-deviceId'}, {'title': 'System IP', 'property': 'csv-deviceIP'},
+               {'title': 'Host Name', 'property': 'csv-host-name'}]
+    columns.extend({'title': key if '(' in key else f'Value({key})', 'property': f'//variables/{key}'}
+                   for key in keys if key not in ('Device ID', 'System IP', 'Host Name'))
+    stats = {'logins': 0, 'attach requests': 0, 'devices': 0, 'failed devices': 0, 'status polls': 0, 'rejected': 0}
+    stats_lock = threading.Lock()
+    tasks = {}
+    attached = {}
+    task_ids = itertools.count(1)
+    session_id = 'stub-session'
+
+    class VManageStubHandler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status, body, content_type='application/json', headers=()):
+            body = body if isinstance(body, bytes) else json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def count(self, name, amount=1):
+            with stats_lock:
+                stats[name] = stats[name] + amount
+
+        def logged_in(self):
+            if f'JSESSIONID={session_id}' in (self.headers.get('Cookie') or ''):
+                return True
+            self.count('rejected')
+            self.send_body(401, {'error': {'message': 'Not logged in'}})
+            return False
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            if self.path == '/j_security_check':
+                form = parse_qs(body.decode())
+                if form.get('j_username') == [username] and form.get('j_password') == [password]:
+                    self.count('logins')
+                    self.send_body(200, b'', 'text/plain', [('Set-Cookie', f'JSESSIONID={session_id}; Path=/')])
+                else:
+                    self.send_body(200, b'<html><body>Login</body></html>', 'text/html')
+                return
+            if not self.logged_in():
+                return
+            if self.headers.get('X-XSRF-TOKEN') != 'stub-token':
+                self.count('rejected')
+                self.send_body(403, {'error': {'message': 'Missing XSRF token'}})
+                return
+            try:
+                request = json.loads(body)
+            except ValueError:
+                self.send_body(400, {'error': {'message': 'Invalid JSON'}})
+                return
+
+            if self.path == '/dataservice/template/device/config/input':
+                if request.get('templateId') != template_id:
+                    self.send_body(400, {'error': {'message': 'Unknown template'}})
+                else:
+                    self.send_body(200, {'header': {'columns': columns}, 'data': []})
+            elif self.path == '/dataservice/template/device/config/attachfeature':
+                template = (request.get('deviceTemplateList') or [{}])[0]
+                devices = template.get('device') or []
+                if template.get('templateId') != template_id or not all('csv-deviceId' in device and 'csv-host-name' in device for device in devices):
+                    self.send_body(400, {'error': {'message': 'Invalid attach request'}})
+                    return
+                results = []
+                for device in devices:
+                    failed = ' ' in device['csv-host-name']
+                    results.append({'host-name': device['csv-host-name'], 'deviceID': device['csv-deviceId'],
+                                    'status': 'Failure' if failed else 'Success',
+                                    'activity': ['Invalid host name' if failed else 'Template successfully attached to device']})
+                    if not failed:
+                        attached[device['csv-deviceId']] = device
+                task_id = f'push_feature_template_configuration-{next(task_ids)}'
+                with stats_lock:
+                    tasks[task_id] = (time.monotonic() + task_seconds, results)
+                    stats['attach requests'] = stats['attach requests'] + 1
+                    stats['devices'] = stats['devices'] + len(devices)
+                    stats['failed devices'] = stats['failed devices'] + sum(1 for result in results if result['status'] == 'Failure')
+                self.send_body(200, {'id': task_id})
+            else:
+                self.send_body(404, {'error': {'message': 'Not found'}})
+
+        def do_GET(self):
+            if not self.logged_in():
+                return
+            if self.path == '/dataservice/client/token':
+                self.send_body(200, b'stub-token', 'text/plain')
+            elif self.path == '/dataservice/template/device':
+                self.send_body(200, {'data': [{'templateId': template_id, 'templateName': 'sdwan-import-stub'}]})
+            elif self.path.startswith('/dataservice/device/action/status/'):
+                self.count('status polls')
+                task = tasks.get(self.path.rsplit('/', 1)[-1])
+                if task is None:
+                    self.send_body(404, {'error': {'message': 'Unknown task'}})
+                elif time.monotonic() < task[0]:
+                    self.send_body(200, {'summary': {'status': 'in_progress'}, 'data': []})
+                else:
+                    counts = {'Success': sum(1 for result in task[1] if result['status'] == 'Success')}
+                    counts['Failure'] = len(task[1]) - counts['Success']
+                    self.send_body(200, {'summary': {'status': 'done', 'count': counts}, 'data': task[1]})
+            else:
+                self.send_body(404, {'error': {'message': 'Not found'}})
+
+    server = ThreadingHTTPServer((host, port), VManageStubHandler)
+    server.daemon_threads = True
+    server.stats = stats
+    server.attached = attached
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_benchmark(sizes, repeat, workers, report_file, baseline_file=None, stub_options=None):
+
+    # Function to time each stage of a run against synthetic trackers of each size and write a report to compare across runs
+    # Stages: load (read_tracker), transform (transform_rows), duplicates (subnet_conflict_messages), geocode (resolve_postcodes
+    # against a local stub) and csv (write_device_rows) - each is the best of repeat runs
+    # If a baseline report is given the stages that are more than 20% slower than it are flagged
+    # stub_options are passed to start_postcode_stub so geocoding can be timed with latency, errors or a rate limit
+
+    import tempfile
+    import platform
+
+    stub = start_postcode_stub(**(stub_options or {}))
+    stub_uri = f'http://127.0.0.1:{stub.server_address[1]}/postcodes'
+    stages = ['load', 'transform', 'duplicates', 'geocode', 'csv']
+
+    def best_time(stage_function):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = stage_function()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
+
+    results = {}
+    with tempfile.TemporaryDirectory() as bench_dir:
+        for rows in sizes:
+            print(f'Benchmarking {rows} rows ...')
+            tracker_file = os.path.join(bench_dir, f'tracker-{rows}.xlsx')
+            bench_tracker(tracker_file, rows)
+            timings = {}
+
+            timings['load'], tracker_rows = best_time(lambda: read_tracker(tracker_file))
+            timings['transform'], row_results = best_time(lambda: transform_rows(tracker_rows, workers))
+
+            subnet_entries = [(first, last, row_result['store_num'], tracker_rec[0], vlan, subnet)
+                              for tracker_rec, row_result in zip(tracker_rows, row_results) for vlan, subnet, first, last in row_result['subnets']]
+            timings['duplicates'], conflict_messages = best_time(lambda: subnet_conflict_messages(subnet_entries))
+
+            postcode_plan = plan_postcode_lookups([row_result['postcode'] for row_result in row_results if row_result['devices']])
+            timings['geocode'], geocodes = best_time(lambda: resolve_postcodes(postcode_plan, geocode_workers, stub_uri))
+
+            device_rows = []
+            for row_result in row_results:
+                latitude, longitude, terminated = geocodes.get(row_result['postcode'], (None, None, False))
+                for device in row_result['devices']:
+                    device_row = DeviceRow(list(device), row_result['postcode'])
+                    device_row['basic_gpsl_latitude'] = latitude
+                    device_row['basic_gpsl_longitude'] = longitude
+                    device_rows.append(device_row)
+            csv_file = os.path.join(bench_dir, f'vmanage-{rows}.csv')
+            timings['csv'], invalid_hosts = best_time(lambda: write_device_rows(csv_file, device_rows))
+
+            timings['total'] = sum(timings[stage] for stage in stages)
+            results[str(rows)] = {'timings': timings, 'devices': len(device_rows), 'postcodes': len(postcode_plan),
+                                  'conflicts': len(conflict_messages)}
+    stub.shutdown()
+
+    report = {'created': datetime.now().isoformat(timespec='seconds'), 'script': run_state_version(),
+              'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count(),
+              'repeat': repeat, 'workers': workers, 'stub': stub_options or {}, 'stub_requests': stub.stats, 'results': results}
+    with open(report_file, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    baseline = {}
+    if baseline_file:
+        with open(baseline_file, 'r') as f:
+            baseline = json.load(f)['results']
+
+    print('\n' + '-' * 100)
+    print(f'{"rows":>8} ' + ' '.join(f'{stage:>12}' for stage in stages + ['total']) + '   (seconds, best of ' + str(repeat) + ')')
+    print('-' * 100)
+    regressions = []
+    for rows, result in results.items():
+        print(f'{rows:>8} ' + ' '.join(f'{result["timings"][stage]:12.4f}' for stage in stages + ['total']))
+        if rows in baseline:
+            ratios = []
+            for stage in stages + ['total']:
+                ratio = result['timings'][stage] / baseline[rows]['timings'][stage] if baseline[rows]['timings'][stage] else 1.0
+                ratios.append(ratio)
+                if ratio > 1.2:
+                    regressions.append(f'{rows} rows {stage} {ratio:.2f}x slower than the baseline')
+            print(f'{"vs base":>8} ' + ' '.join(f'{ratio:11.2f}x' for ratio in ratios))
+    print('-' * 100)
+    for regression in regressions:
+        print(f'WARNING: {regression}')
+    print(f'\nBenchmark report written to {report_file}\n')
+    return regressions
+
 
 # -----------------------------
 # --- Main code starts here ---
 # -----------------------------
-# Open the tracker sheet
-
-try:
-    tracker_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/NOF2025 Rollout tracker.xlsx'
-    m_time = os.path.getmtime(tracker_filepath)
-    last_updated_dt = datetime.fromtimestamp(m_time)
-    last_updated = last_updated_dt.strftime('%Y-%m-%d %H:%M:%S')
-    
-    current_time_dt = datetime.now()
-    current_time = current_time_dt.strftime('%Y-%m-%d %H:%M:%S')
-    time_diff = current_time_dt - last_updated_dt
-    time_diff_str = str(time_diff).split('.')[0]  # Remove microseconds for cleaner output
-    
-    timestamp_file = '.last_run_timestamp'
-    if os.path.exists(timestamp_file):
-        with open(timestamp_file, 'r') as f:
-            prev_time = f.read().strip()
-        if prev_time == str(m_time):
-            print('-' * 80)
-            print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
-            print(f'Current time:                                  {current_time}')
-            print(f'Time difference:                               {time_diff_str}')
-            print('WARNING: The tracker file has not changed since the last run.')
-            print('-' * 80)
-            choice = input('Do you want to continue? (y/n): ')
-            if choice.lower() != 'y':
-                print('Exiting...\n')
-                sys.exit()
-        else:
-            print('-' * 80)
-            print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
-            print(f'Current time:                                  {current_time}')
-            print(f'Time difference:                               {time_diff_str}')
-            print('-' * 80 + '\n')
-    else:
-        print('-' * 80)
-        print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
-        print(f'Current time:                                  {current_time}')
-        print(f'Time difference:                               {time_diff_str}')
-        print('-' * 80 + '\n')
-        
-    with open(timestamp_file, 'w') as f:
-        f.write(str(m_time))
 
-    tracker_wb_obj = openpyxl.load_workbook(tracker_filepath)
-except FileNotFoundError:
-    print('*' * 120,'\nError: NOF2025 Rollout tracker.xlsx file not found - please check the folder location\n','*' * 120)
-    sys.exit()
-
-tracker_sheet_obj = tracker_wb_obj.active
-# determine how many rows we have
-max_row = tracker_sheet_obj.max_row
+# tracker sheet read by the script and the import sheet it writes
+tracker_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/NOF2025 Rollout tracker.xlsx'
+vmanage_csv_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/vmanage-import-sc.csv'
+# every tracker row that fails a validation rule, with a .json copy alongside - see validation_rules
+validation_report_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/tracker-validation-sc.csv'
+# the devices added or changed since the last vmanage-import-sc.csv and the devices no longer in the tracker
+vmanage_delta_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/vmanage-import-sc-delta.csv'
+vmanage_removed_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/vmanage-removed-sc.csv'
+# the import sheet split into shards of device rows written in parallel - see --shard
+vmanage_shard_dir = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/vmanage-import-sc-shards'
+vmanage_shard_rows = 500  # most device rows in one shard - see --shard
+vmanage_shard_site_range = 1000  # Site Ids in one shard for --shard site-range
+vmanage_shard_workers = 4
+
+# local cache of postcode lookups - entries older than geocode_cache_days are looked up again
+lookup_cache_file = '.lookup_cache.sqlite'
+tracker_cache_dir = '.tracker_cache'  # tracker sheets already read, keyed by the sha256 of the file - see --tracker-cache-stats
+tracker_cache_entries = 3  # versions of the tracker kept in the cache
+tracker_cache_format = 2  # 2 - formula cells hold their values
+geocode_cache_days = 90
+
+# number of postcode API requests allowed in flight at once
+geocode_workers = 4
+geocode_retries = 3  # retries of a postcode API request that is refused (429) or fails (5xx)
+watch_interval = 0.1  # seconds between checks of the tracker in --watch mode
+watch_debounce = 0.5  # seconds the tracker must be unchanged before --watch regenerates
+transform_workers = 1  # worker processes for the row transform - 1 transforms in this process
+transform_chunk_rows = 250  # fewest rows sent to a worker process at a time
+bench_sizes = [100, 1000, 10000, 50000]  # tracker rows for --bench
+bench_report_file = 'bench-report.json'
+run_profile_file = 'run-profile.json'  # default report file for --profile
+store_subnets_filepath = 'scoop-subnets.csv'  # address plan of every store number written by test_store_nets - see test_run in main
+postcode_stub_port = 8765
+postcode_index_file = 'postcode-index.bin'  # offline postcode index - see --geocode-index
+route_summary_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/route-summary-sc.csv'
+summary_waste = 0.0  # fraction of a summary that may be unused addresses - 0 summarises exactly, see --summarise
+summary_min_prefix = 8  # shortest prefix a summary with unused addresses may have
+whois_workers = 4  # concurrent whois lookups - see --dnac-routes
+whois_rate = 2  # whois lookups started per second at most
+whois_retries = 3
+whois_cache_days = 365
+dnac_routes_filepath = '/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/dnac-routes-sc.csv'
+vmanage_url = None  # vManage to attach the device rows to e.g. https://vmanage.example.net:8443 - see --push
+vmanage_push_batch = 50  # devices in one attach request
+vmanage_push_workers = 4  # attach requests in flight at once
+vmanage_poll_interval = 5  # seconds between attach task status checks
+vmanage_task_timeout = 1800  # seconds an attach task may run before its devices are reported as timed out
+vmanage_stub_port = 8766
+run_stats = RunStats(script_start, 0)
+
+# row results from the last run - rows whose fingerprint is unchanged are reused instead of transformed again
+# it holds the device rows (PPPoE passwords included, as in the import csv) and is written readable by the owner only
+run_state_file = '.last_run_state.json'
+
+# time allowed from the first line of the script to the tracker check and the libraries that must not be loaded by then
+startup_budget = 0.15
+heavy_modules = ('pandas', 'numpy', 'openpyxl', 'requests', 'ipwhois')
 
 # initialise some variables
 keys = ['Device ID',
@@ -383,7 +3111,185 @@ keys = ['Device ID',
 'qos_Interface_1',
 'port_offset']
 
-vmanage_dict = {key: [] for key in keys}
+# position of each key in a DeviceRow
+key_index = {key: position for position, key in enumerate(keys)}
+
+# Section 1 continued - how each template variable is derived from the tracker row, see compile_rule for the rule format
+# Every key needs a router1 rule. Router 2 starts from the router 1 values so router2 only has the rules for values that differ
+router1_rules = {
+    'basic_gpsl_latitude': None,
+    'basic_gpsl_longitude': None,
+    'Device ID': "{'C1127X-8PLTEP-' if router1_serial == 'FGL2623LBSX' else 'C1121X-8P-'}{router1_serial}",
+    'System IP': '{router1_systemip}',
+    'Host Name': '{router1_hostname}',
+    'Site Id': '{site_id}',
+    'Dual Stack IPv6 Default': 'FALSE',
+    'Rollback Timer (sec)': '300',
+    'provision_port_disable': '{provision_port_disable}',
+    'vlan31_vrrp_pri': '110',
+    'vlan31_vrrp_ipv4': '{ip(vlan31[-2])}',
+    'vlan31_ipv4': '{ip(vlan31[-4])}',
+    'vlan31_mask': '{ip(vlan31.netmask)}',
+    'vlan31_dhcp_net': '{ip(vlan31.network)}',
+    'vlan31_dhcp_mask': '{ip(vlan31.netmask)}',
+    'vlan31_dhcp_exclude': '{ip(vlan31.network + 7)}-{ip(vlan31[-2])}',
+    'vlan31_dhcp_gateway': '{ip(vlan31[-2])}',
+    'vlan120_vrrp_pri': '110',
+    'vlan120_vrrp_ipv4': '{ip(vlan120.network + 254)}',
+    'vlan120_ipv4': '{ip(vlan120.network + 252)}',
+    'vlan120_mask': '{ip(vlan120.netmask)}',
+    'vlan120_dhcp_exclude': '{ip(vlan120.network + 128)}-{ip(vlan120.network + 254)}',
+    'vlan100_vrrp_pri': '110',
+    'vlan100_vrrp_ipv4': '{ip(vlan100.network + 254)}',
+    'vlan100_ipv4': '{ip(vlan100.network + 252)}',
+    'vlan100_mask': '{ip(vlan100.netmask)}',
+    'vlan100_dhcp_exclude': '{ip(vlan100.network + 128)}-{ip(vlan100.network + 254)}',
+    'vlan101_vrrp_pri': '110',
+    'vlan101_vrrp_ipv4': '{ip(vlan101.network + 30)}',
+    'vlan101_ipv4': '{ip(vlan101.network + 28)}',
+    'vlan101_mask': '{ip(vlan101.netmask)}',
+    'vlan101_dhcp_net': '{ip(vlan101.network)}',
+    'vlan101_dhcp_mask': '{ip(vlan101.netmask)}',
+    'vlan101_dhcp_gateway': '{ip(vlan101.network + 30)}',
+    'vlan101_dhcp_exclude': '{ip(vlan101[14])}-{ip(vlan101[-2])}',
+    'vlan40_vrrp_pri': '110',
+    'vlan40_vrrp_ipv4': '{ip(vlan40.network + 254)}',
+    'vlan40_ipv4': '{ip(vlan40.network + 252)}',
+    'vlan40_mask': '{ip(vlan40.netmask)}',
+    'vlan40_dhcp_exclude': '{ip(vlan40.network + 128)}-{ip(vlan40.network + 254)}',
+    'vlan30_vrrp_pri': '110',
+    'vlan30_vrrp_ipv4': '{ip(vlan30.network + 254)}',
+    'vlan30_ipv4': '{ip(vlan30.network + 252)}',
+    'vlan30_mask': '{ip(vlan30.netmask)}',
+    'vlan30_dhcp_exclude': '{ip(vlan30.network + 128)}-{ip(vlan30.network + 254)}',
+    'vlan20_vrrp_pri': '110',
+    'vlan20_vrrp_ipv4': '{ip(vlan20.network + 126)}',
+    'vlan20_ipv4': '{ip(vlan20.network + 124)}',
+    'vlan20_mask': '{ip(vlan20.netmask)}',
+    'vlan20_dhcp_net': '{ip(vlan20.network)}',
+    'vlan20_dhcp_mask': '{ip(vlan20.netmask)}',
+    'vlan20_dhcp_exclude': '{ip(vlan20.network + 64)}-{ip(vlan20.network + 126)}',
+    'vlan20_dhcp_gateway': '{ip(vlan20.network + 126)}',
+    'vlan10_vrrp_pri': '110',
+    'vlan10_vrrp_ipv4': '{ip(vlan10.network + 126)}',
+    'vlan10_ipv4': '{ip(vlan10.network + 124)}',
+    'vlan10_mask': '{ip(vlan10.netmask)}',
+    'vlan10_dhcp_net': '{ip(vlan10.network)}',
+    'vlan10_dhcp_mask': '{ip(vlan10.netmask)}',
+    'vlan10_dhcp_exclude': '{ip(vlan10.network + 64)}-{ip(vlan10.network + 126)}',
+    'vlan10_dhcp_gateway': '{ip(vlan10.network + 126)}',
+    'vlan60_vrrp_pri': '110',
+    'vlan60_vrrp_ipv4': '{ip(vlan60.network + 254)}',
+    'vlan60_ipv4': '{ip(vlan60.network + 252)}',
+    'vlan60_mask': '{ip(vlan60.netmask)}',
+    'vlan70_vrrp_pri': '110',
+    'vlan70_vrrp_ipv4': '{ip(vlan70.network + 254)}',
+    'vlan70_ipv4': '{ip(vlan70.network + 252)}',
+    'vlan70_mask': '{ip(vlan70.netmask)}',
+    'vlan80_vrrp_pri': '110',
+    'vlan80_vrrp_ipv4': '{ip(vlan80.network + 1)}',
+    'vlan80_ipv4': '{ip(vlan80.network + 252)}',
+    'vlan80_mask': '{ip(vlan80.netmask)}',
+    'tloc_next_hop': '192.168.12.2',
+    'tloc_bandwidth_up': '{kbps(circuit1_bw_up)}',
+    'tloc_bandwidth_down': '{kbps(circuit1_bw_down)}',
+    'wan_bandwidth_up': '{kbps(circuit1_bw_up)}',
+    'wan_bandwidth_down': '{kbps(circuit1_bw_down)}',
+    'wan_desc': '{circuit1_ref} - {circuit1_type} via {circuit1_provider}',
+    'ethpppoe_chapHost': '{circuit1_ppp_name}',
+    'ethpppoe_chapPwd': '{circuit1_ppp_pwd}',
+    'wan_color': '{router1_wan_color}',
+    'ethpppoe_ipsecPrefer': '111',
+    'wan_shapingRate': '{kbps(circuit1_bw_up)}',
+    'wan_track_addr': '1.1.1.1',
+    'wan_track_addr_tloc': '208.67.222.222',
+    'loopback0_ipv4': '{router1_systemip}',
+    'loopback0_mask': '255.255.255.255',
+    'lan_vpn_100_nat_1_rangeStart': '{ip(cctv_nat)}',
+    'lan_vpn_100_nat_1_rangeEnd': '{ip(cctv_nat + 1)}',
+    'lan_vpn_100_staticNat_1_translatedSourceIp': '{ip(cctv_nat)}',
+    'lan_vpn_100_staticNat_2_translatedSourceIp': '{ip(cctv_nat + 1)}',
+    'vlan2_vrrp_pri': '110',
+    'vlan2_vrrp_ipv4': '{ip(vlan2[-2])}',
+    'vlan2_ipv4': '{ip(vlan2[-4])}',
+    'vlan2_mask': '{ip(vlan2.netmask)}',
+    'vlan2_dhcp_net': '{ip(vlan2.network)}',
+    'vlan2_dhcp_mask': '{ip(vlan2.netmask)}',
+    'vlan2_dhcp_exclude': '{ip(vlan2[3] if dual_router else vlan2[5])}-{ip(vlan2[-2])}',
+    'vlan2_dhcp_gateway': '{ip(vlan2[-2])}',
+    'static_wan_ip': '{router1_static_wan_ip}',
+    'static_wan_gw': '{router1_static_wan_gw}',
+    'static_wan_mask': '{router1_static_wan_mask}',
+    'cloudSaaSDeviceRole_variable': 'dia',
+    'cloudSaaSVpnType_variable': 'service-vpn',
+    'cloudSaasTlocList_variable': 'all',
+    'cloudSaasSigTunnelList_variable': '',
+    'cloudSaasSigEnabled_variable': 'FALSE',
+    'cloudSaasInterfaceList_variable': '',
+    'cloudSaasLBEnabled_variable': 'TRUE',
+    'cloudSaasLoss_variable': 5,
+    'cloudSaasLatency_variable': 100,
+    'cloudSaasSourceIpBased_variable': 'TRUE',
+    'qos_Interface_1': '{interface1}',
+    'port_offset': 0,
+}
+router2_rules = {
+    'Device ID': 'C1121X-8P-{router2_serial}',
+    'System IP': '{router2_systemip}',
+    'Host Name': '{router2_hostname}',
+    'vlan31_vrrp_pri': '100',
+    'vlan31_ipv4': '{ip(vlan31[-3])}',
+    'vlan31_dhcp_exclude': '{ip(vlan31.network + 1)}-{ip(vlan31.network + 6)}";"{ip(vlan31[-4])}-{ip(vlan31[-2])}',
+    'vlan120_vrrp_pri': '100',
+    'vlan120_ipv4': '{ip(vlan120.network + 253)}',
+    'vlan120_dhcp_exclude': '{ip(vlan120.network + 1)}-{ip(vlan120.network + 127)}";"{ip(vlan120.network + 252)}-{ip(vlan120.network + 254)}',
+    'vlan100_vrrp_pri': '100',
+    'vlan100_ipv4': '{ip(vlan100.network + 253)}',
+    'vlan100_dhcp_exclude': '{ip(vlan100.network + 1)}-{ip(vlan100.network + 127)}";"{ip(vlan100.network + 252)}-{ip(vlan100.network + 254)}',
+    'vlan101_vrrp_pri': '100',
+    'vlan101_ipv4': '{ip(vlan101.network + 29)}',
+    'vlan101_dhcp_exclude': '{ip(vlan101[1])}-{ip(vlan101[14])}";"{ip(vlan101.network + 28)}-{ip(vlan101.network + 30)}',
+    'vlan40_vrrp_pri': '100',
+    'vlan40_ipv4': '{ip(vlan40.network + 253)}',
+    'vlan40_dhcp_exclude': '{ip(vlan40.network + 1)}-{ip(vlan40.network + 127)}";"{ip(vlan40.network + 252)}-{ip(vlan40.network + 254)}',
+    'vlan30_vrrp_pri': '100',
+    'vlan30_ipv4': '{ip(vlan30.network + 253)}',
+    'vlan30_dhcp_exclude': '{ip(vlan30.network + 1)}-{ip(vlan30.network + 127)}";"{ip(vlan30.network + 252)}-{ip(vlan30.network + 254)}',
+    'vlan20_vrrp_pri': '100',
+    'vlan20_ipv4': '{ip(vlan20.network + 125)}',
+    'vlan20_dhcp_exclude': '{ip(vlan20.network + 1)}-{ip(vlan20.network + 63)}";"{ip(vlan20.network + 124)}-{ip(vlan20.network + 126)}',
+    'vlan10_vrrp_pri': '100',
+    'vlan10_ipv4': '{ip(vlan10.network + 125)}',
+    'vlan10_dhcp_exclude': '{ip(vlan10.network + 1)}-{ip(vlan10.network + 63)}";"{ip(vlan10.network + 124)}-{ip(vlan10.network + 126)}',
+    'vlan60_vrrp_pri': '100',
+    'vlan60_ipv4': '{ip(vlan60.network + 253)}',
+    'vlan70_vrrp_pri': '100',
+    'vlan70_ipv4': '{ip(vlan70.network + 253)}',
+    'vlan80_vrrp_pri': '100',
+    'vlan80_ipv4': '{ip(vlan80.network + 253)}',
+    'tloc_next_hop': '192.168.21.1',
+    'tloc_bandwidth_up': '{kbps(circuit2_bw_up)}',
+    'tloc_bandwidth_down': '{kbps(circuit2_bw_down)}',
+    'wan_bandwidth_up': '{kbps(circuit2_bw_up)}',
+    'wan_bandwidth_down': '{kbps(circuit2_bw_down)}',
+    'wan_desc': '{circuit2_ref} - {circuit2_type} via {circuit2_provider}',
+    'ethpppoe_chapHost': '{circuit2_ppp_name}',
+    'ethpppoe_chapPwd': '{circuit2_ppp_pwd}',
+    'wan_color': '{router2_wan_color}',
+    'ethpppoe_ipsecPrefer': '0',
+    'wan_shapingRate': '{kbps(circuit2_bw_up)}',
+    'wan_track_addr': '208.67.222.222',
+    'wan_track_addr_tloc': '1.1.1.1',
+    'loopback0_ipv4': '{router2_systemip}',
+    'vlan2_vrrp_pri': '100',
+    'vlan2_ipv4': '{ip(vlan2[-3])}',
+    'vlan2_dhcp_exclude': '{ip(vlan2[1])}-{ip(vlan2[2])}";"{ip(vlan2[5])}-{ip(vlan2[-2])}',
+    'static_wan_ip': '{router2_static_wan_ip}',
+    'static_wan_gw': '{router2_static_wan_gw}',
+    'static_wan_mask': '{router2_static_wan_mask}',
+    'qos_Interface_1': '{interface2}',
+    'port_offset': 1,
+}
 
 # define column numbers for the tracker sheet (1 = column A) - this makes it easier to modify later if the tracker sheet changes
 store_num_col = 1  # column A
@@ -412,663 +3318,652 @@ circuit2_ppp_pwd_col = 25  # column Y
 vlan2_col = 26  # column Z
 vlan60_col = 27  # column AA
 provision_port_disable_col = 28 # column AB
-
-unique_subnets = set()
-
-# main loop - loop through the tracker sheet and build rows for the vmanage-import-sc.csv dictionary transforming some of the data
-
-test_run = False  # set to True to test store_nets function only
-
-if test_run:
-    print('\nTest run selected - no changes will be made to vManage import sheet\n')
-    novalue = test_store_nets()
-    sys.exit()
-
-tracker_row = 3
-postcode_list = []
-print(f'{max_row} rows found ...\n')
-
-while tracker_row <= max_row:
-
-    # get the store number and pad to 4 digits
-    store_num = str(tracker_sheet_obj.cell(row=tracker_row, column=store_num_col).value).zfill(4)
-
-    # if store number is missing skip to next row
-    if store_num == '0000' or store_num == 'None':
-        tracker_row = tracker_row + 1
-        continue
-
-    # get the store type
-    store_type = str(tracker_sheet_obj.cell(row=tracker_row, column=store_type_col).value).upper()
+tracker_columns = ('store_num_col', 'store_type_col', 'postcode_col', 'router1_serial_col', 'router1_mgmt_ip_col',
+                   'circuit1_provider_col', 'circuit1_type_col', 'circuit1_bw_up_col', 'circuit1_bw_down_col', 'circuit1_ref_col',
+                   'circuit1_wan_subnet_col', 'circuit1_ppp_name_col', 'circuit1_ppp_pwd_col', 'router2_serial_col', 'router2_mgmt_ip_col',
+                   'circuit2_provider_col', 'circuit2_type_col', 'circuit2_bw_up_col', 'circuit2_bw_down_col', 'circuit2_ref_col',
+                   'circuit2_wan_subnet_col', 'circuit2_ppp_name_col', 'circuit2_ppp_pwd_col', 'vlan2_col', 'vlan60_col', 'provision_port_disable_col')
+tracker_max_col = provision_port_disable_col  # last column read from the tracker sheet
+
+# default bandwidth (down Mbps, up Mbps) and WAN interface by circuit type, used when the tracker has no bandwidth for a circuit
+circuit_bandwidths = {'FTTP': (80, 20, 'Dialer1'),
+                      'SOGEA': (80, 20, 'Dialer1'),
+                      'FTTC': (80, 20, 'Dialer1'),
+                      'ADSL': (24, 3, 'Dialer1'),
+                      'OFNL Fibre': (80, 20, 'GigabitEthernet0/0/0'),
+                      'ETHERNET': (100, 100, 'GigabitEthernet0/0/0')}
+
+# the VRF the generated store subnets of each VLAN are routed in - the subnets are summarised per VRF by --summarise
+summary_vrfs = {'VLAN 10': 100, 'VLAN 20': 100, 'VLAN 31': 100, 'VLAN 60': 100, 'VLAN 101': 100, 'VLAN 70': 700}
+
+# the validation rules run over the whole tracker by validate_tracker - (rule, severity, column, message, check)
+# check is given the columns from validation_columns and returns True for each row that fails - a rule is only reported for
+# rows with a store number. Errors are the problems transform_row skips a row for (or would fail on), warnings are reported only
+validation_rules = [
+    ('missing store number', 'error', 'store_num', 'row has tracker data but no store number - the row is skipped',
+     lambda c: [not active and (serial not in ('NONE', '') or mgmt_ip not in ('None', '') or postcode not in ('None', ''))
+                for active, serial, mgmt_ip, postcode in zip(c['active'], c['router1_serial'], c['router1_mgmt_ip'], c['postcode'])]),
+    ('store number has a space', 'warning', 'store_num', 'store number has a space - the host names will have a space',
+     lambda c: [' ' in value for value in c['store_num']]),
+    ('duplicate store number', 'warning', 'store_num', 'store number is used on another row',
+     lambda c: duplicated(c['store_num'])),
+    ('invalid store type', 'error', 'store_type', 'store type does not start with a number - the row is skipped',
+     lambda c: [digit is None for digit in c['store_type_digit']]),
+    ('missing router 1 serial', 'error', 'router1_serial', 'router 1 has no serial number - the row is skipped',
+     lambda c: [serial in ('NONE', '') for serial in c['router1_serial']]),
+    ('duplicate router serial', 'error', 'router1_serial', 'a router serial number is used on another row',
+     lambda c: duplicated(c['router1_serial'], [serial if dual else 'NONE' for serial, dual in zip(c['router2_serial'], c['dual_router'])])),
+    ('invalid router 1 management IP', 'error', 'router1_mgmt_ip', 'router 1 management IP is not an IP address - the row is skipped',
+     lambda c: [not valid for valid in valid_networks(c['router1_mgmt_ip'], '/32')]),
+    ('missing router 2 management IP', 'error', 'router2_mgmt_ip', 'router 2 has no management IP - the row is skipped',
+     lambda c: [dual and value in ('None', '') for dual, value in zip(c['dual_router'], c['router2_mgmt_ip'])]),
+    ('invalid router 2 management IP', 'error', 'router2_mgmt_ip', 'router 2 management IP is not an IP address',
+     lambda c: [dual and value not in ('None', '') and not valid for dual, value, valid in zip(c['dual_router'], c['router2_mgmt_ip'], valid_networks(c['router2_mgmt_ip'], '/32'))]),
+    ('missing circuit 1 provider', 'error', 'circuit1_provider', 'circuit 1 has no provider - the row is skipped',
+     lambda c: [provider in ('NONE', '') for provider in c['circuit1_provider']]),
+    ('unknown circuit 1 type', 'warning', 'circuit1_type', 'circuit 1 type has no default bandwidth or interface in circuit_bandwidths',
+     lambda c: [circuit_type not in circuit_bandwidths for circuit_type in c['circuit1_type']]),
+    ('unknown circuit 2 type', 'warning', 'circuit2_type', 'circuit 2 type has no default bandwidth or interface in circuit_bandwidths',
+     lambda c: [dual and circuit_type not in circuit_bandwidths for dual, circuit_type in zip(c['dual_router'], c['circuit2_type'])]),
+    ('invalid circuit 1 bandwidth', 'error', 'circuit1_bw_down', 'circuit 1 bandwidth is not a number',
+     lambda c: [not (down and up) for down, up in zip(valid_numbers([value if value != 'None' else '0' for value in c['circuit1_bw_down']]),
+                                                        valid_numbers([value if value != 'None' else '0' for value in c['circuit1_bw_up']]))]),
+    ('invalid circuit 2 bandwidth', 'error', 'circuit2_bw_down', 'circuit 2 bandwidth is not a number',
+     lambda c: [dual and not (down and up) for dual, down, up in zip(c['dual_router'], valid_numbers([value if value != 'None' else '0' for value in c['circuit2_bw_down']]),
+                                                                      valid_numbers([value if value != 'None' else '0' for value in c['circuit2_bw_up']]))]),
+    ('invalid circuit 1 WAN subnet', 'error', 'circuit1_wan_subnet', 'circuit 1 is ETHERNET but the static WAN subnet is not a network',
+     lambda c: [circuit_type == 'ETHERNET' and not valid for circuit_type, valid in zip(c['circuit1_type'], valid_networks(c['circuit1_wan_subnet'], '/29'))]),
+    ('invalid circuit 2 WAN subnet', 'error', 'circuit2_wan_subnet', 'circuit 2 is ETHERNET but the static WAN subnet is not a network',
+     lambda c: [dual and circuit_type == 'ETHERNET' and not valid for dual, circuit_type, valid in zip(c['dual_router'], c['circuit2_type'], valid_networks(c['circuit2_wan_subnet'], '/29'))]),
+    ('missing circuit 1 PPPoE name', 'warning', 'circuit1_ppp_name', 'circuit 1 has no PPPoE name - dummy BT details are used',
+     lambda c: [name == 'None' and 'BT' not in provider for name, provider in zip(c['circuit1_ppp_name'], c['circuit1_provider'])]),
+    ('missing circuit 2 PPPoE name', 'warning', 'circuit2_ppp_name', 'circuit 2 has no PPPoE name - dummy BT details are used',
+     lambda c: [dual and name == 'None' and 'BT' not in provider for dual, name, provider in zip(c['dual_router'], c['circuit2_ppp_name'], c['circuit2_provider'])]),
+    ('circuit 1 MAINTEL username', 'warning', 'circuit1_ppp_name', 'circuit 1 username does not begin with SCOOP-DIA-<provider>-MAINTEL-ISP for a MAINTEL provider',
+     lambda c: [provider in ('MAINTEL-BT', 'MAINTEL-PXC') and not name.startswith(f'SCOOP-DIA-{provider[8:]}-MAINTEL-ISP')
+                for provider, name in zip(c['circuit1_provider'], c['circuit1_ppp_name'])]),
+    ('circuit 2 MAINTEL username', 'warning', 'circuit2_ppp_name', 'circuit 2 username does not begin with SCOOP-DIA-<provider>-MAINTEL-ISP for a MAINTEL provider',
+     lambda c: [dual and provider in ('MAINTEL-BT', 'MAINTEL-PXC') and not name.startswith(f'SCOOP-DIA-{provider[8:]}-MAINTEL-ISP')
+                for dual, provider, name in zip(c['dual_router'], c['circuit2_provider'], c['circuit2_ppp_name'])]),
+    ('formula in VLAN 2', 'error', 'vlan2', 'VLAN 2 is a formula with no saved value that could not be resolved - the row is skipped',
+     lambda c: [value.startswith('=') for value in c['vlan2']]),
+    ('missing VLAN 2', 'error', 'vlan2', 'VLAN 2 network is missing - the row is skipped',
+     lambda c: [value == 'None' for value in c['vlan2']]),
+    ('invalid VLAN 2', 'error', 'vlan2', 'VLAN 2 is not a network',
+     lambda c: [value != 'None' and not value.startswith('=') and not valid for value, valid in zip(c['vlan2'], valid_networks(c['vlan2'], '/28'))]),
+    ('invalid VLAN 60', 'error', 'vlan60', 'VLAN 60 is not a network for an ELS store type - the row is skipped',
+     lambda c: [digit not in (None, 3, 4) and not valid for digit, valid in zip(c['store_type_digit'], valid_networks(c['vlan60'], '/24'))]),
+]
+
+# VLAN pairs that share address space within one store by design - these are not reported as overlaps
+# VLAN 10, 20 and 31 are in vrf 100 and VLAN 70 is in vrf 700, so VLAN 70 can reuse their /24
+# VLAN 10 and VLAN 31 are both in vrf 100 - the address plan (store_nets) builds VLAN 31 from the same octets as VLAN 10, so for
+# a store with a two digit second octet VLAN 31 is the first /28 of VLAN 10 e.g. store 2653 VLAN 10 10.126.53.0/25, VLAN 31 10.126.53.0/28
+store_vlan_overlaps = {frozenset(('VLAN 10', 'VLAN 70')), frozenset(('VLAN 20', 'VLAN 70')), frozenset(('VLAN 31', 'VLAN 70')), frozenset(('VLAN 10', 'VLAN 31'))}
+
+
+def run_import(args, run_state=None):
+
+    # Function to build vmanage-import-sc.csv from the tracker sheet - every stage after the tracker check
+    # run_state is the row results of the last run (read from run_state_file if None) - returns the row results of this run
+
+    # trace the memory of each stage for the run report - tracemalloc slows allocation heavy stages so only when it is asked for
+    if args.profile:
+        import tracemalloc
+        tracemalloc.start()
+
+    # read the tracker sheet once - one record per row from row 3 onwards
+    # the cache has the records of the last few versions of the sheet so an unchanged tracker isn't parsed again
+    run_stats.begin('tracker load')
     try:
-        store_type = int(store_type[0])  # first character only
-    except ValueError:
-        print(f'Error: invalid store type for store {store_num} row {tracker_row}  ... skipping to next row')
-        tracker_row = tracker_row + 1
-        continue
-    site_id = f'{store_type}{store_num}'
-
-    # get the postcode
-    postcode = str(tracker_sheet_obj.cell(row=tracker_row, column=postcode_col).value).upper().replace(' ', '')
-    # moved the append postcode to after router checks to avoid arrys being different sizes
-
-
-    # get router 1 serial number
-    router1_serial = str(tracker_sheet_obj.cell(row=tracker_row, column=router1_serial_col).value).upper()
-    router1_serial = sanatise_serial(router1_serial)
-
-    if router1_serial == 'NONE' or router1_serial == '':
-        #print(f'Error: missing router 1 serial number for store {store_num} row {tracker_row}  ... skipping to next row')
-        tracker_row = tracker_row + 1
-        continue
-  
-    # get circuit 1 type and bandwidth
-    circuit1_type = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_type_col).value).upper()
-    circuit1_bw_down = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_bw_down_col).value)
-    circuit1_bw_up = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_bw_up_col).value)
-    
-    if circuit1_bw_down == 'None' or circuit1_bw_up == 'None':
-        circuit1_bw_down, circuit1_bw_up, interface1 = circuit_bandwidth(circuit1_type)
-    else:
-        a, b, interface1 = circuit_bandwidth(circuit1_type)
-    
-    circuit1_bw_down = float(circuit1_bw_down)
-    circuit1_bw_up = float(circuit1_bw_up)
-
-    circuit1_ref = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_ref_col).value).upper()
-
-    router1_static_wan_ip = 'NONE'
-    router1_static_wan_gw = 'NONE'
-    router1_static_wan_mask = '255.255.255.248'
-
-    # get static wan IP and subnet if circuit type is ETHERNET
-    if circuit1_type == 'ETHERNET':
-        circuit1_static_wan_ip = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_wan_subnet_col).value)
-        
-        if '/' not in circuit1_static_wan_ip:
-            circuit1_static_wan_ip = circuit1_static_wan_ip + '/29'
-        
-        circuit1_wan_subnet = ipaddress.ip_network(circuit1_static_wan_ip, strict=False)
-
-        router1_static_wan_ip = str(circuit1_wan_subnet.network_address + 2)
-        router1_static_wan_gw = str(circuit1_wan_subnet.network_address + 1)
-        router1_static_wan_mask = str(circuit1_wan_subnet.netmask)
-
-        #print(f'Store {store_num} Router 1 static WAN IP {router1_static_wan_ip} GW {router1_static_wan_gw} Mask {router1_static_wan_mask}')
+        if args.no_tracker_cache:
+            tracker_rows = read_tracker(tracker_filepath)
+        else:
+            tracker_rows, cache_hit = read_tracker_cached(tracker_filepath, tracker_cache_dir)
+            run_stats.count('tracker cache hits' if cache_hit else 'tracker cache misses')
+    except FileNotFoundError:
+        print('*' * 120,'\nError: NOF2025 Rollout tracker.xlsx file not found - please check the folder location\n','*' * 120)
+        sys.exit()
 
-    # initialize router 2 variables in case of a single site router
-    router2_serial = 'NONE'
-    circuit2_type = 'NONE'
-    circuit2_bw_down = 0
-    circuit2_bw_up = 0
-    circuit2_type = 'NONE'
-    circuit2_ref = 'NONE'
-    circuit2_ppp_name = 'NONE'
-    circuit2_ppp_pwd = 'NONE'
-    router2_mgmt_ip = 'NONE'
-    router2_systemip = 'NONE'
-    router2_hostname = 'NONE'
-    router2_wan_color = 'NONE'
-    router2_static_wan_ip = 'NONE'
-    router2_static_wan_gw = 'NONE'
-    router2_static_wan_mask = '255.255.255.248'
+    # determine how many rows we have
+    max_row = tracker_rows[-1][0] if tracker_rows else 0
+
+    # check every row against every validation rule and report the failures together - see validation_rules
+    run_stats.begin('validate')
+    check_tracker(tracker_rows, validation_report_filepath)
+
+    # load the row results from the last run so unchanged rows are not transformed again
+    if run_state is None:
+        run_state = {} if args.full else load_run_state(run_state_file)
+    new_run_state = {}
+    rows_transformed = 0
+
+    device_rows = []
+    subnet_entries = []
+    route_entries = []
+    print(f'{max_row} rows found ...\n')
+
+    # transform the rows that have changed since the last run - in worker processes if --transform-workers is over 1
+    # the results are merged back in tracker order below so the messages and subnet checks are the same as a serial run
+    run_stats.begin('transform')
+    profiler = None
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    # the fingerprint is of the cells only, so a row inserted or sorted above does not change the rows below - the parts of a result
+    # that name the row are made again here: the subnets and routes get the row as they are collected and the messages are renamed
+    with_row = mapping_uses_row()
+    fingerprints = [row_fingerprint(tracker_rec, with_row) for tracker_rec in tracker_rows]
+    changed_recs = [tracker_rec for tracker_rec, fingerprint in zip(tracker_rows, fingerprints) if fingerprint not in run_state]
+    workers = args.transform_workers if args.transform_workers > 0 else os.cpu_count()
+    changed_results = iter(transform_rows(changed_recs, workers))
+
+    for tracker_rec, fingerprint in zip(tracker_rows, fingerprints):
+
+        tracker_row = tracker_rec[0]
+
+        # reuse the stored result if the row is unchanged since the last run otherwise take its new result
+        row_result = run_state.get(fingerprint)
+        if row_result is None:
+            row_result = next(changed_results)
+            rows_transformed = rows_transformed + 1
+        else:
+            move_row_result(row_result, tracker_row)
+        new_run_state[fingerprint] = row_result
+        if row_result['skipped']:
+            run_stats.skip(row_result['skipped'])
+
+        for message in row_result['messages']:
+            print(message)
+
+        # collect the globally significant subnets - they are checked across all stores once every row is read
+        for vlan, subnet, first, last in row_result['subnets']:
+            subnet_entries.append((first, last, row_result['store_num'], tracker_row, vlan, subnet))
+        for label, subnet in row_result['routes']:
+            route_entries.append((row_result['store_num'], tracker_row, label, subnet))
+
+        # collect the device rows for the csv - each carries its postcode for the GPS lookup
+        for device in row_result['devices']:
+            device_rows.append(DeviceRow(device, row_result['postcode']))
+
+    # end of main loop
+
+    if profiler:
+        import pstats
+        profiler.disable()
+        profiler.dump_stats(args.cprofile)
+        print(f'\nTransform profile saved to {args.cprofile} - top functions by cumulative time:')
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
+    print(f'\n{rows_transformed} rows transformed, {len(tracker_rows) - rows_transformed} unchanged rows reused from the last run')
+    run_stats.count('rows', len(tracker_rows))
+    run_stats.count('rows transformed', rows_transformed)
+    run_stats.count('rows reused', len(tracker_rows) - rows_transformed)
+    run_stats.count('rows skipped', sum(run_stats.skipped.values()))
+    run_stats.count('devices', len(device_rows))
+
+    # check the globally significant subnets of every store for duplicates and for subnets that fall inside another one
+    run_stats.begin('subnet check')
+    conflict_messages = subnet_conflict_messages(subnet_entries)
+    run_stats.count('subnet conflicts', len(conflict_messages))
+    if conflict_messages:
+        print('')
+    for message in conflict_messages:
+        print(message)
 
-    # get router 2 serial number if present otherwsie assume a singe router site
-    router2_serial = str(tracker_sheet_obj.cell(row=tracker_row, column=router2_serial_col).value).upper()
-    circuit2_provider = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_provider_col).value).upper()
+    # summarise the store subnets of each VRF into the fewest supernets for the route and ACL export
+    if args.summarise:
+        run_stats.begin('summarise')
+        try:
+            vrf_counts = write_route_summary(route_summary_filepath, subnet_entries, args.summary_waste, summary_min_prefix)
+        except PermissionError:
+            print('*' * 120, f'\nError: {os.path.basename(route_summary_filepath)} is open in another application or by another user - please close and re-run the script\n', '*' * 120)
+            sys.exit(1)
+        print('')
+        for vrf, (subnets, summaries) in vrf_counts.items():
+            print(f'VRF {vrf}: {subnets} subnets summarised into {summaries} routes')
+        run_stats.count('route summaries', sum(summaries for subnets, summaries in vrf_counts.values()))
 
-    if router2_serial != 'NONE' and circuit2_provider != 'NONE':
-        router2_serial = sanatise_serial(router2_serial)
+    # perform postcode lookups to obtain GPS coords
+    run_stats.begin('geocode')
+    print('\nPerforming postcode lookups ...\n')
 
-        # get circuit 2 type and bandwidth
-        circuit2_type = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_type_col).value).upper()
-        circuit2_bw_down = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_bw_down_col).value)
-        circuit2_bw_up = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_bw_up_col).value)
+    # each unique postcode is resolved once and the results are fanned back out to every device row - the postcodes of unchanged
+    # rows are answered by the lookup cache (or the index) like any other, so --cache-days and --geocode-index apply to them too
+    postcode_plan = plan_postcode_lookups(device.postcode for device in device_rows)
+    print(f'{len(device_rows)} devices, {len(postcode_plan)} unique postcodes to resolve')
 
-        if circuit2_bw_down == 'None' or circuit2_bw_up == 'None':
-            circuit2_bw_down, circuit2_bw_up, interface2 = circuit_bandwidth(circuit2_type)
-        else:
-            a, b, interface2 = circuit_bandwidth(circuit2_type)
-        
-        circuit2_bw_down = float(circuit2_bw_down)
-        circuit2_bw_up = float(circuit2_bw_up)
+    if args.geocode_index:
+        # offline - the index answers every postcode so the API and its cache are not used
+        try:
+            geocodes = index_postcodes(postcode_plan, args.geocode_index)
+        except (OSError, ValueError) as error:
+            print('*' * 120, f'\nError: the postcode index could not be opened - {error}\nBuild it with --build-geocode-index\n', '*' * 120)
+            sys.exit(1)
+    else:
+        cache_conn = open_lookup_cache(lookup_cache_file)
+        geocodes = lookup_postcodes(postcode_plan, cache_conn, args.cache_days, args.geocode_workers)
+        cache_conn.close()
+
+    # fill in the GPS columns of every device row with the lat and long values returned by the API
+    run_stats.begin('device rows')
+    no_geocode = (None, None, False)
+    for device in device_rows:
+        latitude, longitude, terminated = geocodes.get(device.postcode, no_geocode)
+        device['basic_gpsl_latitude'] = latitude
+        device['basic_gpsl_longitude'] = longitude
+
+    # write the device rows to a csv ready for import into vManage - host names are checked as the rows are written
+    # the last csv is kept in memory first so the devices that changed can be written on their own
+    run_stats.begin('csv write')
+    previous_rows = read_csv_rows(vmanage_csv_filepath)
+    try:
+        invalid_hosts = write_device_rows(vmanage_csv_filepath, device_rows)
+    except PermissionError:
+        print('*' * 120,'\nError: vmanage-import-sc.csv is open in another application or by another user - please close and re-run the script\n','*' * 120)
+        exit()
 
-        circuit2_ref = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_ref_col).value).upper()
+    # write the devices added or changed since the last csv and the devices removed from the tracker
+    run_stats.begin('csv delta')
+    try:
+        added, changed, removed = write_device_delta(vmanage_delta_filepath, vmanage_removed_filepath, previous_rows, read_csv_rows(vmanage_csv_filepath))
+    except PermissionError:
+        print('*' * 120, f'\nError: {os.path.basename(vmanage_delta_filepath)} or {os.path.basename(vmanage_removed_filepath)} is open in another application or by another user - please close and re-run the script\n', '*' * 120)
+        exit()
+    run_stats.count('devices added', added)
+    run_stats.count('devices changed', changed)
+    run_stats.count('devices removed', removed)
+    print(f'\n{added} devices added, {changed} changed and {removed} removed since the last run - '
+          f'written to {os.path.basename(vmanage_delta_filepath)} and {os.path.basename(vmanage_removed_filepath)}')
+
+    # split the device rows into shards that can be imported and retried one at a time
+    if args.shard:
+        run_stats.begin('csv shards')
+        try:
+            manifest = write_device_shards(vmanage_shard_dir, device_rows, args.shard, args.shard_rows, args.shard_site_range, vmanage_shard_workers)
+        except PermissionError as error:
+            print('*' * 120, f'\nError: {error.filename} is open in another application or by another user - please close and re-run the script\n', '*' * 120)
+            exit()
+        print(f'{len(manifest["shards"])} shards written to {os.path.basename(vmanage_shard_dir)}:')
+        for shard in manifest['shards']:
+            print(f' -> {shard["file"]}: {shard["rows"]} devices')
+
+    # report any host names with spaces
+    if invalid_hosts:
+        print('\n' + '*' * 90)
+        print('WARNING: Host names with spaces detected!')
+        for index, host_name in invalid_hosts:
+            print(f" -> Row {index}: '{host_name}'")
+        print('*' * 90 + '\n')
+
+    # look up who each public subnet is registered to and write the static routes DNAC needs for them
+    if args.dnac_routes:
+        run_stats.begin('dnac routes')
+        print(f'\nLooking up the registration of {len(route_entries)} public subnets ...\n')
+        cache_conn = open_lookup_cache(lookup_cache_file)
+        whois = resolve_whois([IPv4Net.parse(subnet).network for _, _, _, subnet in route_entries], cache_conn, whois_cache_days, args.whois_workers)
+        cache_conn.close()
+        unregistered = sorted({ip_str(address) for address, registered in whois.items() if registered is None})
+        run_stats.count('dnac routes', len(route_entries))
+        if unregistered:
+            print(f'Warning: no whois registration found for {", ".join(unregistered)}')
+        try:
+            write_dnac_routes(dnac_routes_filepath, route_entries, whois)
+        except PermissionError:
+            print('*' * 120, f'\nError: {os.path.basename(dnac_routes_filepath)} is open in another application or by another user - please close and re-run the script\n', '*' * 120)
+            sys.exit(1)
+        print(f'{len(route_entries)} static routes written to {os.path.basename(dnac_routes_filepath)}')
+
+    # save the row results so the next run only has to transform rows that change
+    run_stats.begin('save state')
+    save_run_state(run_state_file, new_run_state)
+
+    # attach the device rows to the vManage device template instead of uploading the csv by hand
+    if args.push:
+        run_stats.begin('push')
+        vmanage = args.vmanage.rstrip('/')
+        print(f'\nAttaching {len(device_rows)} devices to template {args.push} on {vmanage} ...\n')
+        push_results = push_device_rows(device_rows, vmanage, args.push, args.vmanage_username, args.vmanage_password, args.push_batch, args.push_workers,
+                                        verify=not args.vmanage_insecure)
+        push_failures = [(host_name, status, detail) for host_name, status, detail in push_results if status != 'Success']
+        run_stats.count('devices attached', len(push_results) - len(push_failures))
+        run_stats.count('devices not attached', len(push_failures))
+        if push_failures:
+            print('*' * 120)
+            for host_name, status, detail in push_failures:
+                print(f'Error: {host_name} was not attached - {status}: {detail}')
+            print('*' * 120, '\n')
+        print(f'{len(push_results) - len(push_failures)} of {len(push_results)} devices attached to template {args.push}\n')
+    run_stats.end()
+
+    # write the run report - where the time went and what was counted
+    if args.profile:
+        run_report = run_stats.report()
+        tracemalloc.stop()
+        with open(args.profile, 'w') as f:
+            json.dump(run_report, f, indent=2)
+        print('-' * 80)
+        print(f'{"stage":<16}{"wall (s)":>12}{"cpu (s)":>12}{"peak memory (MB)":>20}')
+        for stage, stage_stats in run_report['stages'].items():
+            print(f'{stage:<16}{stage_stats["wall"]:12.3f}{stage_stats["cpu"]:12.3f}{stage_stats["peak_memory_mb"] or 0:20.1f}')
+        print('-' * 80)
+        for name, value in list(run_report['counters'].items()) + [(f'skipped - {reason}', value) for reason, value in run_report['skipped_rows'].items()]:
+            print(f'{name:<40}{value:>10}')
+        print(f'\nRun report written to {args.profile}\n')
 
-        # get static wan IP and subnet if circuit type is ETHERNET
-        if circuit2_type == 'ETHERNET':
-            circuit2_static_wan_ip = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_wan_subnet_col).value)
-            
-            if '/' not in circuit2_static_wan_ip:
-                circuit2_static_wan_ip = circuit2_static_wan_ip + '/29'
-            
-            circuit2_wan_subnet = ipaddress.ip_network(circuit2_static_wan_ip, strict=False)
+    # all done
+    print('vmanage-import-sc.csv has been created :)\n')
 
-            router2_static_wan_ip = str(circuit2_wan_subnet.network_address + 2)
-            router2_static_wan_gw = str(circuit2_wan_subnet.network_address + 1)
-            router2_static_wan_mask = str(circuit2_wan_subnet.netmask)
-                
-        # get managment IP address for router 2
-        router2_mgmt_ip = str(tracker_sheet_obj.cell(row=tracker_row, column=router2_mgmt_ip_col).value)
-        if router2_mgmt_ip == 'None' or router2_mgmt_ip == '':
-            #print(f'Error: missing management IP address for router 2 for store {store_num} row {tracker_row}  ... skipping to next row')
-            tracker_row = tracker_row + 1
-            continue
+    return new_run_state
 
-        if '/' not in router2_mgmt_ip: router2_mgmt_ip = router2_mgmt_ip + '/32'
-        router2_mgmt_ip = ipaddress.ip_network(router2_mgmt_ip, strict=False)
-        router2_systemip = router2_mgmt_ip.network_address
 
-        # build router 2 hostname
-        router2_hostname = f'SC-{store_type}-{store_num}-R2'
+def tracker_signature(tracker_filepath):
 
-        # get provider for circuit 2
-        circuit2_provider = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_provider_col).value).upper()
-        #router2_wan_color = wan_color(circuit2_provider)
-        router2_wan_color = 'green' # default router 2 as some carrier migrations demand PXC + PXC intially which breaks the config is the same color is used for both circuits
+    # Function to return the size and modified time of the tracker, or None while it is missing (OneDrive replaces the file as it syncs)
 
-        # get ppp name and password for circuit 2
-        circuit2_ppp_name = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_ppp_name_col).value)
-        circuit2_ppp_pwd = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit2_ppp_pwd_col).value)
+    try:
+        stat = os.stat(tracker_filepath)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
 
-        if 'BT' in circuit2_provider and circuit2_ppp_name == 'None':
-            circuit2_ppp_name = 'dummy@bband1.com'
-            circuit2_ppp_pwd = 'dummy'
 
-        if circuit2_ppp_name == 'None':
-            #print(f'Warning: missing PPPoE name for circuit 2 for store {store_num} row {tracker_row}  ... defaulting to dummy BT details')
-            circuit2_ppp_name = 'dummy@bband1.com'
-            circuit2_ppp_pwd = 'dummy'
+def watch_tracker(args):
 
-        if circuit2_provider == 'MAINTEL-BT' and not circuit2_ppp_name.startswith('SCOOP-DIA-BT-MAINTEL-ISP'):
-            print(f'Warning: Circuit 2 provider is MAINTEL-BT but username does not begin with SCOOP-DIA-BT-MAINTEL-ISP for store {store_num} row {tracker_row}')
-            
-        if circuit2_provider == 'MAINTEL-PXC' and not circuit2_ppp_name.startswith('SCOOP-DIA-PXC-MAINTEL-ISP'):
-            print(f'Warning: Circuit 2 provider is MAINTEL-PXC but username does not begin with SCOOP-DIA-PXC-MAINTEL-ISP for store {store_num} row {tracker_row}')
+    # Function to regenerate vmanage-import-sc.csv each time the content of the tracker changes, until Ctrl-C
+    # The row results, address plan and compiled mapping stay in memory between runs so only the changed rows are transformed
+    # OneDrive sync writes the file several times in a burst so a run starts once the size and modified time have been steady for
+    # the debounce time, and only if the sha256 differs from the last run - a re-sync or touch of the same content is ignored
+    # The file is polled rather than watched with inotify as change events are not delivered for the Windows drives under WSL
 
-        # we need to duplicate the postcode for router 2 which is not optimal but works for now
-        postcode_list.append(postcode)
+    global run_stats
 
-    # get managment IP address for router 1
-    router1_mgmt_ip = str(tracker_sheet_obj.cell(row=tracker_row, column=router1_mgmt_ip_col).value)
-    if '/' not in router1_mgmt_ip: router1_mgmt_ip = router1_mgmt_ip + '/32'
+    print(f'\nWatching {tracker_filepath} - press Ctrl-C to stop\n')
+    run_state = None
+    last_key = None
+    signature = tracker_signature(tracker_filepath)
     try:
-        router1_mgmt_ip = ipaddress.ip_network(router1_mgmt_ip, strict=False)
-    except ValueError:
-        #print(f'Error: invalid management IP address for router 1 for store {store_num} row {tracker_row}  ... skipping to next row')
-        tracker_row = tracker_row + 1
-        continue
-
-    router1_systemip = router1_mgmt_ip.network_address
+        while True:
+            # wait for the file to change - the first run starts straight away
+            if last_key is not None:
+                while tracker_signature(tracker_filepath) == signature:
+                    time.sleep(watch_interval)
+
+            # then for the writes to settle
+            signature = tracker_signature(tracker_filepath)
+            steady_since = time.monotonic()
+            while signature is None or time.monotonic() - steady_since < args.watch_debounce:
+                time.sleep(watch_interval)
+                current = tracker_signature(tracker_filepath)
+                if current != signature:
+                    signature = current
+                    steady_since = time.monotonic()
+
+            try:
+                key = tracker_cache_key(tracker_filepath)
+            except OSError:
+                # gone again or locked by the sync - wait for the next change
+                continue
+            if key == last_key:
+                print(f'{datetime.now().strftime("%H:%M:%S")} tracker saved with no change to its content')
+                continue
 
-    # build router 1 hostname
-    router1_hostname = f'SC-{store_type}-{store_num}-R1'
+            print('-' * 80)
+            print(f'{datetime.now().strftime("%H:%M:%S")} tracker changed - regenerating vmanage-import-sc.csv')
+            print('-' * 80 + '\n')
+            run_stats = RunStats()
+            try:
+                run_state = run_import(args, run_state)
+            except SystemExit:
+                # a run that stops (the csv open in Excel, the tracker unreadable) is retried at the next change
+                print('Run stopped - waiting for the next change to the tracker\n')
+            except Exception as error:
+                # so is a run that fails on a bad edit - the error names the store and row where it can
+                print('*' * 120, f'\nError: {error}\n', '*' * 120)
+                print('Run stopped - waiting for the next change to the tracker\n')
+            last_key = key
+            print(f'Watching {os.path.basename(tracker_filepath)} ...\n')
+    except KeyboardInterrupt:
+        print('\nStopped watching\n')
+
+
+def main():
+
+    global postcode_uri
+
+    # Entry point - parses the command line then runs each stage in turn
+
+    parser = argparse.ArgumentParser(description='Build the vManage import sheet from the NOF2025 rollout tracker')
+    parser.add_argument('--cache-stats', action='store_true', help='show postcode cache statistics and exit')
+    parser.add_argument('--cache-cleanup', action='store_true', help='delete expired postcode cache entries and exit')
+    parser.add_argument('--cache-days', type=float, default=geocode_cache_days, help=f'days before a cached postcode is looked up again (default {geocode_cache_days})')
+    parser.add_argument('--tracker-cache-stats', action='store_true', help='show what the tracker cache holds and exit')
+    parser.add_argument('--tracker-cache-clear', action='store_true', help='delete the tracker cache and exit - the next run reads the sheet again')
+    parser.add_argument('--no-tracker-cache', action='store_true', help='read the tracker sheet even if the tracker cache has it, and do not cache it')
+    parser.add_argument('--watch', action='store_true', help='keep running and regenerate the import sheet each time the tracker changes, until Ctrl-C')
+    parser.add_argument('--watch-debounce', type=float, default=watch_debounce, metavar='SECONDS', help=f'time the tracker must be unchanged before --watch regenerates (default {watch_debounce})')
+    parser.add_argument('--validate', action='store_true', help='check the tracker against the validation rules, print every failure and exit - non-zero if there are errors')
+    parser.add_argument('--full', action='store_true', help='ignore the saved run state and transform every tracker row')
+    parser.add_argument('--geocode-workers', type=int, default=geocode_workers, help=f'concurrent postcode API requests (default {geocode_workers})')
+    parser.add_argument('--transform-workers', type=int, default=transform_workers, help=f'worker processes for transforming tracker rows, 0 for one per CPU (default {transform_workers})')
+    parser.add_argument('--bench', nargs='*', type=int, metavar='ROWS', help=f'time each stage against synthetic trackers of these sizes and exit (default {" ".join(str(rows) for rows in bench_sizes)})')
+    parser.add_argument('--bench-repeat', type=int, default=3, help='runs of each benchmark stage - the best time is reported (default 3)')
+    parser.add_argument('--bench-report', default=bench_report_file, help=f'file the benchmark report is written to (default {bench_report_file})')
+    parser.add_argument('--bench-baseline', metavar='REPORT', help='an earlier benchmark report to compare against - stages over 20%% slower are flagged')
+    parser.add_argument('--shard', nargs='+', choices=('store-type', 'site-range', 'role'), metavar='KEY', help=f'also split the device rows into import csvs by store-type, site-range and/or role (R1/R2) with a manifest in {os.path.basename(vmanage_shard_dir)}')
+    parser.add_argument('--shard-rows', type=int, default=vmanage_shard_rows, metavar='N', help=f'most device rows in one shard (default {vmanage_shard_rows})')
+    parser.add_argument('--shard-site-range', type=int, default=vmanage_shard_site_range, metavar='N', help=f'Site Ids in one shard for --shard site-range (default {vmanage_shard_site_range})')
+    parser.add_argument('--summarise', action='store_true', help=f'also write the store subnets of each VRF summarised into supernets to {os.path.basename(route_summary_filepath)}')
+    parser.add_argument('--summary-waste', type=float, default=summary_waste, metavar='FRACTION', help=f'fraction of a summary that may be unused addresses (default {summary_waste})')
+    parser.add_argument('--dnac-routes', action='store_true', help=f'also write the DNAC static routes for the public store subnets with their whois registration to {os.path.basename(dnac_routes_filepath)} (needs the ipwhois package)')
+    parser.add_argument('--whois-workers', type=int, default=whois_workers, help=f'concurrent whois lookups for --dnac-routes (default {whois_workers})')
+    parser.add_argument('--mapping', metavar='JSON', help='tracker layout and template mapping for another customer - see --write-mapping')
+    parser.add_argument('--write-mapping', metavar='JSON', help='write the built-in tracker layout and template mapping to a file to start a customer mapping from and exit')
+    parser.add_argument('--geocode-index', nargs='?', const=postcode_index_file, metavar='INDEX', help=f'look postcodes up offline in a postcode index instead of the API (default {postcode_index_file})')
+    parser.add_argument('--build-geocode-index', metavar='ONSPD_CSV', help='compile an ONS postcode directory csv into the --geocode-index file and exit')
+    parser.add_argument('--postcode-api', default=postcode_api_url, metavar='URL', help=f'base URL of the postcode API e.g. a --postcode-stub (default {postcode_api_url})')
+    parser.add_argument('--postcode-stub', nargs='?', type=int, const=postcode_stub_port, metavar='PORT', help=f'run a local stand-in for the postcode API until Ctrl-C (default port {postcode_stub_port})')
+    parser.add_argument('--stub-latency', type=float, default=0.0, metavar='SECONDS', help='stub server: delay added to every response (also used by --bench)')
+    parser.add_argument('--stub-error-rate', type=float, default=0.0, metavar='FRACTION', help='stub server: fraction of requests answered with a 500 (also used by --bench)')
+    parser.add_argument('--stub-rate-limit', type=int, default=0, metavar='N', help='stub server: requests allowed per second, 0 for no limit (also used by --bench)')
+    parser.add_argument('--push', metavar='TEMPLATE', help='also attach the device rows to this vManage device template (name or id) - credentials from VMANAGE_USERNAME and VMANAGE_PASSWORD or prompted')
+    parser.add_argument('--vmanage', default=vmanage_url, metavar='URL', help='vManage base URL for --push e.g. https://vmanage.example.net:8443 or a --vmanage-stub')
+    parser.add_argument('--push-batch', type=int, default=vmanage_push_batch, metavar='N', help=f'devices in one attach request (default {vmanage_push_batch})')
+    parser.add_argument('--push-workers', type=int, default=vmanage_push_workers, metavar='N', help=f'attach requests in flight at once (default {vmanage_push_workers})')
+    parser.add_argument('--vmanage-insecure', action='store_true', help='do not verify the vManage TLS certificate (self-signed lab vManage)')
+    parser.add_argument('--vmanage-stub', nargs='?', type=int, const=vmanage_stub_port, metavar='PORT', help=f'run a local stand-in for the vManage API until Ctrl-C (default port {vmanage_stub_port}) - log in as admin/admin')
+    parser.add_argument('--profile', nargs='?', const=run_profile_file, metavar='REPORT', help=f'write the time, CPU and peak Python memory of each stage and the run counters to a JSON report (default {run_profile_file})')
+    parser.add_argument('--cprofile', metavar='PSTATS', help='run the transform stage under cProfile and save the stats to this file - use with --transform-workers 1 as worker processes are not profiled')
+    parser.add_argument('--startup-check', action='store_true', help=f'report the time taken to reach the tracker check and exit non-zero if it is over budget ({startup_budget * 1000:.0f} ms) or a heavy library was loaded')
+    args = parser.parse_args()
+
+    if args.startup_check:
+        startup_time = time.perf_counter() - script_start
+        heavy_loaded = [module for module in heavy_modules if module in sys.modules]
+        print(f'Startup took {startup_time * 1000:.1f} ms (budget {startup_budget * 1000:.0f} ms)')
+        if heavy_loaded:
+            print(f'Heavy libraries loaded at startup: {", ".join(heavy_loaded)}')
+        sys.exit(0 if startup_time <= startup_budget and not heavy_loaded else 1)
+
+    if args.cache_stats or args.cache_cleanup:
+        cache_conn = open_lookup_cache(lookup_cache_file)
+        if args.cache_cleanup:
+            deleted = geocode_cache_cleanup(cache_conn, args.cache_days)
+            print(f'\n{deleted} expired postcode cache entries removed\n')
+        if args.cache_stats:
+            geocode_cache_stats(cache_conn, lookup_cache_file, args.cache_days)
+        cache_conn.close()
+        sys.exit()
 
-    # get provider for circuit 1
-    circuit1_provider = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_provider_col).value).upper()
-    if circuit1_provider == 'NONE' or circuit1_provider == '':
-        #print(f'Error: missing circuit 1 provider for store {store_num} row {tracker_row}  ... skipping to next row')
-        tracker_row = tracker_row + 1
-        continue
-    #router1_wan_color = wan_color(circuit1_provider)
-    router1_wan_color = 'blue' # default router 1 as some carrier migrations demand PXC + PXC intially which breaks the config is the same color is used for both circuits
+    if args.tracker_cache_stats or args.tracker_cache_clear:
+        if args.tracker_cache_clear:
+            deleted = tracker_cache_clear(tracker_cache_dir)
+            print(f'\n{deleted} tracker cache entries removed\n')
+        if args.tracker_cache_stats:
+            tracker_cache_stats(tracker_cache_dir, tracker_filepath)
+        sys.exit()
 
-    # get ppp name and password for circuit 1
-    circuit1_ppp_name = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_ppp_name_col).value)
-    circuit1_ppp_pwd = str(tracker_sheet_obj.cell(row=tracker_row, column=circuit1_ppp_pwd_col).value)
+    if args.write_mapping:
+        with open(args.write_mapping, 'w') as f:
+            json.dump(current_mapping(), f, indent=4)
+        print(f'\nTracker layout and template mapping written to {args.write_mapping}\n')
+        sys.exit()
 
-    if 'BT' in circuit1_provider and circuit1_ppp_name == 'None':
-        circuit1_ppp_name = 'dummy@bband1.com'
-        circuit1_ppp_pwd = 'dummy'
-    
-    if circuit1_ppp_name == 'None':
-        #print(f'Warning: missing PPPoE name AND circuit not set as BT for circuit 1 for store {store_num} row {tracker_row}  ... defaulting to dummy BT details')
-        circuit1_ppp_name = 'dummy@bband1.com'
-        circuit1_ppp_pwd = 'dummy'
+    if args.mapping:
+        try:
+            with open(args.mapping, 'r') as f:
+                apply_mapping(json.load(f))
+        except (OSError, ValueError) as error:
+            print('*' * 120, f'\nError: mapping {args.mapping} could not be used - {error}\n', '*' * 120)
+            sys.exit(1)
+
+    if args.build_geocode_index:
+        index_filepath = args.geocode_index or postcode_index_file
+        print(f'\nBuilding postcode index from {args.build_geocode_index} ...')
+        build_start = time.perf_counter()
+        try:
+            count = build_postcode_index(args.build_geocode_index, index_filepath)
+        except (OSError, UnicodeDecodeError) as error:
+            print('*' * 120, f'\nError: the postcode index could not be built - {error}\n', '*' * 120)
+            sys.exit(1)
+        print(f'{count} postcodes written to {index_filepath} ({os.path.getsize(index_filepath)} bytes) in {time.perf_counter() - build_start:.1f} seconds\n')
+        sys.exit()
 
-    if circuit1_provider == 'MAINTEL-BT' and not circuit1_ppp_name.startswith('SCOOP-DIA-BT-MAINTEL-ISP'):
-        print(f'Warning: Circuit 1 provider is MAINTEL-BT but username does not begin with SCOOP-DIA-BT-MAINTEL-ISP for store {store_num} row {tracker_row}')
+    stub_options = {'latency': args.stub_latency, 'error_rate': args.stub_error_rate, 'rate_limit': args.stub_rate_limit}
+
+    if args.push and not args.vmanage:
+        parser.error('--push needs the vManage URL - use --vmanage')
+    if args.push and args.watch:
+        # every save of the tracker would attach the template to every router again
+        parser.error('--push can not be used with --watch - push from a normal run once the tracker is ready')
+    if args.shard_rows < 1 or args.shard_site_range < 1:
+        parser.error('--shard-rows and --shard-site-range must be at least 1')
+    if not 0 <= args.summary_waste < 1:
+        parser.error('--summary-waste must be at least 0 and less than 1')
+    if args.dnac_routes:
+        # checked without importing it so the run doesn't fail at the end
+        import importlib.util
+        if importlib.util.find_spec('ipwhois') is None:
+            parser.error('--dnac-routes needs the ipwhois package - pip install ipwhois')
+
+    if args.vmanage_stub is not None:
+        stub = start_vmanage_stub(port=args.vmanage_stub)
+        host, port = stub.server_address[:2]
+        print(f'\nvManage stub listening on http://{host}:{port} - run the import with --push sdwan-import-stub --vmanage http://{host}:{port}')
+        print('Log in as admin/admin - press Ctrl-C to stop\n')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        stub.shutdown()
+        print('\n' + ', '.join(f'{name}: {count}' for name, count in stub.stats.items()) + '\n')
+        sys.exit()
 
-    if circuit1_provider == 'MAINTEL-PXC' and not circuit1_ppp_name.startswith('SCOOP-DIA-PXC-MAINTEL-ISP'):
-        print(f'Warning: Circuit 1 provider is MAINTEL-PXC but username does not begin with SCOOP-DIA-PXC-MAINTEL-ISP for store {store_num} row {tracker_row}')
+    if args.postcode_stub is not None:
+        stub = start_postcode_stub(port=args.postcode_stub, **stub_options)
+        host, port = stub.server_address[:2]
+        print(f'\nPostcode API stub listening on http://{host}:{port} - run the import with --postcode-api http://{host}:{port}')
+        print('Press Ctrl-C to stop\n')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        stub.shutdown()
+        print('\n' + ', '.join(f'{name}: {count}' for name, count in stub.stats.items()) + '\n')
+        sys.exit()
 
-    # get provision port status
-    provision_port_disable = str(tracker_sheet_obj.cell(row=tracker_row, column=provision_port_disable_col).value)
-    if provision_port_disable == 'None':
-        provision_port_disable = 'FALSE'
-    else:
-        provision_port_disable = 'TRUE'
+    if args.bench is not None:
+        workers = args.transform_workers if args.transform_workers > 0 else os.cpu_count()
+        regressions = run_benchmark(args.bench or bench_sizes, args.bench_repeat, workers, args.bench_report, args.bench_baseline, stub_options)
+        sys.exit(1 if regressions else 0)
 
-    # get vlan 2 network
-    vlan2_ipv4 = str(tracker_sheet_obj.cell(row=tracker_row, column=vlan2_col).value)
+    postcode_uri = args.postcode_api.rstrip('/') + '/postcodes'
 
-    if vlan2_ipv4 == 'None' or "VLOOKUP" in vlan2_ipv4:
-        print(f'Error: missing VLAN 2 network for store {store_num} row {tracker_row}  ... SKIPPING - Please correct and re-run')
-        tracker_row = tracker_row + 1
-        continue
-    
-    if vlan2_ipv4 and '/' not in vlan2_ipv4:
-        vlan2_ipv4 = vlan2_ipv4 + '/28'
-    vlan2_ipv4 = ipaddress.ip_network(vlan2_ipv4, strict=False)
+    # only check the tracker - nothing is regenerated so there is no prompt if it hasn't changed
+    if args.validate:
+        try:
+            tracker_rows = read_tracker(tracker_filepath) if args.no_tracker_cache else read_tracker_cached(tracker_filepath, tracker_cache_dir)[0]
+        except FileNotFoundError:
+            print('*' * 120,'\nError: NOF2025 Rollout tracker.xlsx file not found - please check the folder location\n','*' * 120)
+            sys.exit(1)
+        failures = check_tracker(tracker_rows, validation_report_filepath, every_failure=True)
+        sys.exit(1 if any(failure['severity'] == 'error' for failure in failures) else 0)
+
+    # keep running and regenerate the import sheet whenever the tracker changes - there is no prompt as nobody is waiting on it
+    if args.watch:
+        watch_tracker(args)
+        sys.exit()
 
-    # generate cctv nat from store number
-    a = int(store_num) * 4
+    # Open the tracker sheet
 
-    octet3 = math.floor(int(a) / 256)
-    octet4 = a - (octet3 * 256)
+    try:
+        m_time = os.path.getmtime(tracker_filepath)
+        last_updated_dt = datetime.fromtimestamp(m_time)
+        last_updated = last_updated_dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        current_time_dt = datetime.now()
+        current_time = current_time_dt.strftime('%Y-%m-%d %H:%M:%S')
+        time_diff = current_time_dt - last_updated_dt
+        time_diff_str = str(time_diff).split('.')[0]  # Remove microseconds for cleaner output
+
+        timestamp_file = '.last_run_timestamp'
+        if os.path.exists(timestamp_file):
+            with open(timestamp_file, 'r') as f:
+                prev_time = f.read().strip()
+            if prev_time == str(m_time):
+                print('-' * 80)
+                print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
+                print(f'Current time:                                  {current_time}')
+                print(f'Time difference:                               {time_diff_str}')
+                print('WARNING: The tracker file has not changed since the last run.')
+                print('-' * 80)
+                choice = input('Do you want to continue? (y/n): ')
+                if choice.lower() != 'y':
+                    print('Exiting...\n')
+                    sys.exit()
+            else:
+                print('-' * 80)
+                print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
+                print(f'Current time:                                  {current_time}')
+                print(f'Time difference:                               {time_diff_str}')
+                print('-' * 80 + '\n')
+        else:
+            print('-' * 80)
+            print(f'NOF2025 Rollout tracker.xlsx was last updated: {last_updated}')
+            print(f'Current time:                                  {current_time}')
+            print(f'Time difference:                               {time_diff_str}')
+            print('-' * 80 + '\n')
 
-    cctv_nat = ipaddress.ip_address(f'172.19.{octet3}.{octet4}')
+        with open(timestamp_file, 'w') as f:
+            f.write(str(m_time))
 
-    # generate store networks from store number
-    store_net_oct2, store_net_oct3, store_net_oct2_vlan70, store_net_oct2_vlan31, store_net_oct3_vlan31, store_net_oct2_vlan101 = store_nets(store_num)
-    
-    vlan60_ipv4 = str(tracker_sheet_obj.cell(row=tracker_row, column=vlan60_col).value)
+    except FileNotFoundError:
+        print('*' * 120,'\nError: NOF2025 Rollout tracker.xlsx file not found - please check the folder location\n','*' * 120)
+        sys.exit()
 
-    if store_type == 3 or store_type == 4:
+    # main loop - loop through the tracker sheet and build rows for the vmanage-import-sc.csv dictionary transforming some of the data
 
-        vlan60_ipv4 = ipaddress.ip_network(f'151.{store_net_oct2}.{store_net_oct3}.0/24')
-        vlan20_ipv4 = ipaddress.ip_network(f'10.1{store_net_oct2}.{store_net_oct3}.128/25')
-    else:
-        if vlan60_ipv4 and '/' not in vlan60_ipv4:
-            vlan60_ipv4 = vlan60_ipv4 + '/24'
-        try:
-             vlan60_ipv4 = ipaddress.ip_network(vlan60_ipv4, strict=False)
-        except ValueError:
-            print(f'Error: invalid VLAN 60 network for store {store_num} row {tracker_row}  ... SKIPPING - Please correct and re-run')
-            tracker_row = tracker_row + 1
-            continue
-        vlan20_ipv4 = ipaddress.ip_network(f'{vlan60_ipv4.network_address.packed[0]}.1{vlan60_ipv4.network_address.packed[1]}.{vlan60_ipv4.network_address.packed[2]}.{vlan60_ipv4.network_address.packed[3]}/24')
-    
-    vlan70_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan70}.{store_net_oct3}.0/24')
-    vlan80_ipv4 = ipaddress.ip_network(f'192.168.100.0/24')
-    vlan10_ipv4 = ipaddress.ip_network(f'10.1{store_net_oct2}.{store_net_oct3}.0/25')
-    vlan30_ipv4 = ipaddress.ip_network(f'192.168.101.0/24')
-    vlan31_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan31}.{store_net_oct3_vlan31}.0/28')
-    vlan40_ipv4 = ipaddress.ip_network(f'192.168.102.0/24')
-    vlan100_ipv4 = ipaddress.ip_network(f'192.168.103.0/24')
-    vlan101_ipv4 = ipaddress.ip_network(f'10.{store_net_oct2_vlan101}.{store_net_oct3}.224/27')
-    vlan120_ipv4 = ipaddress.ip_network(f'192.168.104.0/24')
-
-    # add the globally significant subnets (vrf 100, 700) to a python set to check for duplicates
-    # checks for Vlan 42 - Wesley Media (not required as not globally significant - vrf 400)
-    # checks for Vlan 192 - Cremators (not required as not globally significant - vrf 400)
+    test_run = False  # set to True to test store_nets function only
 
-    
+    if test_run:
+        print('\nTest run selected - no changes will be made to vManage import sheet\n')
+        novalue = test_store_nets()
+        sys.exit()
 
-    if store_type == 3 or store_type == 4:
-        store_subnets = [str(vlan10_ipv4), str(vlan20_ipv4), str(vlan31_ipv4), str(vlan60_ipv4), str(vlan70_ipv4), str(vlan2_ipv4)]
-    
-    if store_type == 5 or store_type == 6:
-        # ELS ranges are generated differently to avoid a clash with Retail and Welcome store types
-        # vlan60 is learnt from the tracker sheet and will used as the seed subnet to generate the rest of the subnets for type 5 and type 6 ELS Lite and ELS
-        vlan60_oct1 = vlan60_ipv4.network_address.packed[0]
-        vlan60_oct2 = vlan60_ipv4.network_address.packed[1]
-        vlan60_oct3 = vlan60_ipv4.network_address.packed[2]
-        vlan60_oct4 = vlan60_ipv4.network_address.packed[3]
-        vlan20_ipv4 = ipaddress.ip_network(f'{vlan60_oct1}.{(vlan60_oct2)+200}.{vlan60_oct3}.128/25')
-        vlan31_ipv4 = ipaddress.ip_network(f'{vlan60_oct1}.{(vlan60_oct2)+220}.{vlan60_oct3}.0/28')
-        vlan101_ipv4 = ipaddress.ip_network(f'{vlan60_oct1}.{(vlan60_oct2)+220}.{vlan60_oct3}.224/27')
-        store_subnets = [str(vlan20_ipv4), str(vlan31_ipv4), str(vlan60_ipv4), str(vlan101_ipv4), str(vlan2_ipv4)]
-        #print(f'Store {store_num} Type {store_type} generated subnets:')
-        #print("-" * 40)
-        #print(f'VLAN 60: {vlan60_ipv4}')
-        #print(f'VLAN 20: {vlan20_ipv4}')
-        #print(f'VLAN 31: {vlan31_ipv4}')
-        #print(f'VLAN 101: {vlan101_ipv4}')
-        #print('\n')
-    
-    for subnet in store_subnets:
-        if subnet in unique_subnets:
-            print(f'Error: ***WARNING*** Duplicate subnet {subnet} found for store {store_num} row {tracker_row}  ... Please correct and re-run')
-            #tracker_row = tracker_row + 1
-            #sys.exit()
-        else:
-            unique_subnets.add(subnet)
+    # ask for the vManage credentials now rather than once the import sheet has been built
+    if args.push:
+        args.vmanage_username = os.environ.get('VMANAGE_USERNAME') or input('vManage username: ')
+        args.vmanage_password = os.environ.get('VMANAGE_PASSWORD')
+        if args.vmanage_password is None:
+            import getpass
+            args.vmanage_password = getpass.getpass('vManage password: ')
 
-    # print store networks for debugging
+    run_import(args)
 
-    print_nets = False
-    if print_nets:
-        print(f'Store {store_num} VLAN networks:')
-        print(f'VLAN2: {vlan2_ipv4}')
-        print(f'VLAN10: {vlan10_ipv4}')
-        print(f'VLAN20: {vlan20_ipv4}')
-        print(f'VLAN30: {vlan30_ipv4}')
-        print(f'VLAN31: {vlan31_ipv4}')
-        print(f'VLAN40: {vlan40_ipv4}')
-        print(f'VLAN60: {vlan60_ipv4}')
-        print(f'VLAN70: {vlan70_ipv4}')
-        print(f'VLAN80: {vlan80_ipv4}')
-        print(f'VLAN100: {vlan100_ipv4}')
-        print(f'VLAN101: {vlan101_ipv4}')
-        print(f'VLAN120: {vlan120_ipv4}')
-        print('')
-    
-    # only safe to append post code if we are not skipping the row (we fetched the post code earlier in the loop)
-    postcode_list.append(postcode)
-
-    # build the dictionary rows for router 1
-    router_model = 'C1121X-8P-'
-    if router1_serial == 'FGL2623LBSX':
-        router_model = 'C1127X-8PLTEP-'
-    vmanage_dict['Device ID'].append(router_model + router1_serial)
-    vmanage_dict['System IP'].append(str(router1_systemip))
-    vmanage_dict['Host Name'].append(router1_hostname)
-    vmanage_dict['Site Id'].append(site_id)
-    vmanage_dict['Dual Stack IPv6 Default'].append('FALSE')
-    vmanage_dict['Rollback Timer (sec)'].append('300')
-    vmanage_dict['provision_port_disable'].append(provision_port_disable)
-    vmanage_dict['vlan31_vrrp_pri'].append('110')
-    vmanage_dict['vlan31_vrrp_ipv4'].append(str(vlan31_ipv4[-2]))
-    vmanage_dict['vlan31_ipv4'].append(str(vlan31_ipv4[-4]))
-    vmanage_dict['vlan31_mask'].append(str(vlan31_ipv4.netmask))
-    vmanage_dict['vlan31_dhcp_net'].append(str(vlan31_ipv4.network_address))
-    vmanage_dict['vlan31_dhcp_mask'].append(str(vlan31_ipv4.netmask))
-    vmanage_dict['vlan31_dhcp_exclude'].append(f'{str(vlan31_ipv4.network_address + 7)}-{str(vlan31_ipv4[-2])}')
-    vmanage_dict['vlan31_dhcp_gateway'].append(str(vlan31_ipv4[-2]))
-    vmanage_dict['vlan120_vrrp_pri'].append('110')
-    vmanage_dict['vlan120_vrrp_ipv4'].append(str(vlan120_ipv4.network_address + 254))
-    vmanage_dict['vlan120_ipv4'].append(str(vlan120_ipv4.network_address + 252))
-    vmanage_dict['vlan120_mask'].append(str(vlan120_ipv4.netmask))
-    vmanage_dict['vlan120_dhcp_exclude'].append(f'{str(vlan120_ipv4.network_address + 128)}-{str(vlan120_ipv4.network_address + 254)}')
-    vmanage_dict['vlan100_vrrp_pri'].append('110')
-    vmanage_dict['vlan100_vrrp_ipv4'].append(str(vlan100_ipv4.network_address + 254))
-    vmanage_dict['vlan100_ipv4'].append(str(vlan100_ipv4.network_address + 252))
-    vmanage_dict['vlan100_mask'].append(str(vlan100_ipv4.netmask))
-    vmanage_dict['vlan100_dhcp_exclude'].append(f'{str(vlan100_ipv4.network_address + 128)}-{str(vlan100_ipv4.network_address + 254)}')
-    vmanage_dict['vlan101_vrrp_pri'].append('110')
-    vmanage_dict['vlan101_vrrp_ipv4'].append(str(vlan101_ipv4.network_address + 30))
-    vmanage_dict['vlan101_ipv4'].append(str(vlan101_ipv4.network_address + 28))
-    vmanage_dict['vlan101_mask'].append(str(vlan101_ipv4.netmask))
-    vmanage_dict['vlan101_dhcp_net'].append(str(vlan101_ipv4.network_address))
-    vmanage_dict['vlan101_dhcp_mask'].append(str(vlan101_ipv4.netmask))
-    vmanage_dict['vlan101_dhcp_gateway'].append(str(vlan101_ipv4.network_address + 30))
-    vmanage_dict['vlan101_dhcp_exclude'].append(f'{str(vlan101_ipv4[14])}-{str(vlan101_ipv4[-2])}')
-    vmanage_dict['vlan40_vrrp_pri'].append('110')
-    vmanage_dict['vlan40_vrrp_ipv4'].append(str(vlan40_ipv4.network_address + 254))
-    vmanage_dict['vlan40_ipv4'].append(str(vlan40_ipv4.network_address + 252))
-    vmanage_dict['vlan40_mask'].append(str(vlan40_ipv4.netmask))
-    vmanage_dict['vlan40_dhcp_exclude'].append(f'{str(vlan40_ipv4.network_address + 128)}-{str(vlan40_ipv4.network_address + 254)}')
-    vmanage_dict['vlan30_vrrp_pri'].append('110')
-    vmanage_dict['vlan30_vrrp_ipv4'].append(str(vlan30_ipv4.network_address + 254))
-    vmanage_dict['vlan30_ipv4'].append(str(vlan30_ipv4.network_address + 252))
-    vmanage_dict['vlan30_mask'].append(str(vlan30_ipv4.netmask))
-    vmanage_dict['vlan30_dhcp_exclude'].append(f'{str(vlan30_ipv4.network_address + 128)}-{str(vlan30_ipv4.network_address + 254)}')
-    vmanage_dict['vlan20_vrrp_pri'].append('110')
-    vmanage_dict['vlan20_vrrp_ipv4'].append(str(vlan20_ipv4.network_address + 126))
-    vmanage_dict['vlan20_ipv4'].append(str(vlan20_ipv4.network_address + 124))
-    vmanage_dict['vlan20_mask'].append(str(vlan20_ipv4.netmask))
-    vmanage_dict['vlan20_dhcp_net'].append(str(vlan20_ipv4.network_address))
-    vmanage_dict['vlan20_dhcp_mask'].append(str(vlan20_ipv4.netmask))
-    vmanage_dict['vlan20_dhcp_exclude'].append(f'{str(vlan20_ipv4.network_address + 64)}-{str(vlan20_ipv4.network_address + 126)}')
-    vmanage_dict['vlan20_dhcp_gateway'].append(str(vlan20_ipv4.network_address + 126))
-    vmanage_dict['vlan10_vrrp_pri'].append('110')
-    vmanage_dict['vlan10_vrrp_ipv4'].append(str(vlan10_ipv4.network_address + 126))
-    vmanage_dict['vlan10_ipv4'].append(str(vlan10_ipv4.network_address + 124))
-    vmanage_dict['vlan10_mask'].append(str(vlan10_ipv4.netmask))
-    vmanage_dict['vlan10_dhcp_net'].append(str(vlan10_ipv4.network_address))
-    vmanage_dict['vlan10_dhcp_mask'].append(str(vlan10_ipv4.netmask))
-    vmanage_dict['vlan10_dhcp_exclude'].append(f'{str(vlan10_ipv4.network_address + 64)}-{str(vlan10_ipv4.network_address + 126)}')
-    vmanage_dict['vlan10_dhcp_gateway'].append(str(vlan10_ipv4.network_address + 126))
-    vmanage_dict['vlan60_vrrp_pri'].append('110')
-    vmanage_dict['vlan60_vrrp_ipv4'].append(str(vlan60_ipv4.network_address + 254))
-    vmanage_dict['vlan60_ipv4'].append(str(vlan60_ipv4.network_address + 252))
-    vmanage_dict['vlan60_mask'].append(str(vlan60_ipv4.netmask))
-    vmanage_dict['vlan70_vrrp_pri'].append('110')
-    vmanage_dict['vlan70_vrrp_ipv4'].append(str(vlan70_ipv4.network_address + 254))
-    vmanage_dict['vlan70_ipv4'].append(str(vlan70_ipv4.network_address + 252))
-    vmanage_dict['vlan70_mask'].append(str(vlan70_ipv4.netmask))
-    vmanage_dict['vlan80_vrrp_pri'].append('110')
-    vmanage_dict['vlan80_vrrp_ipv4'].append(str(vlan80_ipv4.network_address + 1))
-    vmanage_dict['vlan80_ipv4'].append(str(vlan80_ipv4.network_address + 252))
-    vmanage_dict['vlan80_mask'].append(str(vlan80_ipv4.netmask))
-    vmanage_dict['tloc_next_hop'].append(str('192.168.12.2'))
-    vmanage_dict['tloc_bandwidth_up'].append(str(int(circuit1_bw_up * 1000)))
-    vmanage_dict['tloc_bandwidth_down'].append(str(int(circuit1_bw_down * 1000)))
-    vmanage_dict['wan_bandwidth_up'].append(str(int(circuit1_bw_up * 1000)))
-    vmanage_dict['wan_bandwidth_down'].append(str(int(circuit1_bw_down * 1000)))
-    vmanage_dict['wan_desc'].append(f'{circuit1_ref} - {circuit1_type} via {circuit1_provider}')
-    vmanage_dict['ethpppoe_chapHost'].append(circuit1_ppp_name)
-    vmanage_dict['ethpppoe_chapPwd'].append(circuit1_ppp_pwd)
-    vmanage_dict['wan_color'].append(router1_wan_color)
-    vmanage_dict['ethpppoe_ipsecPrefer'].append('111')
-    vmanage_dict['wan_shapingRate'].append(int(circuit1_bw_up * 1000))
-    vmanage_dict['wan_track_addr'].append('1.1.1.1')
-    vmanage_dict['wan_track_addr_tloc'].append('208.67.222.222')
-    vmanage_dict['loopback0_ipv4'].append(str(router1_systemip))
-    vmanage_dict['loopback0_mask'].append('255.255.255.255')
-    vmanage_dict['lan_vpn_100_nat_1_rangeStart'].append(str(cctv_nat))
-    vmanage_dict['lan_vpn_100_nat_1_rangeEnd'].append(str(cctv_nat + 1))
-    vmanage_dict['lan_vpn_100_staticNat_1_translatedSourceIp'].append(str(cctv_nat))
-    vmanage_dict['lan_vpn_100_staticNat_2_translatedSourceIp'].append(str(cctv_nat + 1))
-    vmanage_dict['vlan2_vrrp_pri'].append('110')
-    vmanage_dict['vlan2_vrrp_ipv4'].append(str(vlan2_ipv4[-2]))
-    vmanage_dict['vlan2_ipv4'].append(str(vlan2_ipv4[-4]))
-    vmanage_dict['vlan2_mask'].append(str(vlan2_ipv4.netmask))
-    vmanage_dict['vlan2_dhcp_net'].append(str(vlan2_ipv4.network_address))
-    vmanage_dict['vlan2_dhcp_mask'].append(str(vlan2_ipv4.netmask))
-    if router2_serial != 'NONE' and circuit2_provider != 'NONE':
-         vmanage_dict['vlan2_dhcp_exclude'].append(f'{str(vlan2_ipv4[3])}-{str(vlan2_ipv4[-2])}')
-    else:
-        vmanage_dict['vlan2_dhcp_exclude'].append(f'{str(vlan2_ipv4[5])}-{str(vlan2_ipv4[-2])}')
-    vmanage_dict['vlan2_dhcp_gateway'].append(str(vlan2_ipv4[-2]))
-    vmanage_dict['static_wan_ip'].append(router1_static_wan_ip)
-    vmanage_dict['static_wan_gw'].append(router1_static_wan_gw)
-    vmanage_dict['static_wan_mask'].append(router1_static_wan_mask)
-    vmanage_dict['cloudSaaSDeviceRole_variable'].append('dia')
-    vmanage_dict['cloudSaaSVpnType_variable'].append('service-vpn')
-    vmanage_dict['cloudSaasTlocList_variable'].append('all')
-    vmanage_dict['cloudSaasSigTunnelList_variable'].append('')
-    vmanage_dict['cloudSaasSigEnabled_variable'].append('FALSE')
-    vmanage_dict['cloudSaasInterfaceList_variable'].append('')
-    vmanage_dict['cloudSaasLBEnabled_variable'].append('TRUE')
-    vmanage_dict['cloudSaasLoss_variable'].append(5)
-    vmanage_dict['cloudSaasLatency_variable'].append(100)
-    vmanage_dict['cloudSaasSourceIpBased_variable'].append('TRUE')
-    vmanage_dict['qos_Interface_1'].append(str(interface1))
-    vmanage_dict['port_offset'].append(0)
-
-    # if we have a router 2 build the dictionary rows for router 2
-    if router2_serial != 'NONE' and circuit2_provider != 'NONE':
-        vmanage_dict['Device ID'].append("C1121X-8P-" + router2_serial)
-        vmanage_dict['System IP'].append(str(router2_systemip))
-        vmanage_dict['Host Name'].append(router2_hostname)
-        vmanage_dict['Site Id'].append(site_id)
-        vmanage_dict['Dual Stack IPv6 Default'].append('FALSE')
-        vmanage_dict['Rollback Timer (sec)'].append('300')
-        vmanage_dict['provision_port_disable'].append(provision_port_disable)
-        vmanage_dict['vlan31_vrrp_pri'].append('100')
-        vmanage_dict['vlan31_vrrp_ipv4'].append(str(vlan31_ipv4[-2]))
-        vmanage_dict['vlan31_ipv4'].append(str(vlan31_ipv4[-3]))
-        vmanage_dict['vlan31_mask'].append(str(vlan31_ipv4.netmask))
-        vmanage_dict['vlan31_dhcp_net'].append(str(vlan31_ipv4.network_address))
-        vmanage_dict['vlan31_dhcp_mask'].append(str(vlan31_ipv4.netmask))
-        vmanage_dict['vlan31_dhcp_exclude'].append(f'{str(vlan31_ipv4.network_address + 1)}-{str(vlan31_ipv4.network_address + 6)}";"{str(vlan31_ipv4[-4])}-{str(vlan31_ipv4[-2])}')
-        vmanage_dict['vlan31_dhcp_gateway'].append(str(vlan31_ipv4[-2]))
-        vmanage_dict['vlan120_vrrp_pri'].append('100')
-        vmanage_dict['vlan120_vrrp_ipv4'].append(str(vlan120_ipv4.network_address + 254))
-        vmanage_dict['vlan120_ipv4'].append(str(vlan120_ipv4.network_address + 253))
-        vmanage_dict['vlan120_mask'].append(str(vlan120_ipv4.netmask))
-        vmanage_dict['vlan120_dhcp_exclude'].append(f'{str(vlan120_ipv4.network_address + 1)}-{str(vlan120_ipv4.network_address + 127)}";"{str(vlan120_ipv4.network_address + 252)}-{str(vlan120_ipv4.network_address + 254)}')
-        vmanage_dict['vlan100_vrrp_pri'].append('100')
-        vmanage_dict['vlan100_vrrp_ipv4'].append(str(vlan100_ipv4.network_address + 254))
-        vmanage_dict['vlan100_ipv4'].append(str(vlan100_ipv4.network_address + 253))
-        vmanage_dict['vlan100_mask'].append(str(vlan100_ipv4.netmask))
-        vmanage_dict['vlan100_dhcp_exclude'].append(f'{str(vlan100_ipv4.network_address + 1)}-{str(vlan100_ipv4.network_address + 127)}";"{str(vlan100_ipv4.network_address + 252)}-{str(vlan100_ipv4.network_address + 254)}')
-        vmanage_dict['vlan101_vrrp_pri'].append('100')
-        vmanage_dict['vlan101_vrrp_ipv4'].append(str(vlan101_ipv4.network_address + 30))
-        vmanage_dict['vlan101_ipv4'].append(str(vlan101_ipv4.network_address + 29))
-        vmanage_dict['vlan101_mask'].append(str(vlan101_ipv4.netmask))
-        vmanage_dict['vlan101_dhcp_net'].append(str(vlan101_ipv4.network_address))
-        vmanage_dict['vlan101_dhcp_mask'].append(str(vlan101_ipv4.netmask))
-        vmanage_dict['vlan101_dhcp_gateway'].append(str(vlan101_ipv4.network_address + 30))
-        vmanage_dict['vlan101_dhcp_exclude'].append(f'{str(vlan101_ipv4[1])}-{str(vlan101_ipv4[14])}";"{str(vlan101_ipv4.network_address + 28)}-{str(vlan101_ipv4.network_address + 30)}')
-        vmanage_dict['vlan40_vrrp_pri'].append('100')
-        vmanage_dict['vlan40_vrrp_ipv4'].append(str(vlan40_ipv4.network_address + 254))
-        vmanage_dict['vlan40_ipv4'].append(str(vlan40_ipv4.network_address + 253))
-        vmanage_dict['vlan40_mask'].append(str(vlan40_ipv4.netmask))
-        vmanage_dict['vlan40_dhcp_exclude'].append(f'{str(vlan40_ipv4.network_address + 1)}-{str(vlan40_ipv4.network_address + 127)}";"{str(vlan40_ipv4.network_address + 252)}-{str(vlan40_ipv4.network_address + 254)}')
-        vmanage_dict['vlan30_vrrp_pri'].append('100')
-        vmanage_dict['vlan30_vrrp_ipv4'].append(str(vlan30_ipv4.network_address + 254))
-        vmanage_dict['vlan30_ipv4'].append(str(vlan30_ipv4.network_address + 253))
-        vmanage_dict['vlan30_mask'].append(str(vlan30_ipv4.netmask))
-        vmanage_dict['vlan30_dhcp_exclude'].append(f'{str(vlan30_ipv4.network_address + 1)}-{str(vlan30_ipv4.network_address + 127)}";"{str(vlan30_ipv4.network_address + 252)}-{str(vlan30_ipv4.network_address + 254)}')
-        vmanage_dict['vlan20_vrrp_pri'].append('100')
-        vmanage_dict['vlan20_vrrp_ipv4'].append(str(vlan20_ipv4.network_address + 126))
-        vmanage_dict['vlan20_ipv4'].append(str(vlan20_ipv4.network_address + 125))
-        vmanage_dict['vlan20_mask'].append(str(vlan20_ipv4.netmask))
-        vmanage_dict['vlan20_dhcp_net'].append(str(vlan20_ipv4.network_address))
-        vmanage_dict['vlan20_dhcp_mask'].append(str(vlan20_ipv4.netmask))
-        vmanage_dict['vlan20_dhcp_exclude'].append(f'{str(vlan20_ipv4.network_address + 1)}-{str(vlan20_ipv4.network_address + 63)}";"{str(vlan20_ipv4.network_address + 124)}-{str(vlan20_ipv4.network_address + 126)}')
-        vmanage_dict['vlan20_dhcp_gateway'].append(str(vlan20_ipv4.network_address + 126))
-        vmanage_dict['vlan10_vrrp_pri'].append('100')
-        vmanage_dict['vlan10_vrrp_ipv4'].append(str(vlan10_ipv4.network_address + 126))
-        vmanage_dict['vlan10_ipv4'].append(str(vlan10_ipv4.network_address + 125))
-        vmanage_dict['vlan10_mask'].append(str(vlan10_ipv4.netmask))
-        vmanage_dict['vlan10_dhcp_net'].append(str(vlan10_ipv4.network_address))
-        vmanage_dict['vlan10_dhcp_mask'].append(str(vlan10_ipv4.netmask))
-        vmanage_dict['vlan10_dhcp_exclude'].append(f'{str(vlan10_ipv4.network_address + 1)}-{str(vlan10_ipv4.network_address + 63)}";"{str(vlan10_ipv4.network_address + 124)}-{str(vlan10_ipv4.network_address + 126)}')
-        vmanage_dict['vlan10_dhcp_gateway'].append(str(vlan10_ipv4.network_address + 126))
-        vmanage_dict['vlan60_vrrp_pri'].append('100')
-        vmanage_dict['vlan60_vrrp_ipv4'].append(str(vlan60_ipv4.network_address + 254))
-        vmanage_dict['vlan60_ipv4'].append(str(vlan60_ipv4.network_address + 253))
-        vmanage_dict['vlan60_mask'].append(str(vlan60_ipv4.netmask))
-        vmanage_dict['vlan70_vrrp_pri'].append('100')
-        vmanage_dict['vlan70_vrrp_ipv4'].append(str(vlan70_ipv4.network_address + 254))
-        vmanage_dict['vlan70_ipv4'].append(str(vlan70_ipv4.network_address + 253))
-        vmanage_dict['vlan70_mask'].append(str(vlan70_ipv4.netmask))
-        vmanage_dict['vlan80_vrrp_pri'].append('100')
-        vmanage_dict['vlan80_vrrp_ipv4'].append(str(vlan80_ipv4.network_address + 1))
-        vmanage_dict['vlan80_ipv4'].append(str(vlan80_ipv4.network_address + 253))
-        vmanage_dict['vlan80_mask'].append(str(vlan80_ipv4.netmask))
-        vmanage_dict['tloc_next_hop'].append(str('192.168.21.1'))
-        vmanage_dict['tloc_bandwidth_up'].append(str(int(circuit2_bw_up * 1000)))
-        vmanage_dict['tloc_bandwidth_down'].append(str(int(circuit2_bw_down * 1000)))
-        vmanage_dict['wan_bandwidth_up'].append(str(int(circuit2_bw_up * 1000)))
-        vmanage_dict['wan_bandwidth_down'].append(str(int(circuit2_bw_down * 1000)))
-        vmanage_dict['wan_desc'].append(f'{circuit2_ref} - {circuit2_type} via {circuit2_provider}')
-        vmanage_dict['ethpppoe_chapHost'].append(circuit2_ppp_name)
-        vmanage_dict['ethpppoe_chapPwd'].append(circuit2_ppp_pwd)
-        vmanage_dict['wan_color'].append(router2_wan_color)
-        vmanage_dict['ethpppoe_ipsecPrefer'].append('0')
-        vmanage_dict['wan_shapingRate'].append(int(circuit2_bw_up * 1000))
-        vmanage_dict['wan_track_addr'].append('208.67.222.222')
-        vmanage_dict['wan_track_addr_tloc'].append('1.1.1.1')
-        vmanage_dict['loopback0_ipv4'].append(str(router2_systemip))
-        vmanage_dict['loopback0_mask'].append('255.255.255.255')
-        vmanage_dict['lan_vpn_100_nat_1_rangeStart'].append(str(cctv_nat))
-        vmanage_dict['lan_vpn_100_nat_1_rangeEnd'].append(str(cctv_nat + 1))
-        vmanage_dict['lan_vpn_100_staticNat_1_translatedSourceIp'].append(str(cctv_nat))
-        vmanage_dict['lan_vpn_100_staticNat_2_translatedSourceIp'].append(str(cctv_nat + 1))
-        vmanage_dict['vlan2_vrrp_pri'].append('100')
-        vmanage_dict['vlan2_vrrp_ipv4'].append(str(vlan2_ipv4[-2]))
-        vmanage_dict['vlan2_ipv4'].append(str(vlan2_ipv4[-3]))
-        vmanage_dict['vlan2_mask'].append(str(vlan2_ipv4.netmask))
-        vmanage_dict['vlan2_dhcp_net'].append(str(vlan2_ipv4.network_address))
-        vmanage_dict['vlan2_dhcp_mask'].append(str(vlan2_ipv4.netmask))
-        vmanage_dict['vlan2_dhcp_exclude'].append(f'{str(vlan2_ipv4[1])}-{str(vlan2_ipv4[2])}";"{str(vlan2_ipv4[5])}-{str(vlan2_ipv4[-2])}')
-        vmanage_dict['vlan2_dhcp_gateway'].append(str(vlan2_ipv4[-2]))
-        vmanage_dict['static_wan_ip'].append(router2_static_wan_ip)
-        vmanage_dict['static_wan_gw'].append(router2_static_wan_gw)
-        vmanage_dict['static_wan_mask'].append(router2_static_wan_mask)
-        vmanage_dict['cloudSaaSDeviceRole_variable'].append('dia')
-        vmanage_dict['cloudSaaSVpnType_variable'].append('service-vpn')
-        vmanage_dict['cloudSaasTlocList_variable'].append('all')
-        vmanage_dict['cloudSaasSigTunnelList_variable'].append('')
-        vmanage_dict['cloudSaasSigEnabled_variable'].append('FALSE')
-        vmanage_dict['cloudSaasInterfaceList_variable'].append('')
-        vmanage_dict['cloudSaasLBEnabled_variable'].append('TRUE')
-        vmanage_dict['cloudSaasLoss_variable'].append(5)
-        vmanage_dict['cloudSaasLatency_variable'].append(100)
-        vmanage_dict['cloudSaasSourceIpBased_variable'].append('TRUE')
-        vmanage_dict['qos_Interface_1'].append(str(interface2))
-        vmanage_dict['port_offset'].append(1)
-
-    tracker_row = tracker_row + 1
-
-# end of main loop
-
-# perform postcode lookups to obtain GPS coords
-print('\nPerforming postcode lookups ...\n')
-
-# Break the postcode list into chunks of 100 as the API has a max 100 limit
-
-latlist = []
-longlist = []
-
-while len(postcode_list) > 100:
-    postcode_max100 = postcode_list[0:100]
-    postcode_result = postcode_api(postcode_max100)
-    
-    results_list = postcode_result.json()['result']
-    for item in results_list:
-        if item['result'] is None:
-            # Fallback for terminated/missing postcodes
-            r = requests.get(f"https://api.postcodes.io/postcodes/{item['query']}")
-            if r.status_code == 404:
-                data = r.json()
-                if 'terminated' in data and data['terminated'] is not None:
-                    item['result'] = data['terminated']
-
-    postcode_df = pd.json_normalize(results_list, sep='_')
-    # update the csv dictionary with the lat and long values returned by the API
-    latlist = latlist + (postcode_df['result_latitude'].to_list())
-    longlist = longlist+ (postcode_df['result_longitude'].to_list())
-    # remove the postcodes we have lookedup from the list
-    postcode_list = postcode_list[100:]
-
-if len(postcode_list) > 0:
-    postcode_result = postcode_api(postcode_list)
-    
-    results_list = postcode_result.json()['result']
-    for item in results_list:
-        if item['result'] is None:
-            # Fallback for terminated/missing postcodes
-            r = requests.get(f"https://api.postcodes.io/postcodes/{item['query']}")
-            if r.status_code == 404:
-                data = r.json()
-                if 'terminated' in data and data['terminated'] is not None:
-                    item['result'] = data['terminated']
-
-    postcode_df = pd.json_normalize(results_list, sep='_')
-    latlist = latlist + (postcode_df['result_latitude'].to_list())
-    longlist = longlist+ (postcode_df['result_longitude'].to_list())
 
-    
-# update the csv dictionary with the lat and long values returned by the API
-vmanage_dict['basic_gpsl_latitude'] = latlist
-vmanage_dict['basic_gpsl_longitude'] = longlist
-
-# uncomment to print the dictionary for debugging
-#print(json.dumps(vmanage_dict, indent=1))
-
-# create the dataframe from the dictionary we built
-
-# Set print_array_length to True if - ValueError: All arrays must be of the same length means one or more of the dictonary lists is the wrong length compared to the rest
-# Print length of each array in vmanage_dict
-print_array_length = False
-if print_array_length is True:
-    print("\nLength of each array in vmanage_dict:")
-    for key, value in vmanage_dict.items():
-        print(f"{key}: {len(value)}")
-    print()
-df = pd.DataFrame(vmanage_dict)
-
-# check for spaces in the Host Name field
-invalid_hosts = df[df['Host Name'].str.contains(' ', na=False)]
-if not invalid_hosts.empty:
-    print('\n' + '*' * 90)
-    print('WARNING: Host names with spaces detected!')
-    for index, row in invalid_hosts.iterrows():
-        print(f" -> Row {index}: '{row['Host Name']}'")
-    print('*' * 90 + '\n')
-
-# write the dataframe to a csv ready for import into vManage
-try:
-    df.to_csv('/mnt/c/Users/nick.oneill/OneDrive - Maintel Europe Limited/Southern Coops - Rollout docs/vmanage-import-sc.csv', index=False)
-except PermissionError:
-    print('*' * 120,'\nError: vmanage-import-sc.csv is open in another application or by another user - please close and re-run the script\n','*' * 120)
-    exit()
-
-# all done
-print('vmanage-import-sc.csv has been created :)\n')
\ No newline at end of file
+if __name__ == '__main__':
+    main()
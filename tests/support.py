@@ -0,0 +1,28 @@
+import importlib.util
+import os
+import sys
+
+# the script has a hyphen in its name so it is loaded from its path - main() only runs as __main__
+script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'sdwan-import-sc.py')
+spec = importlib.util.spec_from_file_location('sdwan_import_sc', script_path)
+sc = importlib.util.module_from_spec(spec)
+# registered under its module name so its functions can be pickled for the transform worker processes
+sys.modules[spec.name] = sc
+spec.loader.exec_module(sc)
+
+
+# a single router store that passes every validation rule
+good_store = {'store_num': '2653', 'store_type': '3 - Retail', 'postcode': 'BN1 1AA', 'router1_serial': 'FGL2345ABCD',
+              'router1_mgmt_ip': '10.255.1.1', 'circuit1_provider': 'BT', 'circuit1_type': 'FTTP', 'circuit1_bw_up': 20,
+              'circuit1_bw_down': 80, 'vlan2': '10.200.1.0/28'}
+
+
+def tracker_record(row, **cells):
+
+    # Function to build a tracker record the same as read_tracker does - the row number then every column, blank cells None
+    # cells are given by column name e.g. store_num='2653' for store_num_col
+
+    record = [row] + [None] * sc.tracker_max_col
+    for name, value in cells.items():
+        record[getattr(sc, name + '_col')] = value
+    return tuple(record)
@@ -0,0 +1,64 @@
+import contextlib
+import csv
+import io
+import ipaddress
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+def store_nets_networks(store_num):
+
+    # Function to build the networks of a store from store_nets the way the script did before the address plan - ip_network
+    # rejects an octet over 255 so the store is invalid
+
+    oct2, oct3, oct2_vlan70, oct2_vlan31, oct3_vlan31, oct2_vlan101 = sc.store_nets(store_num)
+    try:
+        return tuple(str(ipaddress.ip_network(subnet)) for subnet in (f'151.{oct2}.{oct3}.0/24', f'10.1{oct2}.{oct3}.128/25',
+                                                                     f'10.{oct2_vlan70}.{oct3}.0/24', f'10.1{oct2}.{oct3}.0/25',
+                                                                     f'10.{oct2_vlan31}.{oct3_vlan31}.0/28', f'10.{oct2_vlan101}.{oct3}.224/27'))
+    except ValueError:
+        return None
+
+
+class StoreAddressPlanTest(unittest.TestCase):
+
+    def test_plan_matches_store_nets(self):
+        stores = sc.store_address_plan()['stores']
+        self.assertEqual(len(stores), 10000)
+        for store in range(10000):
+            networks = stores[store]
+            if networks is not None:
+                networks = tuple(str(sc.IPv4Net(network, prefix)) for network, prefix in zip(networks, sc.address_plan_prefixes.values()))
+            self.assertEqual(networks, store_nets_networks(f'{store:0>4}'), f'store {store:0>4}')
+
+    def test_store_networks(self):
+        self.assertEqual([str(network) for network in sc.store_networks('2653')], list(store_nets_networks('2653')))
+
+
+class TestStoreNetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_csv(self):
+        csv_filepath = os.path.join(self.folder, 'scoop-subnets.csv')
+        with contextlib.redirect_stdout(io.StringIO()):
+            sc.test_store_nets(csv_filepath)
+        with open(csv_filepath, newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], ['store', 'vlan60', 'vlan70', 'vlan10', 'vlan20', 'vlan31', 'vlan101'])
+        self.assertEqual(len(rows), 10000)
+        # columns in the csv order - store_nets_networks is in address plan order
+        vlan60, vlan20, vlan70, vlan10, vlan31, vlan101 = store_nets_networks('2653')
+        self.assertEqual(rows[2654], ['2653', vlan60, vlan70, vlan10, vlan20, vlan31, vlan101])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,46 @@
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+class RunBenchmarkTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.report_file = os.path.join(self.folder, 'bench-report.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def bench(self, baseline_file=None):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sc.run_benchmark([50], 1, 1, self.report_file, baseline_file)
+
+    def test_geocodes_against_the_stub_only(self):
+        postcode_uri = sc.postcode_uri
+        self.assertEqual(self.bench(), [])
+        # the run that follows a benchmark still uses the API it was given
+        self.assertEqual(sc.postcode_uri, postcode_uri)
+        with open(self.report_file) as f:
+            report = json.load(f)
+        result = report['results']['50']
+        self.assertEqual(set(result['timings']), {'load', 'transform', 'duplicates', 'geocode', 'csv', 'total'})
+        self.assertGreater(result['postcodes'], 0)
+        self.assertGreater(report['stub_requests']['bulk requests'], 0)
+
+    def test_slower_stages_are_flagged(self):
+        baseline_file = os.path.join(self.folder, 'baseline.json')
+        baseline = {'results': {'50': {'timings': dict.fromkeys(['load', 'transform', 'duplicates', 'geocode', 'csv', 'total'], 1e-9)}}}
+        with open(baseline_file, 'w') as f:
+            json.dump(baseline, f)
+        self.assertIn('50 rows total', ' '.join(self.bench(baseline_file)))
+
+
+if __name__ == '__main__':
+    unittest.main()
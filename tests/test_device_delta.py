@@ -0,0 +1,62 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+class DeviceRowDeltaTest(unittest.TestCase):
+
+    def test_added_changed_removed(self):
+        header = ['Device ID', 'Site Id', 'Host Name']
+        old = [header, ['FGL1', '2653', 'SC2653-R1'], ['FGL2', '2654', 'SC2654-R1'], ['FGL3', '2655', 'SC2655-R1']]
+        new = [header, ['FGL1', '2653', 'SC2653-R1'], ['FGL2', '2654', 'SC2654-RTR1'], ['FGL4', '2656', 'SC2656-R1']]
+        self.assertEqual(sc.device_row_delta(old, new),
+                         ([['FGL4', '2656', 'SC2656-R1']], [['FGL2', '2654', 'SC2654-RTR1']], [['FGL3', '2655', 'SC2655-R1']]))
+
+    def test_new_layout_changes_every_device(self):
+        old = [['Device ID', 'Site Id'], ['FGL1', '2653']]
+        new = [['Device ID', 'Site Id', 'Host Name'], ['FGL1', '2653', 'SC2653-R1']]
+        self.assertEqual(sc.device_row_delta(old, new), ([], [['FGL1', '2653', 'SC2653-R1']], []))
+
+    def test_no_old_csv(self):
+        new = [['Device ID', 'Site Id'], ['FGL1', '2653']]
+        self.assertEqual(sc.device_row_delta([], new), ([['FGL1', '2653']], [], []))
+
+
+class WriteDeviceDeltaTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def path(self, name):
+        return os.path.join(self.folder, name)
+
+    def write_csv(self, name, rows):
+        with open(self.path(name), 'w', newline='', encoding='utf-8') as csv_file:
+            csv.writer(csv_file, lineterminator=os.linesep).writerows(rows)
+
+    def test_quoted_fields_with_line_breaks(self):
+        # a field holding commas and a line break is one field of its row, on both sides of the comparison
+        header = ['Device ID', 'Host Name', 'banner']
+        self.write_csv('old.csv', [header, ['FGL1', 'SC2653-R1', 'Authorised\nuse, only'], ['FGL2', 'SC2654-R1', 'x'],
+                                   ['FGL3', 'SC2655-R1', 'line one\r\nline two']])
+        self.write_csv('new.csv', [header, ['FGL1', 'SC2653-R1', 'Authorised\nuse, only'], ['FGL2', 'SC2654-R1', 'y\nz'],
+                                   ['FGL4', 'SC2656-R1', 'x']])
+        counts = sc.write_device_delta(self.path('delta.csv'), self.path('removed.csv'), sc.read_csv_rows(self.path('old.csv')),
+                                       sc.read_csv_rows(self.path('new.csv')))
+        self.assertEqual(counts, (1, 1, 1))
+        self.assertEqual(sc.read_csv_rows(self.path('delta.csv')), [header, ['FGL2', 'SC2654-R1', 'y\nz'], ['FGL4', 'SC2656-R1', 'x']])
+        self.assertEqual(sc.read_csv_rows(self.path('removed.csv')), [['Device ID', 'Host Name'], ['FGL3', 'SC2655-R1']])
+
+    def test_missing_csv_has_no_rows(self):
+        self.assertEqual(sc.read_csv_rows(self.path('none.csv')), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
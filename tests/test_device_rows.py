@@ -0,0 +1,60 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import good_store, sc, tracker_record
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+
+class WriteDeviceRowsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.folder, 'vmanage-import-sc.csv')
+        # a single and a dual router store, one geocoded and one not
+        dual_store = dict(good_store, store_num='2654', router1_serial='FGL2345ABCE', router1_mgmt_ip='10.255.1.2', vlan2='10.200.2.0/28',
+                          router2_serial='FGL2345WXYZ', router2_mgmt_ip='10.255.1.3', circuit2_provider='BT', circuit2_type='FTTP',
+                          circuit2_bw_up=20, circuit2_bw_down=80)
+        self.device_rows = []
+        for row, store, geocode in ((3, good_store, (50.8225, -0.1372)), (4, dual_store, (None, None))):
+            row_result = sc.transform_row(tracker_record(row, **store))
+            for device in row_result['devices']:
+                device_row = sc.DeviceRow(device, row_result['postcode'])
+                device_row['basic_gpsl_latitude'], device_row['basic_gpsl_longitude'] = geocode
+                self.device_rows.append(device_row)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read(self):
+        with open(self.csv_file, 'rb') as f:
+            return f.read()
+
+    @unittest.skipUnless(pandas, 'pandas is not installed')
+    def test_same_bytes_as_pandas(self):
+        # the csv used to be written by DataFrame.to_csv - vManage and the delta compare against csvs written that way
+        self.assertEqual(len(self.device_rows), 3)
+        sc.write_device_rows(self.csv_file, self.device_rows)
+        data_frame = pandas.DataFrame({key: [device[key] for device in self.device_rows] for key in sc.keys})
+        self.assertEqual(self.read(), data_frame.to_csv(index=False).encode())
+
+    def test_fields(self):
+        self.device_rows[0]['Host Name'] = 'SC-3-2653 R1'
+        self.device_rows[0]['basic_gpsl_latitude'] = 'a, "quoted" value'
+        invalid_hosts = sc.write_device_rows(self.csv_file, self.device_rows)
+        self.assertEqual(invalid_hosts, [(0, 'SC-3-2653 R1')])
+        lines = self.read().decode().split(os.linesep)
+        self.assertEqual(lines[0], ','.join(sc.keys))
+        self.assertIn(',"a, ""quoted"" value",', lines[1])
+        # no coordinates are empty fields
+        self.assertEqual(lines[2].split(',')[sc.key_index['basic_gpsl_latitude']], '')
+        self.assertEqual(lines[-1], '')
+
+
+if __name__ == '__main__':
+    unittest.main()
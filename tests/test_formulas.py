@@ -0,0 +1,83 @@
+import unittest
+
+from support import good_store, sc, tracker_record
+
+
+class FakeSheet:
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def iter_rows(self, values_only=False):
+        return iter(self.rows)
+
+
+class FakeWorkbook:
+
+    # the parts of an openpyxl read only workbook FormulaResolver uses
+
+    def __init__(self, sheets):
+        self.sheets = {name: FakeSheet(rows) for name, rows in sheets.items()}
+        self.sheetnames = list(sheets)
+
+    def __getitem__(self, name):
+        return self.sheets[name]
+
+
+class FormulaResolverTest(unittest.TestCase):
+
+    def setUp(self):
+        workbook = FakeWorkbook({'Tracker': [],
+                                 'Store VLANs': [('Store', 'VLAN 2'), (2653, '10.200.1.0/28'), ('2654', '10.200.1.16/28'),
+                                                 (True, 'true row'), (1, 'one row'), ('Kemp Town', '10.200.1.32/28')]})
+        records = [tracker_record(3, store_num=2653), tracker_record(4, store_num='2654'), tracker_record(5, store_num=9999),
+                   tracker_record(6, store_num=1), tracker_record(7, store_num='KEMP TOWN'), tracker_record(8, store_num='=A3')]
+        self.resolver = sc.FormulaResolver(workbook, 'Tracker', records, 3)
+
+    def test_vlookup(self):
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A3,'Store VLANs'!A:B,2,FALSE)"), (True, '10.200.1.0/28'))
+
+    def test_index_match(self):
+        self.assertEqual(self.resolver.resolve("=INDEX('Store VLANs'!B:B,MATCH(A4,'Store VLANs'!A:A,0))"), (True, '10.200.1.16/28'))
+
+    def test_text_ignores_case(self):
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A7,'Store VLANs'!A:B,2,FALSE)"), (True, '10.200.1.32/28'))
+
+    def test_not_found_uses_iferror_fallback(self):
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A5,'Store VLANs'!A:B,2,FALSE)"), (False, None))
+        self.assertEqual(self.resolver.resolve("=IFERROR(VLOOKUP(A5,'Store VLANs'!A:B,2,FALSE),\"none\")"), (True, 'none'))
+
+    def test_text_does_not_match_a_number(self):
+        # '2654' is text in the lookup sheet, 2654 a number - Excel's exact match keeps them apart
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(2654,'Store VLANs'!A:B,2,FALSE)"), (False, None))
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(\"2653\",'Store VLANs'!A:B,2,FALSE)"), (False, None))
+
+    def test_true_does_not_match_one(self):
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A6,'Store VLANs'!A:B,2,FALSE)"), (True, 'one row'))
+        self.assertEqual(sc.lookup_key(True) == sc.lookup_key(1), False)
+
+    def test_unsupported_formulas_are_left(self):
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A3,'Store VLANs'!A:B,2,TRUE)"), (False, None))
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A3,'Missing'!A:B,2,FALSE)"), (False, None))
+        self.assertEqual(self.resolver.resolve("=VLOOKUP(A8,'Store VLANs'!A:B,2,FALSE)"), (False, None))
+        self.assertEqual(self.resolver.resolve('=SUM(A3:A4)'), (False, None))
+
+
+class UnresolvedFormulaTest(unittest.TestCase):
+
+    # a formula left as text is reported by the row checks and the row is skipped - the import carries on
+
+    def test_row_with_a_formula_in_vlan2_is_skipped(self):
+        for formula in ("=VLOOKUP(A3,'Store VLANs'!A:B,2,FALSE)", '=INDEX(Lookup!B:B,MATCH(A3,Lookup!A:A,0))',
+                        '=IFERROR(INDEX(Lookup!B:B,MATCH(A3,Lookup!A:A,0)),"")'):
+            row_result = sc.transform_row(tracker_record(3, **dict(good_store, vlan2=formula)))
+            self.assertEqual((row_result['skipped'], row_result['devices']), ('formula in VLAN 2', []))
+            self.assertIn('VLAN 2 is a formula that could not be resolved for store 2653 row 3', row_result['messages'][0])
+
+    def test_row_with_a_network_in_vlan2(self):
+        row_result = sc.transform_row(tracker_record(3, **good_store))
+        self.assertEqual((row_result['skipped'], len(row_result['devices'])), (None, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
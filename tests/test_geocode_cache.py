@@ -0,0 +1,55 @@
+import contextlib
+import io
+import unittest
+
+from support import sc
+
+
+class GeocodeCacheTest(unittest.TestCase):
+
+    geocodes = {'BN11AA': (50.8225, -0.1372, False), 'GU14AB': (51.2362, -0.5704, True), 'ZZ99ZZ': (None, None, False)}
+
+    def setUp(self):
+        self.cache_conn = sc.open_lookup_cache(':memory:')
+        self.saved_resolve_postcodes = sc.resolve_postcodes
+        self.resolved = []
+        sc.resolve_postcodes = self.resolve_postcodes
+
+    def tearDown(self):
+        sc.resolve_postcodes = self.saved_resolve_postcodes
+        self.cache_conn.close()
+
+    def resolve_postcodes(self, postcodes, workers, uri=None):
+        self.resolved.append(list(postcodes))
+        return {postcode: self.geocodes.get(postcode, (None, None, False)) for postcode in postcodes}
+
+    def age(self, days):
+        with self.cache_conn:
+            self.cache_conn.execute('UPDATE postcodes SET fetched = fetched - ?', (days * 86400,))
+
+    def test_round_trip(self):
+        # unresolved and terminated postcodes are cached as well as the good ones
+        sc.geocode_cache_put(self.cache_conn, self.geocodes)
+        self.assertEqual(sc.geocode_cache_get(self.cache_conn, 90), self.geocodes)
+
+    def test_expired_entries_are_not_returned(self):
+        sc.geocode_cache_put(self.cache_conn, self.geocodes)
+        self.age(91)
+        self.assertEqual(sc.geocode_cache_get(self.cache_conn, 90), {})
+        self.assertEqual(sc.geocode_cache_get(self.cache_conn, 100), self.geocodes)
+        self.assertEqual(sc.geocode_cache_cleanup(self.cache_conn, 90), 3)
+
+    def test_only_cache_misses_are_looked_up(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            first = sc.lookup_postcodes(['BN11AA', 'GU14AB'], self.cache_conn, 90, 1)
+            second = sc.lookup_postcodes(['GU14AB', 'ZZ99ZZ', 'BN11AA'], self.cache_conn, 90, 1)
+        self.assertEqual(self.resolved, [['BN11AA', 'GU14AB'], ['ZZ99ZZ']])
+        self.assertEqual(first, {postcode: self.geocodes[postcode] for postcode in ('BN11AA', 'GU14AB')})
+        self.assertEqual(second, self.geocodes)
+
+    def test_plan_has_each_postcode_once(self):
+        self.assertEqual(sc.plan_postcode_lookups(['BN11AA', 'NONE', 'GU14AB', 'BN11AA', '']), ['BN11AA', 'GU14AB'])
+
+
+if __name__ == '__main__':
+    unittest.main()
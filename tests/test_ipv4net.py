@@ -0,0 +1,31 @@
+import ipaddress
+import unittest
+
+from support import sc
+
+
+class IPv4NetTest(unittest.TestCase):
+
+    def test_ipv4net_matches_ipaddress(self):
+        for text in ('10.126.53.0/25', '0.0.0.0/0', '255.255.255.255', '10.1.2.3/32', '192.168.0.0/255.255.0.0'):
+            net, expected = sc.IPv4Net.parse(text), ipaddress.ip_network(text)
+            self.assertEqual(str(net), str(expected))
+            self.assertEqual((net.network, net.broadcast, net.netmask),
+                             (int(expected.network_address), int(expected.broadcast_address), int(expected.netmask)))
+            self.assertEqual((net[0], net[-1]), (int(expected[0]), int(expected[-1])))
+
+    def test_ipv4net_rejects_what_ipaddress_rejects(self):
+        for text in ('10.126.53.1/25', '256.1.1.1/32', '10.1.2.3/33', '010.1.2.0/24', 'None/28'):
+            with self.assertRaises(ValueError):
+                sc.IPv4Net.parse(text)
+        self.assertEqual(str(sc.IPv4Net.parse('10.126.53.1/25', strict=False)), '10.126.53.0/25')
+        with self.assertRaises(ValueError):
+            sc.IPv4Net.from_octets(10, 256, 1, 0, 24)
+
+    def test_ip_str(self):
+        for address in (0, 1, 167935232, 4294967295):
+            self.assertEqual(sc.ip_str(address), str(ipaddress.IPv4Address(address)))
+
+
+if __name__ == '__main__':
+    unittest.main()
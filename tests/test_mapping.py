@@ -0,0 +1,38 @@
+import unittest
+
+from support import sc
+
+
+class MappingRuleTest(unittest.TestCase):
+
+    def assertRejected(self, rule, reason):
+        with self.assertRaises(ValueError) as raised:
+            sc.compile_rule('router1', 'Device ID', rule)
+        self.assertIn(reason, str(raised.exception))
+
+    def test_rejects_unknown_names(self):
+        self.assertRejected('{__import__}', 'unknown name __import__')
+        self.assertRejected('{__import__("os").system("true")}', 'calls something other than')
+
+    def test_rejects_other_attributes(self):
+        self.assertRejected('{vlan31.__class__}', 'unknown attribute __class__')
+
+    def test_rejects_other_calls(self):
+        self.assertRejected('{vlan31.network.bit_length()}', 'calls something other than')
+        self.assertRejected('{ip(vlan31.network, base=2)}', 'calls something other than')
+
+    def test_rejects_other_syntax(self):
+        self.assertRejected('{[x for x in vlan31]}', 'uses ListComp')
+        self.assertRejected('{vlan31.prefixlen ** 2}', 'uses Pow')
+        self.assertRejected('{ip(vlan31.network', 'not a valid template')
+        self.assertRejected(['a list'], 'must be a string')
+
+    def test_accepts_rules(self):
+        import ast
+        self.assertEqual(ast.unparse(sc.compile_rule('router1', 'key', '{ip(vlan31.network + 7)}')), 'ip(vlan31.network + 7)')
+        self.assertIsInstance(sc.compile_rule('router1', 'key', 'text {{braces}}'), ast.Constant)
+        self.assertEqual(sc.compile_rule('router1', 'key', 5).value, 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
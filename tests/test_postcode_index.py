@@ -0,0 +1,69 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+class PostcodeIndexTest(unittest.TestCase):
+
+    # an ONSPD extract - a live postcode, one without a grid reference, one live and terminated, and one only terminated
+    onspd = ['pcd,pcd2,pcds,dointr,doterm,oscty,lat,long',
+             'BN1 1AA,BN1  1AA,BN1 1AA,198001,,E1,50.822530,-0.137163',
+             'GY1 1AA,GY1  1AA,GY1 1AA,198001,,L5,99.999999,0.000000',
+             'GU1 4AB,GU1  4AB,GU1 4AB,198001,200912,E1,51.000000,-0.500000',
+             'GU1 4AB,GU1  4AB,GU1 4AB,200912,,E1,51.236200,-0.570400',
+             'PO1 2XY,PO1  2XY,PO1 2XY,198001,201506,E1,50.796000,-1.088000']
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.csv_file = os.path.join(self.folder, 'onspd.csv')
+        self.index_file = os.path.join(self.folder, 'postcode-index.bin')
+        with open(self.csv_file, 'w', newline='') as f:
+            f.write('\r\n'.join(self.onspd) + '\r\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_build_and_look_up(self):
+        self.assertEqual(sc.build_postcode_index(self.csv_file, self.index_file), 4)
+        self.assertEqual(os.path.getsize(self.index_file), sc.postcode_index_header.size + 4 * sc.postcode_index_record.size)
+        index = sc.PostcodeIndex(self.index_file)
+        try:
+            self.assertEqual(index.get('BN11AA'), (50.82253, -0.137163, False))
+            self.assertEqual(index.get('GY11AA'), (None, None, False))
+            self.assertEqual(index.get('GU14AB'), (51.2362, -0.5704, False))
+            self.assertEqual(index.get('PO12XY'), (50.796, -1.088, True))
+            # before the first key, between keys and after the last
+            self.assertIsNone(index.get('AB11AA'))
+            self.assertIsNone(index.get('GU14AC'))
+            self.assertIsNone(index.get('ZZ99ZZ'))
+        finally:
+            index.close()
+
+    def test_index_postcodes(self):
+        sc.build_postcode_index(self.csv_file, self.index_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            geocodes = sc.index_postcodes(['BN11AA', 'ZZ99ZZ'], self.index_file)
+        self.assertEqual(geocodes, {'BN11AA': (50.82253, -0.137163, False), 'ZZ99ZZ': (None, None, False)})
+
+    def test_not_an_index(self):
+        with open(self.index_file, 'wb') as f:
+            f.write(b'PCIDX\x00\x01\x00' + b'\x05' + b'\x00' * 20)
+        with self.assertRaises(ValueError):
+            sc.PostcodeIndex(self.index_file)
+
+    def test_not_a_postcode_directory(self):
+        with open(self.csv_file, 'w') as f:
+            f.write('postcode,latitude,longitude\r\nBN1 1AA,50.8,-0.1\r\n')
+        with contextlib.redirect_stdout(io.StringIO()) as output, self.assertRaises(SystemExit):
+            sc.build_postcode_index(self.csv_file, self.index_file)
+        self.assertIn('is not an ONS postcode directory', output.getvalue())
+        self.assertFalse(os.path.exists(self.index_file))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import contextlib
+import io
+import unittest
+
+from support import sc
+
+
+class PostcodeStubTest(unittest.TestCase):
+
+    # resolve_postcodes against the local stand-in for postcodes.io - a postcode with inward code ZZ is terminated
+
+    postcodes = [f'BN{number}1AA' for number in range(1, 150)] + ['GU14ZZ']
+
+    def start(self, **stub_options):
+        stub = sc.start_postcode_stub(**stub_options)
+        self.addCleanup(stub.server_close)
+        self.addCleanup(stub.shutdown)
+        return stub, f'http://127.0.0.1:{stub.server_address[1]}/postcodes'
+
+    def test_bulk_and_terminated_lookups(self):
+        stub, uri = self.start()
+        geocodes = sc.resolve_postcodes(self.postcodes, 2, uri)
+        self.assertEqual(set(geocodes), set(self.postcodes))
+        self.assertTrue(all(latitude is not None and not terminated for latitude, longitude, terminated in
+                            (geocodes[postcode] for postcode in self.postcodes[:-1])))
+        self.assertTrue(geocodes['GU14ZZ'][2])
+        self.assertEqual((stub.stats['bulk requests'], stub.stats['single lookups'], stub.stats['postcodes']), (2, 1, 150))
+        # the same postcode is always in the same place
+        self.assertEqual(sc.resolve_postcodes(['BN11AA'], 1, uri)['BN11AA'], geocodes['BN11AA'])
+
+    def test_server_errors_are_retried(self):
+        stub, uri = self.start(error_rate=0.3)
+        geocodes = sc.resolve_postcodes(self.postcodes, 2, uri)
+        self.assertEqual(set(geocodes), set(self.postcodes))
+        self.assertGreater(stub.stats['errors'], 0)
+
+    def test_more_than_100_postcodes_is_rejected(self):
+        stub, uri = self.start()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit):
+            sc.postcode_api(self.postcodes, uri=uri)
+        self.assertIn('400', output.getvalue())
+        self.assertEqual(stub.stats['rejected'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,27 @@
+import ipaddress
+import unittest
+
+from support import sc
+
+
+class SummariseRangesTest(unittest.TestCase):
+
+    def test_summarise_ranges_matches_collapse_addresses(self):
+        subnets = ['10.0.0.0/25', '10.0.0.128/25', '10.0.1.0/24', '10.0.3.0/28', '10.0.3.16/28', '10.0.3.8/29', '192.168.0.0/16', '192.168.4.0/24']
+        networks = [ipaddress.ip_network(subnet) for subnet in subnets]
+        network, prefixlen, covered = sc.summarise_ranges([int(net.network_address) for net in networks], [int(net.broadcast_address) for net in networks])
+        self.assertEqual([f'{sc.ip_str(int(first))}/{int(length)}' for first, length in zip(network, prefixlen)],
+                         [str(net) for net in ipaddress.collapse_addresses(networks)])
+        self.assertEqual([int(size) for size in covered], [net.num_addresses for net in ipaddress.collapse_addresses(networks)])
+
+    def test_summarise_ranges_with_waste(self):
+        first = [int(ipaddress.ip_address('10.0.0.0')), int(ipaddress.ip_address('10.0.0.128'))]
+        last = [int(ipaddress.ip_address('10.0.0.63')), int(ipaddress.ip_address('10.0.0.255'))]
+        network, prefixlen, covered = sc.summarise_ranges(first, last)
+        self.assertEqual(len(network), 2)
+        network, prefixlen, covered = sc.summarise_ranges(first, last, waste=0.25)
+        self.assertEqual((sc.ip_str(int(network[0])), int(prefixlen[0]), int(covered[0])), ('10.0.0.0', 24, 192))
+
+
+if __name__ == '__main__':
+    unittest.main()
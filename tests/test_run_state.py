@@ -0,0 +1,74 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+
+from support import good_store, sc, tracker_record
+
+
+class RowFingerprintTest(unittest.TestCase):
+
+    def test_a_moved_row_has_the_same_fingerprint(self):
+        self.assertEqual(sc.row_fingerprint(tracker_record(3, **good_store)), sc.row_fingerprint(tracker_record(4, **good_store)))
+
+    def test_a_changed_cell_changes_the_fingerprint(self):
+        self.assertNotEqual(sc.row_fingerprint(tracker_record(3, **good_store)),
+                            sc.row_fingerprint(tracker_record(3, **dict(good_store, router1_mgmt_ip='10.255.1.2'))))
+
+    def test_the_row_is_kept_when_the_mapping_uses_it(self):
+        self.assertNotEqual(sc.row_fingerprint(tracker_record(3, **good_store), with_row=True),
+                            sc.row_fingerprint(tracker_record(4, **good_store), with_row=True))
+
+
+class MoveRowResultTest(unittest.TestCase):
+
+    def test_messages_name_the_new_row(self):
+        # a MAINTEL-BT circuit with another username gives a warning naming the row
+        store = dict(good_store, circuit1_provider='MAINTEL-BT', circuit1_ppp_name='user@isp.net', circuit1_ppp_pwd='secret')
+        row_result = sc.transform_row(tracker_record(12, **store))
+        self.assertTrue(row_result['messages'])
+        sc.move_row_result(row_result, 13)
+        self.assertEqual(row_result, sc.transform_row(tracker_record(13, **store)))
+
+    def test_only_the_row_number_is_renamed(self):
+        row_result = {'row': 12, 'messages': ['Warning: store 0012 row 12 has no postcode - row 120 is fine']}
+        sc.move_row_result(row_result, 5)
+        self.assertEqual(row_result, {'row': 5, 'messages': ['Warning: store 0012 row 5 has no postcode - row 120 is fine']})
+
+
+class RunStateFileTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.state_file = os.path.join(self.folder, '.last_run_state.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        tracker_rec = tracker_record(3, **good_store)
+        rows = {sc.row_fingerprint(tracker_rec): sc.transform_row(tracker_rec)}
+        sc.save_run_state(self.state_file, rows)
+        # json turns the subnet tuples into lists - run_import only unpacks them
+        self.assertEqual(sc.load_run_state(self.state_file), sc.json.loads(sc.json.dumps(rows)))
+
+    def test_only_the_owner_can_read_it(self):
+        sc.save_run_state(self.state_file, {})
+        if os.name == 'posix':
+            self.assertEqual(stat.S_IMODE(os.stat(self.state_file).st_mode), 0o600)
+
+    def test_another_version_is_not_used(self):
+        with open(self.state_file, 'w') as f:
+            sc.json.dump({'version': 'older', 'rows': {'fingerprint': {}}}, f)
+        self.assertEqual(sc.load_run_state(self.state_file), {})
+
+    def test_a_missing_or_broken_file_is_not_used(self):
+        self.assertEqual(sc.load_run_state(self.state_file), {})
+        with open(self.state_file, 'w') as f:
+            f.write('{"version": ')
+        self.assertEqual(sc.load_run_state(self.state_file), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
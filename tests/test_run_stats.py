@@ -0,0 +1,41 @@
+import time
+import tracemalloc
+import unittest
+
+from support import sc
+
+
+class RunStatsTest(unittest.TestCase):
+
+    def tearDown(self):
+        tracemalloc.stop()
+
+    def test_memory_is_the_peak_of_each_stage(self):
+        run_stats = sc.RunStats()
+        tracemalloc.start()
+        run_stats.begin('big')
+        block = bytearray(20 * 1024 * 1024)
+        del block
+        run_stats.begin('small')
+        run_stats.end()
+        self.assertGreaterEqual(run_stats.stages['big']['peak_memory_mb'], 20)
+        self.assertLess(run_stats.stages['small']['peak_memory_mb'], 20)
+        self.assertEqual(run_stats.report()['peak_memory_mb'], run_stats.stages['big']['peak_memory_mb'])
+
+    def test_no_memory_without_tracemalloc(self):
+        run_stats = sc.RunStats()
+        run_stats.begin('stage')
+        self.assertIsNone(run_stats.report()['peak_memory_mb'])
+
+    def test_each_run_reports_its_own_time(self):
+        # a --watch run makes new stats - the CPU used before it is not counted
+        start = time.process_time()
+        while time.process_time() - start < 0.2:
+            pass
+        run_stats = sc.RunStats()
+        run_stats.begin('stage')
+        self.assertLess(run_stats.report()['cpu'], 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import csv
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+def device(site_id, host_name):
+    device_row = sc.DeviceRow([None] * len(sc.keys))
+    device_row['Site Id'] = site_id
+    device_row['Host Name'] = host_name
+    return device_row
+
+
+class WriteDeviceShardsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.shard_dir = os.path.join(self.folder, 'vmanage-import-sc-shards')
+        self.device_rows = [device(32653, 'SC-3-2653-R1'), device(32654, 'SC-3-2654-R1'), device(32654, 'SC-3-2654-R2'),
+                            device(41001, 'SC-4-1001-R1'), device(32655, 'SC-3-2655-R1'), device(32656, 'SC-3-2656-R1'),
+                            device(32657, 'SC-3-2657-R1')]
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def read_hosts(self, file_name):
+        with open(os.path.join(self.shard_dir, file_name), newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], sc.keys)
+        return [row[sc.key_index['Host Name']] for row in rows[1:]]
+
+    def test_shards_and_manifest(self):
+        manifest = sc.write_device_shards(self.shard_dir, self.device_rows, ['store-type', 'role'], 3, 1000, 2)
+        # type3-R1 has five rows so it is split into parts of three and two
+        self.assertEqual([(shard['file'], shard['rows']) for shard in manifest['shards']],
+                         [('vmanage-import-sc-type3-R1-1.csv', 3), ('vmanage-import-sc-type3-R1-2.csv', 2),
+                          ('vmanage-import-sc-type3-R2.csv', 1), ('vmanage-import-sc-type4-R1.csv', 1)])
+        self.assertEqual(manifest['devices'], 7)
+        self.assertEqual(self.read_hosts('vmanage-import-sc-type3-R1-1.csv'), ['SC-3-2653-R1', 'SC-3-2654-R1', 'SC-3-2655-R1'])
+
+        # every device is in one shard and each shard matches its checksum
+        hosts = []
+        for shard in manifest['shards']:
+            with open(os.path.join(self.shard_dir, shard['file']), 'rb') as f:
+                content = f.read()
+            self.assertEqual((len(content), hashlib.sha256(content).hexdigest()), (shard['bytes'], shard['sha256']))
+            hosts.extend(self.read_hosts(shard['file']))
+        self.assertCountEqual(hosts, [device_row['Host Name'] for device_row in self.device_rows])
+
+        with open(os.path.join(self.shard_dir, 'manifest.json')) as f:
+            self.assertEqual(json.load(f), manifest)
+
+    def test_site_range(self):
+        manifest = sc.write_device_shards(self.shard_dir, self.device_rows, ['site-range'], 500, 10000, 1)
+        self.assertEqual([(shard['shard'], shard['rows']) for shard in manifest['shards']], [('sites30000-39999', 6), ('sites40000-49999', 1)])
+
+    def test_shards_no_longer_written_are_removed(self):
+        sc.write_device_shards(self.shard_dir, self.device_rows, ['store-type'], 500, 1000, 1)
+        manifest = sc.write_device_shards(self.shard_dir, self.device_rows[:3], ['store-type'], 500, 1000, 1)
+        self.assertEqual(sorted(os.listdir(self.shard_dir)), ['manifest.json', 'vmanage-import-sc-type3.csv'])
+        self.assertEqual(manifest['shards'][0]['last_host'], 'SC-3-2654-R2')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import ipaddress
+import unittest
+
+from support import sc
+
+
+class SubnetConflictTest(unittest.TestCase):
+
+    def entry(self, subnet, store, row, vlan):
+        net = ipaddress.ip_network(subnet)
+        return (int(net.network_address), int(net.broadcast_address), store, row, vlan, subnet)
+
+    def test_find_subnet_conflicts(self):
+        outer = self.entry('10.126.53.0/24', '2653', 3, 'VLAN 70')
+        inner = self.entry('10.126.53.0/25', '2653', 3, 'VLAN 10')
+        duplicate = self.entry('10.126.53.0/25', '2654', 4, 'VLAN 10')
+        apart = self.entry('10.126.54.0/24', '2654', 4, 'VLAN 70')
+        conflicts = sc.find_subnet_conflicts([apart, duplicate, inner, outer])
+        # the /24 holds both /25s and the two /25s are the same subnet - either can be reported as the outer one
+        self.assertEqual(len(conflicts), 3)
+        self.assertEqual({inner_entry for outer_entry, inner_entry in conflicts if outer_entry is outer}, {inner, duplicate})
+        self.assertEqual([set(conflict) for conflict in conflicts if outer not in conflict], [{inner, duplicate}])
+
+    def test_overlaps_by_design_are_not_reported(self):
+        vlan70 = self.entry('10.126.53.0/24', '2653', 3, 'VLAN 70')
+        vlan10 = self.entry('10.126.53.0/25', '2653', 3, 'VLAN 10')
+        vlan31 = self.entry('10.126.53.0/28', '2653', 3, 'VLAN 31')
+        self.assertEqual(sc.subnet_conflict_messages([vlan70, vlan10, vlan31]), [])
+        messages = sc.subnet_conflict_messages([vlan70, vlan10, self.entry('10.126.53.0/25', '2654', 4, 'VLAN 10')])
+        self.assertEqual(len(messages), 2)
+        self.assertIn('Overlapping subnet 10.126.53.0/25 for store 2654 row 4 VLAN 10 overlaps 10.126.53.0/24 for store 2653', messages[0])
+        self.assertIn('Duplicate subnet 10.126.53.0/25 found for store 2654 row 4 VLAN 10 - already used by store 2653 row 3', messages[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import good_store, sc, tracker_record
+
+
+class TrackerCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.folder, 'tracker.bin')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_round_trip(self):
+        # date and time cells can't be marshalled - they come back as the same values and types
+        tracker_rows = [tracker_record(3, **dict(good_store, circuit1_bw_up=20.5, router2_serial=True)),
+                        tracker_record(4, store_num=datetime.datetime(2026, 10, 18, 9, 30), store_type=datetime.date(2026, 10, 19),
+                                       postcode=datetime.time(14, 5), vlan2=datetime.timedelta(days=2, seconds=30)),
+                        tracker_record(5)]
+        sc.save_tracker_cache(self.cache_file, tracker_rows)
+        loaded = sc.load_tracker_cache(self.cache_file)
+        self.assertEqual(loaded, tracker_rows)
+        self.assertEqual([type(value) for value in loaded[1]], [type(value) for value in tracker_rows[1]])
+
+    def test_empty_sheet(self):
+        sc.save_tracker_cache(self.cache_file, [])
+        self.assertEqual(sc.load_tracker_cache(self.cache_file), [])
+
+    def test_another_layout_is_not_used(self):
+        sc.save_tracker_cache(self.cache_file, [tracker_record(3, **good_store)])
+        self.assertIsNone(sc.load_tracker_cache(self.cache_file, first_row=2))
+
+    def test_a_broken_file_is_not_used(self):
+        self.assertIsNone(sc.load_tracker_cache(self.cache_file))
+        with open(self.cache_file, 'wb') as f:
+            f.write(b'\x00\x01')
+        self.assertIsNone(sc.load_tracker_cache(self.cache_file))
+
+
+class ReadTrackerCachedTest(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.folder, '.tracker_cache')
+        self.tracker_file = os.path.join(self.folder, 'tracker.xlsx')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def write_tracker(self, store_num):
+        import openpyxl
+
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.cell(3, sc.store_num_col, store_num)
+        sheet.cell(3, sc.postcode_col, 'BN1 1AA')
+        sheet.cell(3, sc.store_type_col, datetime.datetime(2026, 10, 18))
+        workbook.save(self.tracker_file)
+
+    def test_hit_after_miss(self):
+        self.write_tracker('2653')
+        tracker_rows, cache_hit = sc.read_tracker_cached(self.tracker_file, self.cache_dir)
+        self.assertFalse(cache_hit)
+        self.assertEqual(sc.read_tracker_cached(self.tracker_file, self.cache_dir), (tracker_rows, True))
+        self.assertEqual(tracker_rows[0][sc.store_type_col], datetime.datetime(2026, 10, 18))
+
+    def test_only_the_newest_versions_are_kept(self):
+        for store_num in range(sc.tracker_cache_entries + 2):
+            self.write_tracker(str(store_num))
+            tracker_rows, cache_hit = sc.read_tracker_cached(self.tracker_file, self.cache_dir)
+            self.assertFalse(cache_hit)
+            self.assertEqual(tracker_rows[0][sc.store_num_col], str(store_num))
+        self.assertEqual(len(sc.tracker_cache_entries_list(self.cache_dir)), sc.tracker_cache_entries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import unittest
+
+from support import sc
+
+
+@unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'the workers find the script by its module name only when forked')
+class TransformRowsPoolTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        folder = tempfile.mkdtemp()
+        try:
+            tracker_file = os.path.join(folder, 'tracker.xlsx')
+            sc.bench_tracker(tracker_file, 300)
+            cls.tracker_rows = sc.read_tracker(tracker_file)
+        finally:
+            shutil.rmtree(folder)
+
+    def setUp(self):
+        self.saved_chunk_rows = sc.transform_chunk_rows
+        sc.transform_chunk_rows = 40
+
+    def tearDown(self):
+        sc.transform_chunk_rows = self.saved_chunk_rows
+
+    def test_pool_matches_serial(self):
+        serial = sc.transform_rows(self.tracker_rows, 1)
+        self.assertEqual(len(serial), 300)
+        self.assertEqual(sc.transform_rows(self.tracker_rows, 3), serial)
+
+    def test_a_few_rows_are_not_sent_to_workers(self):
+        # fewer than two chunks are transformed in this process - the same results either way
+        self.assertEqual(sc.transform_rows(self.tracker_rows[:50], 3), sc.transform_rows(self.tracker_rows[:50], 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+from support import good_store, sc, tracker_record
+
+
+class ValidationRulesTest(unittest.TestCase):
+
+    def failures(self, *records):
+        return [(failure['row'], failure['rule']) for failure in sc.validate_tracker(list(records))]
+
+    def test_good_row(self):
+        self.assertEqual(self.failures(tracker_record(3, **good_store)), [])
+
+    def test_blank_row_is_not_reported(self):
+        self.assertEqual(self.failures(tracker_record(3, **good_store), tracker_record(4)), [])
+
+    def test_row_without_store_number(self):
+        cells = dict(good_store, store_num=None)
+        self.assertEqual(self.failures(tracker_record(3, **cells)), [(3, 'missing store number')])
+
+    def test_unresolved_formula_in_vlan2(self):
+        for formula in ("=VLOOKUP(A3,'Store VLANs'!A:B,2,FALSE)", '=INDEX(Lookup!B:B,MATCH(A3,Lookup!A:A,0))',
+                        '=IFERROR(INDEX(Lookup!B:B,MATCH(A3,Lookup!A:A,0)),"")', '=Lookup!B3'):
+            cells = dict(good_store, vlan2=formula)
+            self.assertEqual(self.failures(tracker_record(3, **cells)), [(3, 'formula in VLAN 2')])
+
+    def test_duplicate_serial_across_rows(self):
+        first = tracker_record(3, **good_store)
+        second = tracker_record(4, **dict(good_store, store_num='2654', router1_mgmt_ip='10.255.1.2'))
+        self.assertEqual(self.failures(first, second), [(3, 'duplicate router serial'), (4, 'duplicate router serial')])
+
+    def test_duplicate_serial_ignores_router2_of_single_router_store(self):
+        # router 2 serial only counts when the row also has a circuit 2 provider
+        first = tracker_record(3, **dict(good_store, router2_serial='FGL9999ZZZZ'))
+        second = tracker_record(4, **dict(good_store, store_num='2654', router1_serial='FGL9999ZZZZ', router1_mgmt_ip='10.255.1.2'))
+        self.assertEqual(self.failures(first, second), [])
+
+    def test_maintel_username(self):
+        cells = dict(good_store, circuit1_provider='MAINTEL-BT', circuit1_ppp_name='someone@bt')
+        self.assertEqual(self.failures(tracker_record(3, **cells)), [(3, 'circuit 1 MAINTEL username')])
+        cells = dict(cells, circuit1_ppp_name='SCOOP-DIA-BT-MAINTEL-ISP-2653@bt')
+        self.assertEqual(self.failures(tracker_record(3, **cells)), [])
+
+    def test_every_failure_of_a_row_is_reported(self):
+        cells = dict(good_store, store_type='Retail', router1_mgmt_ip='10.255.1', vlan2=None)
+        self.assertEqual(self.failures(tracker_record(3, **cells)),
+                         [(3, 'invalid store type'), (3, 'invalid router 1 management IP'), (3, 'missing VLAN 2')])
+
+    def test_failure_details(self):
+        cells = dict(good_store, router1_mgmt_ip='10.255.1')
+        failure, = sc.validate_tracker([tracker_record(7, **cells)])
+        self.assertEqual((failure['store'], failure['severity'], failure['column'], failure['value']), ('2653', 'error', 'G', '10.255.1'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import contextlib
+import io
+import unittest
+
+from support import good_store, sc, tracker_record
+
+
+def device_rows(*stores):
+
+    # Function to return the device rows transform_row builds for tracker records of good_store with the cells given
+
+    rows = []
+    for row, cells in enumerate(stores, 3):
+        row_result = sc.transform_row(tracker_record(row, **dict(good_store, **cells)))
+        rows.extend(sc.DeviceRow(device, row_result['postcode']) for device in row_result['devices'])
+    return rows
+
+
+class PushDeviceRowsTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.stub = sc.start_vmanage_stub(task_seconds=0)
+        cls.vmanage = 'http://%s:%d' % cls.stub.server_address[:2]
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.stub.shutdown()
+        cls.stub.server_close()
+
+    def test_devices_are_attached_in_batches(self):
+        rows = device_rows({}, {'store_num': '2654', 'router1_serial': 'FGL2345ABCE', 'router1_mgmt_ip': '10.255.1.2'},
+                           {'store_num': '2655', 'router1_serial': 'FGL2345ABCF', 'router1_mgmt_ip': '10.255.1.3'})
+        # vManage refuses a host name with a space - the others in its batch are still attached
+        rows[1]['Host Name'] = 'SC-3-2654 -R1'
+        results = sc.push_device_rows(rows, self.vmanage, 'sdwan-import-stub', 'admin', 'admin', batch_size=2, workers=2)
+        self.assertEqual([(host_name, status) for host_name, status, detail in results],
+                         [('SC-3-2653-R1', 'Success'), ('SC-3-2654 -R1', 'Failure'), ('SC-3-2655-R1', 'Success')])
+        self.assertEqual(self.stub.attached['C1121X-8P-FGL2345ABCD']['//variables/vlan20_ipv4'], rows[0]['vlan20_ipv4'])
+        self.assertNotIn('C1121X-8P-FGL2345ABCE', self.stub.attached)
+
+    def assertStops(self, call, message):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(SystemExit) as raised:
+            call()
+        self.assertEqual(raised.exception.code, 1)
+        self.assertIn(message, output.getvalue())
+
+    def test_wrong_password(self):
+        self.assertStops(lambda: sc.push_device_rows(device_rows({}), self.vmanage, 'sdwan-import-stub', 'admin', 'wrong', 50, 1),
+                         'vManage login to')
+
+    def test_unknown_template(self):
+        self.assertStops(lambda: sc.push_device_rows(device_rows({}), self.vmanage, 'no-such-template', 'admin', 'admin', 50, 1),
+                         'there is no device template no-such-template')
+
+    def test_template_request_refused(self):
+        # a session that is not logged in is refused with a 401
+        import requests
+        with requests.Session() as session:
+            self.assertStops(lambda: sc.vmanage_template(session, self.vmanage, 'sdwan-import-stub'),
+                             'device template sdwan-import-stub could not be read')
+
+    def test_vmanage_not_reachable(self):
+        import requests
+        stub = sc.start_vmanage_stub()
+        vmanage = 'http://%s:%d' % stub.server_address[:2]
+        stub.shutdown()
+        stub.server_close()
+        with requests.Session() as session:
+            self.assertStops(lambda: sc.vmanage_template(session, vmanage, 'sdwan-import-stub'), 'Connection error connecting to')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from support import good_store, sc, tracker_record
+
+
+class WatchTrackerTest(unittest.TestCase):
+
+    # watch_tracker is run with run_import replaced - each fake run checks what it was started for and then changes the
+    # tracker the way OneDrive sync does, and the last one stops the watch the same as Ctrl-C
+
+    debounce = 0.3
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.tracker = os.path.join(self.folder, 'tracker.xlsx')
+        self.write(b'first')
+        self.saved = {name: getattr(sc, name) for name in ('tracker_filepath', 'run_import', 'watch_interval')}
+        sc.tracker_filepath = self.tracker
+        sc.watch_interval = 0.01
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(sc, name, value)
+        shutil.rmtree(self.folder)
+
+    def write(self, content):
+        with open(self.tracker, 'wb') as f:
+            f.write(content)
+        self.last_write = time.monotonic()
+
+    def later(self, *writes):
+        # write the contents in a background burst, 50 ms apart
+        def burst():
+            for content in writes:
+                time.sleep(0.05)
+                self.write(content)
+        thread = threading.Thread(target=burst)
+        thread.start()
+        self.threads.append(thread)
+
+    def watch(self, runs):
+        self.threads = []
+        self.runs = []
+
+        def run_import(args, run_state=None):
+            self.runs.append((open(self.tracker, 'rb').read(), time.monotonic() - self.last_write, run_state))
+            return runs[len(self.runs) - 1]()
+
+        sc.run_import = run_import
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            sc.watch_tracker(SimpleNamespace(watch_debounce=self.debounce))
+        for thread in self.threads:
+            thread.join()
+        return output.getvalue()
+
+    def test_a_burst_of_writes_is_one_run(self):
+        def first_run():
+            self.later(b'second a', b'second b', b'second c', b'second')
+            return {'row': 'state'}
+
+        def second_run():
+            raise KeyboardInterrupt
+
+        output = self.watch([first_run, second_run])
+        self.assertEqual([content for content, settled, run_state in self.runs], [b'first', b'second'])
+        # the second run waited for the writes to settle and was given the row results of the first
+        self.assertGreaterEqual(self.runs[1][1], self.debounce)
+        self.assertEqual(self.runs[1][2], {'row': 'state'})
+        self.assertIn('Stopped watching', output)
+
+    def test_a_save_with_the_same_content_is_not_run(self):
+        def first_run():
+            self.later(b'first', b'first')
+            threading.Timer(2 * self.debounce, self.write, (b'second',)).start()
+
+        def second_run():
+            raise KeyboardInterrupt
+
+        output = self.watch([first_run, second_run])
+        self.assertEqual([content for content, settled, run_state in self.runs], [b'first', b'second'])
+        self.assertIn('tracker saved with no change to its content', output)
+
+    def test_a_bad_edit_does_not_stop_the_watch(self):
+        def first_run():
+            self.later(b'second')
+            sc.transform_chunk([tracker_record(3, **dict(good_store, router2_serial='FGL2345WXYZ', circuit2_provider='BT',
+                                                         router2_mgmt_ip='10.255.1'))])
+
+        def second_run():
+            raise KeyboardInterrupt
+
+        output = self.watch([first_run, second_run])
+        self.assertEqual(len(self.runs), 2)
+        self.assertIn('Error: store 2653 row 3 could not be transformed', output)
+        self.assertIn('Run stopped - waiting for the next change to the tracker', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
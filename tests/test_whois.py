@@ -0,0 +1,65 @@
+import threading
+import unittest
+
+from support import sc
+
+
+def net(cidr, name):
+    # a registered network the way whois_lookup returns it
+    network = sc.IPv4Net.parse(cidr)
+    return (network.network, network.broadcast, cidr, name, 'GB', '64500')
+
+
+class ResolveWhoisTest(unittest.TestCase):
+
+    # whois_lookup is replaced with a registry of nested ranges - a lookup returns the smallest range holding the address
+
+    registry = [net('151.0.0.0/12', 'RIPE-ALLOCATION'), net('151.3.0.0/16', 'SCOOP-STORES'), net('151.3.8.0/24', 'SCOOP-2653'),
+                net('81.77.0.0/16', 'BT-RETAIL')]
+
+    def setUp(self):
+        self.saved = {name: getattr(sc, name) for name in ('whois_lookup', 'whois_rate')}
+        self.lookups = []
+        self.lock = threading.Lock()
+        sc.whois_lookup = self.lookup
+        sc.whois_rate = 1000
+        self.cache_conn = sc.open_lookup_cache(':memory:')
+
+    def tearDown(self):
+        for name, value in self.saved.items():
+            setattr(sc, name, value)
+        self.cache_conn.close()
+
+    def lookup(self, address):
+        with self.lock:
+            self.lookups.append(address)
+        holders = [network for network in self.registry if network[0] <= address <= network[1]]
+        return min(holders, key=lambda network: network[1] - network[0]) if holders else None
+
+    def addresses(self, *cidrs):
+        return [sc.IPv4Net.parse(cidr).network for cidr in cidrs]
+
+    def test_one_lookup_answers_its_range(self):
+        addresses = self.addresses('151.3.8.0/28', '151.3.8.16/28', '151.3.8.32/28', '10.1.1.0/24')
+        results = sc.resolve_whois(addresses, self.cache_conn, 365, 1)
+        self.assertEqual(results, {addresses[0]: self.registry[2], addresses[1]: self.registry[2], addresses[2]: self.registry[2],
+                                   addresses[3]: None})
+        self.assertEqual(len(self.lookups), 2)
+
+    def test_cached_ranges_give_the_smallest_holder(self):
+        sc.resolve_whois(self.addresses('151.3.8.0/28', '151.3.9.0/28', '151.4.0.0/28', '81.77.1.0/28'), self.cache_conn, 365, 4)
+        self.lookups.clear()
+        addresses = self.addresses('151.3.8.64/28', '151.3.200.0/28', '151.15.0.0/28', '81.77.255.0/28')
+        results = sc.resolve_whois(addresses, self.cache_conn, 365, 4)
+        self.assertEqual([results[address][3] for address in addresses], ['SCOOP-2653', 'SCOOP-STORES', 'RIPE-ALLOCATION', 'BT-RETAIL'])
+        self.assertEqual(self.lookups, [])
+
+    def test_old_ranges_are_looked_up_again(self):
+        addresses = self.addresses('81.77.1.0/28')
+        sc.resolve_whois(addresses, self.cache_conn, 365, 1)
+        sc.resolve_whois(addresses, self.cache_conn, -1, 1)
+        self.assertEqual(len(self.lookups), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()